@@ -0,0 +1,122 @@
+import asyncio, time
+from typing import Dict, Any, List, Optional, Tuple, Union
+import aiohttp
+from .baseclient import AsyncBaseLLMClient
+from .tokens import token_usage
+from .availability import availability_cache, model_listed, DEFAULT_AVAILABILITY_TTL
+
+DEFAULT_MAX_CONCURRENCY = 64
+
+class AsyncOllamaClient(AsyncBaseLLMClient):
+    """
+    asyncio counterpart of OllamaClient.
+
+    Any number of ``agenerate`` calls may be awaited at once; at most
+    ``max_concurrency`` of them are on the wire, the rest wait on a semaphore
+    instead of each holding a thread. The HTTP session and semaphore belong to
+    the event loop that first uses them and are rebuilt if the client is
+    reused from another loop (e.g. a later ``asyncio.run``). A session is
+    closed when its loop finishes its async generators, as ``asyncio.run``
+    does, and otherwise before it is replaced. ``keep_alive`` works as for
+    OllamaClient.
+    """
+
+    def __init__(self, model: str = "tinyllama", host: str = "localhost", port: int = 11434,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, timeout: float = 15,
+                 availability_ttl: float = DEFAULT_AVAILABILITY_TTL, keep_alive: Optional[Union[str, float]] = None):
+        self.model = model
+        self.keep_alive = keep_alive
+        self.base_url = f"http://{host}:{port}"
+        self.endpoint = f"{self.base_url}/api/generate"
+        self.availability_ttl = availability_ttl
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._closer = None
+        self._stale: List[Any] = []
+
+    async def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is loop and not self._session.closed:
+            return
+        # A session left by another loop is closed before it is replaced, or its connector leaks
+        await self._release()
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        # asyncio.run finalizes async generators before closing its loop, which closes the session
+        # on the loop its connections belong to
+        self._closer = self._close_with_loop(self._session)
+        await self._closer.__anext__()
+
+    @staticmethod
+    async def _close_with_loop(session: aiohttp.ClientSession):
+        try:
+            yield
+        finally:
+            await session.close()
+
+    async def _release(self) -> None:
+        if self._closer is not None:
+            if self._loop is asyncio.get_running_loop() or self._loop.is_closed():
+                await self._closer.aclose()
+            else:
+                # Its connections can only be closed on their own loop, which will when it shuts down
+                self._stale = [c for c in self._stale if c.ag_frame is not None] + [self._closer]
+        self._closer = None
+        self._session = None
+        self._loop = None
+
+    async def _post(self, payload: Dict[str, Any]) -> Tuple[Any, float, float]:
+        """Response body, seconds spent waiting for a free slot and seconds from sending to the parsed body"""
+        await self._bind()
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        queued = time.time()
+        async with self._semaphore:
+            start = time.time()
+            async with self._session.post(self.endpoint, json=payload) as resp:
+                resp.raise_for_status()
+                body = await resp.json(content_type=None)
+            return body, start - queued, time.time() - start
+
+    async def ais_model_available(self) -> bool:
+        available = availability_cache.get(self.base_url, self.model, self.availability_ttl)
+        if available is None:
+            await self._bind()
+            try:
+                async with self._session.get(f"{self.base_url}/api/tags",
+                                             timeout=aiohttp.ClientTimeout(total=2)) as resp:
+                    available = resp.status == 200 and model_listed(await resp.json(content_type=None), self.model)
+            except Exception:
+                available = False
+            availability_cache.set(self.base_url, self.model, available)
+        return available
+
+    async def agenerate(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000) -> Dict[str, Any]:
+        """
+        ``latency`` counts from sending the request, like OllamaClient's, so it
+        compares with the sync client's; the time the call waited for one of the
+        ``max_concurrency`` slots is reported separately as ``queue_wait``.
+        """
+        try:
+            body, queue_wait, latency = await self._post(
+                {"model": self.model, "prompt": prompt, "stream": False,
+                 "options": {"temperature": temperature, "num_predict": max_tokens}})
+        except Exception as e:
+            return {"text": "", "error": str(e) or type(e).__name__, "latency": 0.0, "queue_wait": 0.0,
+                    "prompt_tokens": 0, "completion_tokens": 0}
+
+        if not isinstance(body, dict):
+            body = {}
+        text = body.get("response", "")
+        return {"text": text, "latency": latency, "queue_wait": queue_wait,
+                **token_usage(body, prompt, text, latency),
+                "error": "" if text else "No response"}
+
+    async def aclose(self) -> None:
+        await self._release()
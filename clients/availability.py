@@ -0,0 +1,41 @@
+import threading, time
+from typing import Dict, Any, Optional, Tuple
+
+DEFAULT_AVAILABILITY_TTL = 60.0
+
+
+def model_listed(tags: Dict[str, Any], model: str) -> bool:
+    """Whether an Ollama /api/tags listing contains ``model`` (an untagged name means ``:latest``)"""
+    wanted = model if ":" in model else f"{model}:latest"
+    return any(wanted in (entry.get("name"), entry.get("model")) for entry in tags.get("models", []))
+
+
+class AvailabilityCache:
+    """
+    Process-wide memo of model availability per server, valid for ``ttl`` seconds.
+
+    Shared by every client instance, so a session that builds many clients
+    still asks each server about each model only once per TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[float, bool]] = {}
+
+    def get(self, base_url: str, model: str, ttl: float) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get((base_url, model))
+        if entry is None or time.monotonic() - entry[0] > ttl:
+            return None
+        return entry[1]
+
+    def set(self, base_url: str, model: str, available: bool) -> None:
+        with self._lock:
+            self._entries[(base_url, model)] = (time.monotonic(), available)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+availability_cache = AvailabilityCache()
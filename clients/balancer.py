@@ -0,0 +1,231 @@
+import random, threading, time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from .baseclient import BaseLLMClient
+
+BALANCE_STRATEGIES = ("least-outstanding", "latency")
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+def parse_hosts(spec: str) -> List[Tuple[str, Optional[int]]]:
+    """``"gpu1:11434,gpu2,10.0.0.3:11435"`` as (host, port) pairs; a missing port is None"""
+    hosts = []
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        host, _, port = entry.rpartition(":") if ":" in entry else (entry, "", "")
+        hosts.append((host, int(port) if port else None))
+    return hosts
+
+
+class CircuitBreaker:
+    """
+    Takes a host out of rotation after ``failure_threshold`` consecutive
+    failures. After ``reset_timeout`` seconds one probe request is let
+    through (half-open): success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """Whether a request may go to the host now; call with the balancer's lock held"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half-open"
+            return True
+        return False
+
+    def available(self) -> bool:
+        """Like allow() without claiming the half-open probe"""
+        return self.state == "closed" or (self.state == "open" and
+                                          time.monotonic() - self.opened_at >= self.reset_timeout)
+
+    def success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        if self.state != "open":
+            self.trips += 1
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+
+class _Node:
+    __slots__ = ("client", "label", "breaker", "outstanding", "latency", "requests", "failures",
+                 "completion_tokens", "busy", "first", "last")
+
+    def __init__(self, client: BaseLLMClient, breaker: CircuitBreaker):
+        self.client = client
+        self.label = getattr(client, "base_url", None) or f"{type(client).__name__}-{id(client):x}"
+        self.breaker = breaker
+        self.outstanding = 0
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.completion_tokens = 0
+        self.busy = 0.0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+
+
+class BalancedClient(BaseLLMClient):
+    """
+    Spreads ``generate`` calls over one client per host.
+
+    ``least-outstanding`` sends each call to the host with the fewest calls in
+    flight; ``latency`` to the one with the lowest expected wait, its in-flight
+    calls (plus this one) times an exponentially weighted average of its
+    latency. Hosts with no latency yet are tried first. A call whose response
+    has an error counts against the host's CircuitBreaker and is retried on
+    another host, up to ``retries`` times.
+    """
+
+    def __init__(self, clients: Sequence[BaseLLMClient], strategy: str = "least-outstanding",
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 retries: Optional[int] = None, latency_alpha: float = 0.3):
+        if not clients:
+            raise ValueError("BalancedClient needs at least one client")
+        if strategy not in BALANCE_STRATEGIES:
+            raise ValueError(f"Unknown balancing strategy '{strategy}', expected one of {BALANCE_STRATEGIES}")
+        self.client = clients[0]
+        self.model = getattr(self.client, "model", type(self.client).__name__)
+        self.strategy = strategy
+        self.retries = len(clients) - 1 if retries is None else retries
+        self.latency_alpha = latency_alpha
+        self.nodes = [_Node(c, CircuitBreaker(failure_threshold, reset_timeout)) for c in clients]
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def is_model_available(self) -> bool:
+        """True if any host serves the model; the others are taken out of rotation"""
+        available = False
+        for node in self.nodes:
+            if node.client.is_model_available():
+                available = True
+            else:
+                with self._lock:
+                    node.breaker.trip()
+        return available
+
+    def warm_up(self) -> float:
+        """Load the model on every host in rotation; returns the slowest host's load time"""
+        times = [node.client.warm_up() for node in self.nodes
+                 if node.breaker.state == "closed" and hasattr(node.client, "warm_up")]
+        return max(times, default=0.0)
+
+    def _score(self, node: _Node):
+        latency = node.latency or 0.0
+        if self.strategy == "latency":
+            return (node.outstanding + 1) * latency, node.outstanding
+        return node.outstanding, latency
+
+    def _acquire(self, exclude: List[_Node]) -> Optional[_Node]:
+        with self._lock:
+            candidates = [n for n in self.nodes if n not in exclude and n.breaker.available()]
+            if not candidates:
+                return None
+            best = min(self._score(n) for n in candidates)
+            node = random.choice([n for n in candidates if self._score(n) == best])
+            node.breaker.allow()
+            node.outstanding += 1
+            node.requests += 1
+            if node.first is None:
+                node.first = time.time()
+            return node
+
+    def _release(self, node: _Node, response: Dict[str, Any], elapsed: float) -> bool:
+        failed = bool(response.get("error"))
+        with self._lock:
+            node.outstanding -= 1
+            node.busy += elapsed
+            node.last = time.time()
+            if failed:
+                node.failures += 1
+                node.breaker.failure()
+            else:
+                node.breaker.success()
+                node.completion_tokens += response.get("completion_tokens") or 0
+                latency = response.get("latency", elapsed)
+                node.latency = latency if node.latency is None else \
+                    self.latency_alpha * latency + (1 - self.latency_alpha) * node.latency
+        return not failed
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        tried: List[_Node] = []
+        response: Optional[Dict[str, Any]] = None
+        while len(tried) <= self.retries:
+            node = self._acquire(tried)
+            if node is None:
+                break
+            tried.append(node)
+            start = time.time()
+            try:
+                response = node.client.generate(prompt, **kwargs)
+            except BaseException:
+                self._release(node, {"error": "exception"}, time.time() - start)
+                raise
+            if self._release(node, response, time.time() - start):
+                break
+        if response is None:
+            return {"text": "", "error": "No healthy hosts", "latency": 0.0, "prompt_tokens": 0,
+                    "completion_tokens": 0, "host": None, "attempts": 0}
+        return {**response, "host": tried[-1].label, "attempts": len(tried)}
+
+    def host_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per host: breaker state, calls, failures, tokens and the throughput it delivered"""
+        with self._lock:
+            return {n.label: with_throughput({
+                "state": n.breaker.state, "trips": n.breaker.trips, "requests": n.requests,
+                "failures": n.failures, "completion_tokens": n.completion_tokens, "busy": n.busy,
+                "first": n.first, "last": n.last,
+            }) for n in self.nodes}
+
+
+def with_throughput(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the mean call time, and requests/sec and tokens/sec over the window from the host's first call to its last"""
+    window = stats["last"] - stats["first"] if stats["first"] is not None and stats["last"] is not None else 0
+    stats["mean_latency"] = stats["busy"] / stats["requests"] if stats["requests"] else None
+    stats["requests_per_sec"] = stats["requests"] / window if window > 0 else None
+    stats["tokens_per_sec"] = stats["completion_tokens"] / window if window > 0 else None
+    return stats
+
+
+def merge_host_stats(parts: Sequence[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Combine the host_stats() of several processes (pytest-xdist workers) balancing over the same hosts"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        for label, stats in part.items():
+            total = merged.setdefault(label, {"state": "closed", "trips": 0, "requests": 0, "failures": 0,
+                                              "completion_tokens": 0, "busy": 0.0, "first": None, "last": None})
+            for key in ("trips", "requests", "failures", "completion_tokens", "busy"):
+                total[key] += stats[key]
+            if stats["state"] != "closed":
+                total["state"] = stats["state"]
+            for key, pick in (("first", min), ("last", max)):
+                if stats[key] is not None:
+                    total[key] = stats[key] if total[key] is None else pick(total[key], stats[key])
+    return {label: with_throughput(stats) for label, stats in merged.items()}
+
+
+def format_host_stats(stats: Dict[str, Dict[str, Any]]) -> List[str]:
+    lines = []
+    for label, s in stats.items():
+        rate = f"{s['requests_per_sec']:.2f} req/s, {s['tokens_per_sec']:.1f} tokens/s" \
+            if s["requests_per_sec"] is not None else "no throughput"
+        latency = f"{s['mean_latency']:.3f}s" if s["mean_latency"] is not None else "-"
+        lines.append(f"{label}: {s['requests']} calls, {s['failures']} failed, mean {latency}, {rate}, "
+                     f"breaker {s['state']} (tripped {s['trips']}x)")
+    return lines
@@ -1,7 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from .chat import ChatSession
+from .instrumentation import instrumented
 
 class BaseLLMClient(ABC):
+    """
+    Contract every backend (see clients.registry) and wrapper follows.
+
+    ``generate(prompt, temperature=0.8, max_tokens=1000, stream=False, stop_when=None)``
+    never raises for a failed request; it returns a dict with at least ``text``,
+    ``latency`` (seconds), ``prompt_tokens``, ``completion_tokens`` and ``error``
+    ("" on success). With ``stream`` or ``stop_when`` (a predicate on the text so
+    far that ends generation early) it adds the StreamMetrics fields and
+    ``stopped_early``. Backends also take ``stop`` sequences and a sampling
+    ``seed``, and report ``truncated`` when ``max_tokens`` cut the answer short. Backends that hold
+    conversations accept ``messages`` (earlier turns) and report
+    ``reused_tokens``/``prefill_saved``, the prompt prefix served from their
+    prompt cache. Clients also have a ``model``
+    attribute; backends with an embedding endpoint add
+    ``embed(texts, model=None)``, which raises on failure.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        # Every concrete generate, wrappers included, reports to the instrumentation hooks
+        super().__init_subclass__(**kwargs)
+        if "generate" in cls.__dict__ and not getattr(cls.generate, "__isabstractmethod__", False):
+            cls.generate = instrumented(cls.generate)
+
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate a response from the LLM"""
@@ -11,3 +36,29 @@ class BaseLLMClient(ABC):
     def is_model_available(self) -> bool:
         """Check if the model is available"""
         pass
+
+    def chat_session(self, system: Optional[str] = None, mode: str = "chat", **defaults) -> ChatSession:
+        """Start a conversation whose turns go through this client (and any wrappers it is)"""
+        return ChatSession(self, system, mode, **defaults)
+
+
+class AsyncBaseLLMClient(ABC):
+    @abstractmethod
+    async def agenerate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate a response from the LLM without blocking the event loop"""
+        pass
+
+    @abstractmethod
+    async def ais_model_available(self) -> bool:
+        """Check if the model is available without blocking the event loop"""
+        pass
+
+    async def aclose(self) -> None:
+        """Release any connections held by the client"""
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
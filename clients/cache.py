@@ -0,0 +1,189 @@
+import hashlib, inspect, json, os, sqlite3, threading, time, types
+from typing import Dict, Any, Optional
+from .baseclient import BaseLLMClient
+
+CACHE_MODES = ("passthrough", "record", "replay")
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Content-addressed store of LLM responses in a single SQLite file.
+
+    Entries are evicted least-recently-used first once their total size
+    exceeds ``max_bytes``. SQLite's own locking makes the store safe to share
+    between threads and between pytest worker processes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "responses.sqlite3")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries ("
+                         "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                         "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Dict[str, Any], source: str = "") -> str:
+        """``source`` names the backend and server, so servers sharing a model name don't share answers"""
+        blob = json.dumps({"source": source, "model": model, "prompt": prompt, "params": params},
+                          sort_keys=True, default=_describe)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT response FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        blob = json.dumps(response)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                             (key, blob, len(blob), time.time()))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def innermost(client: BaseLLMClient) -> BaseLLMClient:
+    """The backend client under any wrapping clients (a BalancedClient's first host)"""
+    while isinstance(getattr(client, "client", None), BaseLLMClient):
+        client = client.client
+    return client
+
+
+def generate_signature(client: BaseLLMClient) -> inspect.Signature:
+    """Signature of the innermost ``generate``, looking through wrapping clients"""
+    return inspect.signature(innermost(client).generate)
+
+
+def client_source(client: BaseLLMClient) -> str:
+    """Backend class and endpoint of the innermost client, as the ``source`` of cache keys"""
+    backend = innermost(client)
+    return f"{type(backend).__module__}.{type(backend).__qualname__}@{getattr(backend, 'endpoint', '')}"
+
+
+def request_key(model: str, signature: inspect.Signature, prompt: str, kwargs: Dict[str, Any],
+                source: str = "") -> str:
+    """Key of a generate call, with the defaults from ``signature`` filled in"""
+    bound = signature.bind(prompt, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    params.pop("prompt", None)
+    params.update(params.pop("kwargs", {}))
+    return ResponseCache.make_key(model, prompt, params, source)
+
+
+def _describe(value: Any, _seen: frozenset = frozenset()) -> str:
+    # Callables such as stop_when predicates change the output, so they are part of the
+    # key. Their repr is not stable across runs; their code, constants and closed-over
+    # values are, and tell apart lambdas and closures that share a qualified name.
+    code = getattr(value, "__code__", None)
+    if code is not None and id(value) not in _seen:
+        seen = _seen | {id(value)}
+        cells = [_describe(cell.cell_contents, seen) if _filled(cell) else "<empty>"
+                 for cell in getattr(value, "__closure__", None) or ()]
+        return f"{getattr(value, '__module__', '')}.{value.__qualname__}:{_code_digest(code)}:{cells}"
+    if callable(value):
+        return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+    return repr(value)
+
+
+def _filled(cell) -> bool:
+    try:
+        cell.cell_contents
+    except ValueError:
+        return False
+    return True
+
+
+def _code_digest(code: types.CodeType) -> str:
+    consts = [_code_digest(c) if isinstance(c, types.CodeType) else repr(c) for c in code.co_consts]
+    return hashlib.sha256(repr((code.co_code, consts, code.co_names)).encode()).hexdigest()[:16]
+
+
+class CachedClient(BaseLLMClient):
+    """
+    Wraps a client so ``generate`` goes through a ResponseCache.
+
+    * ``passthrough`` - the cache is not consulted at all.
+    * ``record`` - hits are served from the cache, misses go to the model and are stored.
+    * ``replay`` - only the cache is used; a miss is returned as an error and the
+      model is never contacted, so the suite runs offline.
+
+    Keys cover the backend and server, the model, the prompt and every sampling
+    parameter, including the defaults of the innermost ``generate``; wrappers in
+    between don't change them. ``source`` replaces the backend and server part,
+    for servers whose address changes between runs. Responses with an error are
+    never stored.
+    """
+
+    def __init__(self, client: BaseLLMClient, cache: ResponseCache, mode: str = "record",
+                 source: Optional[str] = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.client = client
+        self.cache = cache
+        self.mode = mode
+        self.model = getattr(client, "model", type(client).__name__)
+        self.source = source or client_source(client)
+        self._signature = generate_signature(client)
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _key(self, prompt: str, kwargs: Dict[str, Any]) -> str:
+        return request_key(self.model, self._signature, prompt, kwargs, self.source)
+
+    def is_model_available(self) -> bool:
+        if self.mode == "replay":
+            return True
+        return self.client.is_model_available()
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        if self.mode == "passthrough":
+            return self.client.generate(prompt, **kwargs)
+
+        key = self._key(prompt, kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return {**cached, "cached": True}
+
+        self.misses += 1
+        if self.mode == "replay":
+            return {"text": "", "error": f"No recorded response for prompt {prompt!r} (replay mode)",
+                    "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cached": False}
+
+        response = self.client.generate(prompt, **kwargs)
+        if not response.get("error"):
+            self.cache.put(key, response)
+        return {**response, "cached": False}
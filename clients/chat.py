@@ -0,0 +1,83 @@
+from typing import Dict, Any, List, Optional
+from .tokens import prefix_reuse
+
+CHAT_MODES = ("chat", "context")
+
+
+class ChatSession:
+    """
+    A multi-turn conversation with a client; each ``send`` is one user turn.
+
+    In ``chat`` mode every turn sends the earlier messages along (Ollama's
+    /api/chat, or any backend whose ``generate`` takes ``messages``); in
+    ``context`` mode it continues from the context tokens the previous turn
+    returned (Ollama's /api/generate). Either way the server recognises the
+    conversation so far as a cached prefix and prefills only the new turn.
+    ``turns`` records, per turn, how many prompt tokens that saved, from the
+    server's counts only. Where the backend reports no reuse itself (/api/chat)
+    the session compares the tokens the server prefilled with its count of
+    the conversation so far, which gives a lower bound.
+    """
+
+    def __init__(self, client, system: Optional[str] = None, mode: str = "chat", **defaults):
+        if mode not in CHAT_MODES:
+            raise ValueError(f"Unknown chat mode '{mode}', expected one of {CHAT_MODES}")
+        self.client = client
+        self.mode = mode
+        self.defaults = defaults
+        self.messages: List[Dict[str, str]] = []
+        self.context: Optional[List[int]] = None
+        self.turns: List[Dict[str, Any]] = []
+        # Scripted turns not yet in the context tokens; they lead the next prompt
+        self._pending: List[str] = []
+        # Server-counted tokens of the earlier turns, prompts and answers; the next turn repeats at least these
+        self._history_tokens = 0
+        if system:
+            self.add("system", system)
+
+    def add(self, role: str, content: str) -> None:
+        """Append a scripted message (e.g. an assistant reply) without generating"""
+        if self.mode == "chat":
+            self.messages.append({"role": role, "content": content})
+        else:
+            self._pending.append(f"{role.capitalize()}: {content}")
+
+    def send(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate the reply to the next user turn; failed turns are not added to the conversation"""
+        kwargs = {**self.defaults, **kwargs}
+        if self.mode == "chat":
+            response = self.client.generate(prompt, messages=list(self.messages), **kwargs)
+        else:
+            text = "\n".join(self._pending + [prompt]) if self._pending else prompt
+            response = self.client.generate(text, context=self.context or [], **kwargs)
+        if self.mode == "chat" and response.get("reused_tokens") is None and not response.get("error"):
+            response = {**response, **prefix_reuse(response.get("prefill_tokens"), response.get("prefill_time"),
+                                                    prefix=self._history_tokens)}
+
+        self.turns.append({"turn": len(self.turns) + 1, "latency": response.get("latency"),
+                           **{k: response.get(k) for k in ("prompt_tokens", "prompt_total_tokens",
+                                                           "reused_tokens", "prefill_saved")}})
+        if response.get("error"):
+            return response
+        if self.mode == "chat":
+            self.messages += [{"role": "user", "content": prompt}, {"role": "assistant", "content": response["text"]}]
+            # With an estimated count the last exact length stays, which keeps reuse a lower bound
+            if response.get("prompt_total_tokens") is not None and response.get("token_source") == "server":
+                self._history_tokens = response["prompt_total_tokens"] + response["completion_tokens"]
+        elif response.get("context"):
+            self.context = response["context"]
+            self._pending = []
+        else:
+            # No context came back (e.g. stopped early): carry the exchange over as text
+            self._pending += [f"User: {prompt}", f"Assistant: {response['text']}"]
+        return response
+
+    def savings(self) -> Dict[str, Any]:
+        """Totals over the turns: prompt tokens the server prefilled versus took from its cache"""
+        known = [t for t in self.turns if t["reused_tokens"] is not None]
+        total = sum(t["prompt_total_tokens"] or 0 for t in known)
+        reused = sum(t["reused_tokens"] for t in known)
+        saved = [t["prefill_saved"] for t in known if t["prefill_saved"] is not None]
+        return {"turns": len(self.turns), "prompt_total_tokens": total, "reused_tokens": reused,
+                "reuse_ratio": reused / total if total else 0.0,
+                "prefill_saved": sum(saved) if saved else None}
@@ -0,0 +1,146 @@
+import queue, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from .baseclient import BaseLLMClient
+from .cache import generate_signature, request_key
+
+
+class _MicroBatcher:
+    """
+    Releases queued calls in bursts.
+
+    The first queued call opens a window of ``window`` seconds; everything that
+    arrives before it closes (up to ``max_batch`` calls) is sent together, so
+    the server sees requests arrive at once and can schedule them side by side.
+    A call that finds nothing queued and nothing in flight has nothing to be
+    batched with and goes out at once, so serial callers pay no window.
+    No more than ``max_batch`` calls are ever in flight, which keeps the server
+    saturated without queueing work on it that it cannot run.
+    """
+
+    def __init__(self, generate, window: float, max_batch: int):
+        self._generate = generate
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self._in_flight = 0
+        self._count_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[str, Dict[str, Any], Future]]]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_batch)
+        self._executor = ThreadPoolExecutor(max_workers=max_batch, thread_name_prefix="llm-batch")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="llm-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, prompt: str, kwargs: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        self._queue.put((prompt, kwargs, future))
+        return future
+
+    def _dispatch(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            with self._count_lock:
+                idle = self._in_flight == 0
+            deadline = time.monotonic() + (0.0 if idle and self._queue.empty() else self.window)
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self.batches += 1
+            for prompt, kwargs, future in batch:
+                self._slots.acquire()
+                with self._count_lock:
+                    self._in_flight += 1
+                self._executor.submit(self._run, prompt, kwargs, future)
+
+    def _run(self, prompt: str, kwargs: Dict[str, Any], future: Future) -> None:
+        try:
+            future.set_result(self._generate(prompt, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._count_lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+
+class CoalescingClient(BaseLLMClient):
+    """
+    Wraps a client so concurrent identical ``generate`` calls share one upstream call.
+
+    Calls are identical when model, prompt and all sampling parameters match.
+    While one is in flight, later identical calls wait for its result instead
+    of sending their own request. With ``batch_window`` > 0, distinct calls are
+    additionally grouped into bursts of at most ``max_batch`` (see _MicroBatcher).
+    """
+
+    def __init__(self, client: BaseLLMClient, batch_window: float = 0.0, max_batch: int = 8):
+        self.client = client
+        self.model = getattr(client, "model", type(client).__name__)
+        self._signature = generate_signature(client)
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._batcher = _MicroBatcher(client.generate, batch_window, max_batch) if batch_window > 0 else None
+        self._requests = 0
+        self._upstream_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def is_model_available(self) -> bool:
+        return self.client.is_model_available()
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        key = request_key(self.model, self._signature, prompt, kwargs)
+        with self._lock:
+            self._requests += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self._upstream_calls += 1
+
+        if not leader:
+            return {**future.result(), "coalesced": True}
+
+        try:
+            if self._batcher is not None:
+                response = self._batcher.submit(prompt, kwargs).result()
+            else:
+                response = self.client.generate(prompt, **kwargs)
+            future.set_result(response)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return {**response, "coalesced": False}
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Calls received, calls sent upstream and how many were saved by coalescing"""
+        with self._lock:
+            return {"requests": self._requests,
+                    "upstream_calls": self._upstream_calls,
+                    "saved_calls": self._requests - self._upstream_calls,
+                    "batches": self._batcher.batches if self._batcher is not None else 0}
+
+    def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.close()
@@ -0,0 +1,23 @@
+import math, re, zlib
+from typing import List
+
+HASHED_DIM = 256
+_WORDS = re.compile(r"[^\W_]+")
+
+
+def hashed_embedding(text: str, dim: int = HASHED_DIM) -> List[float]:
+    """
+    Deterministic stand-in for an embedding model: every lower-cased word and
+    its character trigrams are hashed into one of ``dim`` signed buckets and
+    the vector is scaled to unit length. Texts sharing words or word stems get
+    a high cosine similarity. The stub backend and the mock server use it, so
+    similarity checks run without a model; it knows nothing of meaning.
+    """
+    vector = [0.0] * dim
+    for word in _WORDS.findall(text.lower()):
+        padded = f"<{word}>"
+        for feature in [word] + [padded[i:i + 3] for i in range(len(padded) - 2)]:
+            h = zlib.crc32(feature.encode())
+            vector[h % dim] += 1.0 if h >> 31 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
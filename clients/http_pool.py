@@ -0,0 +1,118 @@
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from .instrumentation import instrumentation
+
+DEFAULT_POOL_SIZE = 8
+
+# Set by the counting connections below whenever a TCP (and TLS) handshake
+# happens, so the calling thread can tell a fresh connection from a reused one.
+_handshake = threading.local()
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        _handshake.happened = True
+        with instrumentation.span("connect", host=self.host):
+            super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        _handshake.happened = True
+        with instrumentation.span("connect", host=self.host):
+            super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+class _SafeRetry(Retry):
+    """
+    Retries a POST only when the server can't have run it: a failed connect or
+    a 503. A 502/504 or a read timeout may come after the generation started,
+    and sending it again would run it twice and inflate its latency.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() == "POST" and status_code != 503:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class PooledSession:
+    """
+    Keep-alive HTTP session shared by every call of a client.
+
+    Connections are pooled per host (``pool_size`` of them, blocking when all
+    are busy instead of opening throwaway sockets), failed connects and
+    502/503/504 answers (only 503 for POST) are retried with exponential
+    backoff, and every call records whether it reused an existing connection.
+    Errors after the request was sent, such as read timeouts, are never retried.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, retries: int = 2,
+                 backoff_factor: float = 0.3):
+        self.pool_size = pool_size
+        retry = _SafeRetry(total=retries, connect=retries, read=0, other=0, backoff_factor=backoff_factor,
+                           status_forcelist=(502, 503, 504),
+                           allowed_methods=frozenset({"GET", "POST"}),
+                           raise_on_status=False)
+        adapter = _CountingAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                   pool_block=True, max_retries=retry)
+        self._session = requests.Session()
+        self._session.headers["Connection"] = "keep-alive"
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._new_connections = 0
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        _handshake.happened = False
+        try:
+            return self._session.request(method, url, **kwargs)
+        finally:
+            with self._lock:
+                self._requests += 1
+                if _handshake.happened:
+                    self._new_connections += 1
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    @property
+    def last_reused(self) -> bool:
+        """Whether the calling thread's most recent request skipped the handshake"""
+        return not getattr(_handshake, "happened", True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self._requests,
+                    "new_connections": self._new_connections,
+                    "reused_connections": self._requests - self._new_connections}
+
+    def close(self) -> None:
+        self._session.close()
@@ -0,0 +1,126 @@
+import json, os, threading, time
+from contextlib import nullcontext
+from functools import wraps
+from typing import Dict, Any, Callable, List
+
+# Handed out by span() while no hooks are installed, so disabled tracing costs one call
+_NO_SPAN = nullcontext()
+
+
+class Hooks:
+    """
+    Instrumentation callbacks; subclass and override what you need.
+
+    ``before_request``/``after_request`` run around the ``generate`` of every
+    client layer (wrappers included), ``on_span`` receives each finished span:
+    the generate calls themselves and the phases inside them (``serialize``,
+    ``connect``, ``http``, ``decode``, ...). Times are ``time.perf_counter_ns``.
+    """
+
+    def before_request(self, client, prompt: str, kwargs: Dict[str, Any]) -> None:
+        pass
+
+    def after_request(self, client, prompt: str, response: Dict[str, Any]) -> None:
+        pass
+
+    def on_span(self, name: str, start_ns: int, end_ns: int, attrs: Dict[str, Any]) -> None:
+        pass
+
+
+class _Span:
+    __slots__ = ("registry", "name", "attrs", "start")
+
+    def __init__(self, registry: "Instrumentation", name: str, attrs: Dict[str, Any]):
+        self.registry = registry
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> Dict[str, Any]:
+        self.start = time.perf_counter_ns()
+        return self.attrs
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter_ns()
+        # A generator closed early (GeneratorExit) ended normally as far as the span is concerned
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.attrs["error"] = exc_type.__name__
+        for hooks in self.registry.hooks:
+            hooks.on_span(self.name, self.start, end, self.attrs)
+
+
+class Instrumentation:
+    """
+    The installed Hooks. While none are installed ``enabled`` is False and
+    ``span`` returns a shared do-nothing context, so instrumented code paths
+    pay for little more than an attribute check.
+    """
+
+    def __init__(self):
+        self.hooks: List[Hooks] = []
+        self.enabled = False
+
+    def add(self, hooks: Hooks) -> None:
+        self.hooks = self.hooks + [hooks]
+        self.enabled = True
+
+    def remove(self, hooks: Hooks) -> None:
+        self.hooks = [h for h in self.hooks if h is not hooks]
+        self.enabled = bool(self.hooks)
+
+    def span(self, name: str, **attrs):
+        """Context manager timing one phase; yields the attrs dict so the phase can add to it"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, attrs)
+
+    def call(self, client, generate: Callable[..., Dict[str, Any]], prompt: str, args, kwargs) -> Dict[str, Any]:
+        for hooks in self.hooks:
+            hooks.before_request(client, prompt, kwargs)
+        with self.span(f"{type(client).__name__}.generate") as attrs:
+            response = generate(client, prompt, *args, **kwargs)
+            attrs.update({k: response[k] for k in ("prompt_tokens", "completion_tokens", "error") if k in response})
+        for hooks in self.hooks:
+            hooks.after_request(client, prompt, response)
+        return response
+
+
+instrumentation = Instrumentation()
+
+
+def instrumented(generate: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """Route a client's ``generate`` through the installed hooks when there are any"""
+
+    @wraps(generate)
+    def wrapper(self, prompt: str, *args, **kwargs) -> Dict[str, Any]:
+        if not instrumentation.enabled:
+            return generate(self, prompt, *args, **kwargs)
+        return instrumentation.call(self, generate, prompt, args, kwargs)
+
+    return wrapper
+
+
+class ChromeTrace(Hooks):
+    """
+    Collects spans as Chrome trace events ("X" complete events), viewable in
+    chrome://tracing or https://ui.perfetto.dev. One track per thread.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.origin_ns = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self._threads: Dict[int, str] = {}
+
+    def on_span(self, name: str, start_ns: int, end_ns: int, attrs: Dict[str, Any]) -> None:
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        self.events.append({"name": name, "ph": "X", "pid": self.pid, "tid": tid,
+                            "ts": (start_ns - self.origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000,
+                            "args": attrs})
+
+    def dump(self, path: str) -> None:
+        names = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in self._threads.items()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": names + self.events, "displayTimeUnit": "ms"}, f, default=str)
@@ -1,36 +1,215 @@
-import requests, time
-from typing import Dict, Any
+import json, time
+from typing import Dict, Any, Callable, Iterator, List, Optional, Union
 from .baseclient import BaseLLMClient
+from .http_pool import PooledSession, DEFAULT_POOL_SIZE
+from .streaming import StreamMetrics, iter_ndjson
+from .tokens import prefix_reuse, token_usage
+from .availability import availability_cache, model_listed, DEFAULT_AVAILABILITY_TTL
+from .instrumentation import instrumentation
+from .registry import register_backend
 
+def chunk_text(chunk: Dict[str, Any]) -> str:
+    """Generated text of a /api/generate or /api/chat response or stream chunk"""
+    return chunk.get("response") or (chunk.get("message") or {}).get("content") or ""
+
+
+@register_backend("ollama")
 class OllamaClient(BaseLLMClient):
-    def __init__(self, model: str = "tinyllama", host: str = "localhost", port: int = 11434):
+    """
+    ``keep_alive`` (seconds, or a duration such as ``"30m"``; -1 for ever) is
+    sent with every request and sets how long the server keeps the model, and
+    with it the prompt cache of its slots, loaded after the request. By
+    default the server's own setting (5 minutes) applies.
+    """
+
+    def __init__(self, model: str = "tinyllama", host: str = "localhost", port: int = 11434,
+                 pool_size: int = DEFAULT_POOL_SIZE, retries: int = 2, backoff_factor: float = 0.3,
+                 availability_ttl: float = DEFAULT_AVAILABILITY_TTL, keep_alive: Optional[Union[str, float]] = None):
         self.model = model
-        self.endpoint = f"http://{host}:{port}/api/generate"
+        self.keep_alive = keep_alive
+        self.base_url = f"http://{host}:{port}"
+        self.endpoint = f"{self.base_url}/api/generate"
+        self.availability_ttl = availability_ttl
+        self.pool_size = pool_size
+        self.session = PooledSession(pool_size=pool_size, retries=retries, backoff_factor=backoff_factor)
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False, url: Optional[str] = None):
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        with instrumentation.span("serialize"):
+            data = json.dumps(payload)
+        return self.session.post(url or self.endpoint, data=data, headers={"Content-Type": "application/json"},
+                                 timeout=15, stream=stream)
+
+    def _request(self, prompt: str, temperature: float, max_tokens: int, stream: bool,
+                 messages: Optional[List[Dict[str, str]]], context: Optional[List[int]],
+                 stop: Optional[List[str]] = None, seed: Optional[int] = None):
+        """URL and payload: /api/chat when there are earlier ``messages``, /api/generate otherwise"""
+        # Ollama reads sampling parameters from "options" only
+        options = {"temperature": temperature, "num_predict": max_tokens}
+        if stop:
+            options["stop"] = list(stop)
+        if seed is not None:
+            options["seed"] = seed
+        if messages is not None:
+            return f"{self.base_url}/api/chat", {
+                "model": self.model, "messages": [*messages, {"role": "user", "content": prompt}],
+                "stream": stream, "options": options}
+        payload = {"model": self.model, "prompt": prompt, "stream": stream, "options": options}
+        if context is not None:
+            payload["context"] = context
+        return self.endpoint, payload
 
-    def _post(self, payload: Dict[str, Any]):
-        return requests.post(self.endpoint, json=payload, timeout=15)
+    @staticmethod
+    def _reuse(body: Dict[str, Any], usage: Dict[str, Any], context: Optional[List[int]]) -> Dict[str, Any]:
+        """
+        Prefill the prompt cache saved, plus the context to continue from in
+        context mode. /api/generate returns the context as the server tokenized
+        it, prompt then answer, so the prompt's length is exact; /api/chat
+        returns none, ChatSession counts the conversation's tokens instead.
+        """
+        returned = body.get("context")
+        reuse = {}
+        if returned is not None and "eval_count" in body:
+            reuse = prefix_reuse(usage["prefill_tokens"], usage["prefill_time"],
+                                 total=len(returned) - body["eval_count"])
+        return {**reuse, "context": returned} if context is not None else reuse
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Requests sent so far and how many of them reused a pooled connection"""
+        return self.session.stats()
 
     def is_model_available(self) -> bool:
+        """
+        Look the model up in the server's model list rather than generating with it.
+        The answer is cached per server and model for ``availability_ttl`` seconds.
+        """
+        available = availability_cache.get(self.base_url, self.model, self.availability_ttl)
+        if available is None:
+            try:
+                resp = self.session.get(f"{self.base_url}/api/tags", timeout=2)
+                available = resp.status_code == 200 and model_listed(resp.json(), self.model)
+            except:
+                available = False
+            availability_cache.set(self.base_url, self.model, available)
+        return available
+
+    def warm_up(self) -> float:
+        """
+        Load the model into memory ahead of the first measured request and
+        return the seconds it took (near zero when it was already resident).
+        """
+        start = time.time()
+        # A generate request without a prompt only loads the model; loading can take minutes
+        payload = {"model": self.model}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        resp = self.session.post(self.endpoint, json=payload, timeout=300)
+        resp.raise_for_status()
+        return time.time() - start
+
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embeddings of ``texts`` from one /api/embed request, by ``model`` (default: this client's); raises on failure"""
+        resp = self._post({"model": model or self.model, "input": list(texts)}, url=f"{self.base_url}/api/embed")
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+    def iter_stream(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000,
+                    messages: Optional[List[Dict[str, str]]] = None, context: Optional[List[int]] = None,
+                    stop: Optional[List[str]] = None, seed: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield Ollama's NDJSON chunks as they arrive. Closing the generator early
+        drops the connection, which makes the server stop generating.
+        """
+        url, payload = self._request(prompt, temperature, max_tokens, True, messages, context, stop, seed)
+        with instrumentation.span("http", stream=True):
+            resp = self._post(payload, stream=True, url=url)
         try:
-            resp = self._post({"model": self.model, "prompt": "test", "stream": False})
-            return resp.status_code == 200
-        except:
-            return False
+            resp.raise_for_status()
+            with instrumentation.span("stream"):
+                yield from iter_ndjson(resp.iter_lines())
+        finally:
+            resp.close()
+
+    def generate(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000,
+                 stream: bool = False, stop_when: Optional[Callable[[str], bool]] = None,
+                 messages: Optional[List[Dict[str, str]]] = None, context: Optional[List[int]] = None,
+                 stop: Optional[List[str]] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        ``messages`` (earlier chat turns, ``{"role": ..., "content": ...}``) makes
+        ``prompt`` the next user turn of that conversation; ``context`` continues
+        from the context tokens of an earlier response. Either way the server can
+        reuse the conversation's cached prefix; see ChatSession. Generation ends
+        after ``max_tokens`` tokens (``truncated`` is then True) or at any of
+        the ``stop`` sequences. A ``seed`` makes sampling reproducible.
+        """
+        if stream or stop_when is not None:
+            return self._generate_streaming(prompt, temperature, max_tokens, stop_when, messages, context, stop, seed)
 
-    def generate(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000) -> Dict[str, Any]:
         start = time.time()
+        url, payload = self._request(prompt, temperature, max_tokens, False, messages, context, stop, seed)
         try:
-            resp = self._post({"model": self.model, "prompt": prompt, "stream": False,
-                               "temperature": temperature, "max_tokens": max_tokens})
+            with instrumentation.span("http") as span:
+                resp = self._post(payload, url=url)
         except Exception as e:
-            return {"text": "", "error": str(e), "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
-        
+            return {"text": "", "error": str(e), "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "connection_reused": False}
+
         latency = time.time() - start
+        reused = self.session.last_reused
         try:
-            text = resp.json().get("response", "")
+            with instrumentation.span("decode"):
+                body = resp.json()
+            text = chunk_text(body)
         except:
-            text = ""
+            body, text = {}, ""
 
+        usage = token_usage(body, prompt, text, latency)
+        if span is not None:
+            # How much of the HTTP span the server itself accounts for
+            span.update(reused=reused, server_time=usage["server_time"], network_time=usage["network_time"])
         return {"text": text, "latency": latency,
-                "prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split()),
+                **usage, **self._reuse(body, usage, context),
+                "truncated": body.get("done_reason") == "length",
+                "connection_reused": reused,
+                "error": "" if text else "No response"}
+
+    def _generate_streaming(self, prompt: str, temperature: float, max_tokens: int,
+                            stop_when: Optional[Callable[[str], bool]],
+                            messages: Optional[List[Dict[str, str]]] = None,
+                            context: Optional[List[int]] = None,
+                            stop: Optional[List[str]] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        start = time.time()
+        metrics = StreamMetrics(start)
+        text = ""
+        final: Dict[str, Any] = {}
+        stopped_early = False
+        try:
+            chunks = self.iter_stream(prompt, temperature, max_tokens, messages, context, stop, seed)
+            try:
+                for chunk in chunks:
+                    piece = chunk_text(chunk)
+                    if piece:
+                        metrics.record(time.time())
+                        text += piece
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+                    if stop_when is not None and stop_when(text):
+                        stopped_early = True
+                        break
+            finally:
+                chunks.close()
+        except Exception as e:
+            # Text may have arrived before the failure, and its ttft with it, so the time spent counts
+            return {"text": text, "error": str(e), "latency": time.time() - start, "prompt_tokens": 0,
+                    "completion_tokens": 0, "connection_reused": False, "stopped_early": False, **metrics.as_dict()}
+
+        # Only the final chunk carries counts and timings; an early stop falls back to estimates
+        latency = time.time() - start
+        usage = token_usage(final, prompt, text, latency)
+        return {"text": text, "latency": latency, **usage, **self._reuse(final, usage, context),
+                "truncated": final.get("done_reason") == "length",
+                "connection_reused": self.session.last_reused,
+                "stopped_early": stopped_early, **metrics.as_dict(),
                 "error": "" if text else "No response"}
@@ -0,0 +1,178 @@
+import json, time
+from typing import Dict, Any, Callable, Iterator, List, Optional
+from .baseclient import BaseLLMClient
+from .http_pool import PooledSession, DEFAULT_POOL_SIZE
+from .instrumentation import instrumentation
+from .registry import register_backend
+from .streaming import StreamMetrics
+from .tokens import estimate_tokens, prefix_reuse, token_source
+
+
+def openai_usage(body: Dict[str, Any], prompt: str, text: str) -> Dict[str, Any]:
+    """
+    Token counts from an OpenAI-style ``usage`` object, estimated locally when
+    the server sent none, plus the prompt cache reuse when the server reports
+    ``prompt_tokens_details.cached_tokens`` (vLLM, recent llama.cpp)
+    """
+    usage = body.get("usage") or {}
+    prompt_tokens = usage.get("prompt_tokens")
+    completion_tokens = usage.get("completion_tokens")
+    counts = {
+        "prompt_tokens": prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt),
+        "completion_tokens": completion_tokens if completion_tokens is not None else estimate_tokens(text),
+        "token_source": token_source(prompt_tokens, completion_tokens),
+    }
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    if cached is not None and prompt_tokens is not None:
+        counts["prefill_tokens"] = prompt_tokens - cached
+        counts.update(prefix_reuse(prompt_tokens - cached, None, total=prompt_tokens))
+    return counts
+
+
+@register_backend("openai")
+class OpenAICompatibleClient(BaseLLMClient):
+    """
+    Client for servers implementing the OpenAI chat completions API
+    (llama.cpp's server, vLLM, LM Studio, ...). Responses follow the same
+    contract as OllamaClient's; server-side timings are not available, and
+    prompt cache reuse only where the server reports its cached tokens.
+    """
+
+    def __init__(self, model: str = "default", host: str = "localhost", port: int = 8000,
+                 pool_size: int = DEFAULT_POOL_SIZE, api_key: Optional[str] = None,
+                 retries: int = 2, backoff_factor: float = 0.3):
+        self.model = model
+        self.base_url = f"http://{host}:{port}/v1"
+        self.endpoint = f"{self.base_url}/chat/completions"
+        self.pool_size = pool_size
+        self.session = PooledSession(pool_size=pool_size, retries=retries, backoff_factor=backoff_factor)
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False, url: Optional[str] = None):
+        with instrumentation.span("serialize"):
+            data = json.dumps(payload)
+        return self.session.post(url or self.endpoint, data=data, headers=self.headers, timeout=15, stream=stream)
+
+    def _payload(self, prompt: str, temperature: float, max_tokens: int, stream: bool,
+                 messages: Optional[List[Dict[str, str]]] = None, stop: Optional[List[str]] = None,
+                 seed: Optional[int] = None) -> Dict[str, Any]:
+        payload = {"model": self.model, "messages": [*(messages or []), {"role": "user", "content": prompt}],
+                   "temperature": temperature, "max_tokens": max_tokens, "stream": stream}
+        if stop:
+            payload["stop"] = list(stop)
+        if seed is not None:
+            payload["seed"] = seed
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def connection_stats(self) -> Dict[str, int]:
+        return self.session.stats()
+
+    def is_model_available(self) -> bool:
+        try:
+            resp = self.session.get(f"{self.base_url}/models", headers=self.headers, timeout=2)
+            return resp.status_code == 200 and any(m.get("id") == self.model for m in resp.json().get("data", []))
+        except:
+            return False
+
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embeddings of ``texts`` from one /v1/embeddings request, by ``model`` (default: this client's); raises on failure"""
+        resp = self._post({"model": model or self.model, "input": list(texts)}, url=f"{self.base_url}/embeddings")
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda d: d["index"])
+        return [d["embedding"] for d in data]
+
+    def iter_stream(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000,
+                    messages: Optional[List[Dict[str, str]]] = None,
+                    stop: Optional[List[str]] = None, seed: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the server-sent chat completion chunks as they arrive. Closing the
+        generator early drops the connection, which makes the server stop generating.
+        """
+        with instrumentation.span("http", stream=True):
+            resp = self._post(self._payload(prompt, temperature, max_tokens, True, messages, stop, seed), stream=True)
+        try:
+            resp.raise_for_status()
+            with instrumentation.span("stream"):
+                for line in resp.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        return
+                    yield json.loads(data)
+        finally:
+            resp.close()
+
+    def generate(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000,
+                 stream: bool = False, stop_when: Optional[Callable[[str], bool]] = None,
+                 messages: Optional[List[Dict[str, str]]] = None, stop: Optional[List[str]] = None,
+                 seed: Optional[int] = None) -> Dict[str, Any]:
+        if stream or stop_when is not None:
+            return self._generate_streaming(prompt, temperature, max_tokens, stop_when, messages, stop, seed)
+
+        start = time.time()
+        try:
+            with instrumentation.span("http"):
+                resp = self._post(self._payload(prompt, temperature, max_tokens, False, messages, stop, seed))
+        except Exception as e:
+            return {"text": "", "error": str(e), "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "connection_reused": False}
+
+        latency = time.time() - start
+        reused = self.session.last_reused
+        try:
+            with instrumentation.span("decode"):
+                body = resp.json()
+            choice = body["choices"][0]
+            text = choice["message"]["content"] or ""
+        except:
+            body, choice, text = {}, {}, ""
+
+        return {"text": text, "latency": latency,
+                **openai_usage(body, prompt, text),
+                "truncated": choice.get("finish_reason") == "length",
+                "connection_reused": reused,
+                "error": "" if text else "No response"}
+
+    def _generate_streaming(self, prompt: str, temperature: float, max_tokens: int,
+                            stop_when: Optional[Callable[[str], bool]],
+                            messages: Optional[List[Dict[str, str]]] = None,
+                            stop: Optional[List[str]] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        start = time.time()
+        metrics = StreamMetrics(start)
+        text = ""
+        usage: Dict[str, Any] = {}
+        finish_reason = None
+        stopped_early = False
+        try:
+            chunks = self.iter_stream(prompt, temperature, max_tokens, messages, stop, seed)
+            try:
+                for chunk in chunks:
+                    if chunk.get("usage"):
+                        usage = chunk
+                    choices = chunk.get("choices") or [{}]
+                    finish_reason = choices[0].get("finish_reason") or finish_reason
+                    piece = (choices[0].get("delta") or {}).get("content") or ""
+                    if piece:
+                        metrics.record(time.time())
+                        text += piece
+                    if stop_when is not None and stop_when(text):
+                        stopped_early = True
+                        break
+            finally:
+                chunks.close()
+        except Exception as e:
+            return {"text": text, "error": str(e), "latency": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+                    "connection_reused": False, "stopped_early": False, **metrics.as_dict()}
+
+        # Usage only arrives in the last chunk; an early stop falls back to estimates
+        return {"text": text, "latency": time.time() - start,
+                **openai_usage(usage, prompt, text),
+                "truncated": finish_reason == "length",
+                "connection_reused": self.session.last_reused,
+                "stopped_early": stopped_early, **metrics.as_dict(),
+                "error": "" if text else "No response"}
@@ -0,0 +1,93 @@
+"""
+Registry of LLM backends.
+
+A backend is a factory returning a BaseLLMClient, registered under a name:
+
+    @register_backend("mybackend")
+    def make_client(model=None, host=None, port=None, pool_size=8, **options):
+        return MyClient(...)
+
+Built-in backends register themselves when their module is imported; other
+packages can ship backends through the ``llm_test_suite.backends`` entry point
+group (each entry point names a module to import), or a module can be passed to
+pytest with ``--llm-plugin``. Factories receive ``model``, ``host``, ``port``
+and ``pool_size`` (None meaning the backend's default) plus any backend
+specific ``--llm-option key=value`` pairs.
+"""
+import importlib
+from importlib.metadata import entry_points
+from typing import Dict, Any, Callable, Iterable, List, Optional
+from .baseclient import BaseLLMClient
+
+ENTRY_POINT_GROUP = "llm_test_suite.backends"
+BUILTIN_BACKENDS = ("clients.ollama_client", "clients.openai_client", "clients.stub_client")
+
+_backends: Dict[str, Callable[..., BaseLLMClient]] = {}
+_plugins_loaded = False
+
+
+def register_backend(name: str):
+    """Decorator registering a client factory under ``name``"""
+
+    def register(factory: Callable[..., BaseLLMClient]) -> Callable[..., BaseLLMClient]:
+        _backends[name.lower()] = factory
+        return factory
+
+    return register
+
+
+def load_plugins(modules: Iterable[str] = ()) -> None:
+    """Import the built-in backends, entry point plugins (once) and ``modules``"""
+    global _plugins_loaded
+    if not _plugins_loaded:
+        for module in BUILTIN_BACKENDS:
+            importlib.import_module(module)
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            entry_point.load()
+        _plugins_loaded = True
+    for module in modules:
+        importlib.import_module(module)
+
+
+def available_backends() -> List[str]:
+    load_plugins()
+    return sorted(_backends)
+
+
+def create_client(name: str, **options) -> BaseLLMClient:
+    """Build a client of backend ``name``; options that are None are left to the backend's defaults"""
+    load_plugins()
+    try:
+        factory = _backends[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend '{name}', expected one of {available_backends()}") from None
+    return factory(**{k: v for k, v in options.items() if v is not None})
+
+
+def parse_options(pairs: Iterable[str]) -> Dict[str, Any]:
+    """``key=value`` strings as a dict; values that parse as numbers become numbers"""
+    options: Dict[str, Any] = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Backend option '{pair}' is not key=value")
+        for convert in (int, float):
+            try:
+                options[key] = convert(value)
+                break
+            except ValueError:
+                continue
+        else:
+            options[key] = value
+    return options
+
+
+def parse_target(spec: str) -> Dict[str, Optional[Any]]:
+    """
+    A fan-out target ``backend[:model][@host[:port]]`` as create_client options,
+    e.g. ``ollama:mistral``, ``openai:llama3@localhost:8080`` or ``stub``.
+    """
+    target, _, address = spec.partition("@")
+    backend, _, model = target.partition(":")
+    host, _, port = address.partition(":")
+    return {"backend": backend, "model": model or None, "host": host or None, "port": int(port) if port else None}
@@ -0,0 +1,46 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+def iter_ndjson(lines: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+    """Decode a newline-delimited JSON stream one object at a time"""
+    for line in lines:
+        if line:
+            yield json.loads(line)
+
+
+class StreamMetrics:
+    """
+    Arrival times of the tokens of one streamed generation.
+
+    ``ttft`` (time to first token) covers connection, queueing and prefill;
+    the gaps between later tokens are pure decode, so ``decode_tokens_per_sec``
+    is computed over them only.
+    """
+
+    def __init__(self, start: float):
+        self.start = start
+        self.arrivals: List[float] = []
+
+    def record(self, now: float) -> None:
+        self.arrivals.append(now)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.arrivals[0] - self.start if self.arrivals else None
+
+    @property
+    def inter_token_latencies(self) -> List[float]:
+        return [b - a for a, b in zip(self.arrivals, self.arrivals[1:])]
+
+    @property
+    def decode_tokens_per_sec(self) -> float:
+        if len(self.arrivals) < 2:
+            return 0.0
+        decode_time = self.arrivals[-1] - self.arrivals[0]
+        return (len(self.arrivals) - 1) / decode_time if decode_time > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ttft": self.ttft,
+                "inter_token_latencies": self.inter_token_latencies,
+                "decode_tokens_per_sec": self.decode_tokens_per_sec}
@@ -0,0 +1,98 @@
+import json, os, random, time
+from typing import Dict, Any, Callable, List, Optional, Union
+from .baseclient import BaseLLMClient
+from .embeddings import hashed_embedding
+from .registry import register_backend
+from .streaming import StreamMetrics
+from .tokens import estimate_tokens, split_pieces
+
+SUITE_PROFILE = os.path.join(os.path.dirname(__file__), os.pardir, "harness", "profiles", "suite.json")
+DEFAULT_RESPONSE = "I'm not sure."
+
+
+def find_answer(answers: List[Dict[str, Any]], prompt: str, default: str, seed: Optional[int] = None,
+                rng: Union[random.Random, Any] = random) -> str:
+    """
+    Canned answer to ``prompt``, as the mock server's profiles script it: the
+    first of ``answers`` whose ``match`` occurs in the prompt
+    (case-insensitively), otherwise ``default``. An entry with ``responses``
+    instead of ``response`` samples one of them, picked by ``seed`` when
+    given and by ``rng`` otherwise.
+    """
+    lowered = prompt.lower()
+    for entry in answers:
+        if entry["match"].lower() in lowered:
+            if "responses" not in entry:
+                return entry["response"]
+            return (random.Random(seed) if seed is not None else rng).choice(entry["responses"])
+    return default
+
+
+@register_backend("stub")
+class StubClient(BaseLLMClient):
+    """
+    In-process backend answering from a table, for exercising the harness with
+    no server at all. ``profile`` is a JSON file in the mock server's format
+    (only ``answers``, ``default_response``, ``tokens_per_sec`` and ``seed``
+    are used) and answers prompts as the mock server does (see find_answer);
+    arguments given explicitly take precedence over the profile. ``latency``
+    seconds pass before the first token and, with ``tokens_per_sec``,
+    generation is paced like a real decode. Embeddings are hashed bags of
+    words (see clients.embeddings). ``host``, ``port`` and ``pool_size``,
+    which every backend is passed, mean nothing here; any other option is a
+    TypeError.
+    """
+
+    def __init__(self, model: str = "stub", profile: Optional[str] = SUITE_PROFILE, latency: float = 0.0,
+                 tokens_per_sec: Optional[float] = None, answers: Optional[List[Dict[str, Any]]] = None,
+                 default_response: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None,
+                 pool_size: Optional[int] = None):
+        spec: Dict[str, Any] = {}
+        if profile:
+            with open(profile) as f:
+                spec = json.load(f)
+        self.model = model
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec if tokens_per_sec is not None else spec.get("tokens_per_sec")
+        self.answers = answers if answers is not None else spec.get("answers", [])
+        self.default_response = (default_response if default_response is not None
+                                 else spec.get("default_response", DEFAULT_RESPONSE))
+        self._rng = random.Random(spec.get("seed", 0))
+
+    def is_model_available(self) -> bool:
+        return True
+
+    def answer(self, prompt: str, seed: Optional[int] = None) -> str:
+        return find_answer(self.answers, prompt, self.default_response, seed, self._rng)
+
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        return [hashed_embedding(text) for text in texts]
+
+    def generate(self, prompt: str, temperature: float = 0.8, max_tokens: int = 1000,
+                 stream: bool = False, stop_when: Optional[Callable[[str], bool]] = None,
+                 messages: Optional[List[Dict[str, str]]] = None, stop: Optional[List[str]] = None,
+                 seed: Optional[int] = None) -> Dict[str, Any]:
+        # Answers depend on the latest turn only, so earlier ``messages`` are ignored
+        start = time.time()
+        metrics = StreamMetrics(start)
+        time.sleep(self.latency)
+        answer = self.answer(prompt, seed)
+        for sequence in stop or ():
+            answer = answer.split(sequence, 1)[0]
+        tokens = split_pieces(answer)
+        text, stopped_early = "", False
+        for i, token in enumerate(tokens[:max_tokens]):
+            if i and self.tokens_per_sec:
+                time.sleep(1 / self.tokens_per_sec)
+            metrics.record(time.time())
+            text += token
+            if stop_when is not None and stop_when(text):
+                stopped_early = True
+                break
+        response = {"text": text, "latency": time.time() - start,
+                    "prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text),
+                    "token_source": "estimate", "truncated": len(tokens) > max_tokens and not stopped_early,
+                    "error": "" if text else "No response"}
+        if stream or stop_when is not None:
+            response.update(stopped_early=stopped_early, **metrics.as_dict())
+        return response
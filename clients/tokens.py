@@ -0,0 +1,105 @@
+import hashlib, math, re, threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+# Pre-tokenization as in llama-family vocabularies: words with their leading space,
+# single digits, single punctuation marks
+_PIECES = re.compile(r" ?[^\W\d_]+| ?\d| ?[^\s\w]|\s+")
+_NS = 1e9
+_ESTIMATE_CACHE_SIZE = 8192
+
+# Recent estimates keyed by a digest of the text, so the cache holds no texts
+_estimates: "OrderedDict[bytes, int]" = OrderedDict()
+_estimates_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate subword token count for when the server does not report one.
+
+    Mirrors how subword vocabularies split text: every punctuation mark and
+    digit is a token, common words of up to six letters are one token and
+    longer words cost one more token per five further letters. The last few
+    thousand estimates are cached by a digest of the text.
+    """
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _estimates_lock:
+        count = _estimates.get(key)
+        if count is not None:
+            _estimates.move_to_end(key)
+            return count
+    count = 0
+    for piece in _PIECES.findall(text):
+        word = piece.strip()
+        if word:
+            count += 1 + math.ceil(max(0, len(word) - 6) / 5) if word.isalpha() else 1
+    with _estimates_lock:
+        _estimates[key] = count
+        if len(_estimates) > _ESTIMATE_CACHE_SIZE:
+            _estimates.popitem(last=False)
+    return count
+
+
+def split_pieces(text: str) -> List[str]:
+    """The pre-tokenization pieces estimate_tokens counts, whitespace runs included"""
+    return _PIECES.findall(text)
+
+
+def token_source(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> str:
+    """Where the counts of a response came from, given those the server reported (None for the others)"""
+    reported = (prompt_tokens is not None) + (completion_tokens is not None)
+    return ("estimate", "mixed", "server")[reported]
+
+
+def _seconds(body: Dict[str, Any], field: str) -> Optional[float]:
+    value = body.get(field)
+    return value / _NS if value is not None else None
+
+
+def token_usage(body: Dict[str, Any], prompt: str, text: str, latency: float) -> Dict[str, Any]:
+    """
+    Token counts and server-side timings of an Ollama generate response.
+
+    Counts come from ``prompt_eval_count``/``eval_count`` when present (Ollama
+    omits the prompt count when the whole prompt was served from its cache) and
+    are estimated locally otherwise; ``token_source`` says which: "server",
+    "estimate", or "mixed" when only one of them was reported.
+    ``prefill_tokens`` is the server's own count of the prompt tokens it
+    prefilled (0 when it omitted the count), None without final statistics.
+    Durations are converted from nanoseconds to seconds, and ``network_time``
+    is whatever part of the client-side latency the server did not account for.
+    """
+    prompt_tokens = body.get("prompt_eval_count")
+    completion_tokens = body.get("eval_count")
+    server_time = _seconds(body, "total_duration")
+    return {
+        "prompt_tokens": prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt),
+        "completion_tokens": completion_tokens if completion_tokens is not None else estimate_tokens(text),
+        "token_source": token_source(prompt_tokens, completion_tokens),
+        "prefill_tokens": (prompt_tokens or 0) if completion_tokens is not None else None,
+        "load_time": _seconds(body, "load_duration"),
+        "prefill_time": _seconds(body, "prompt_eval_duration"),
+        "decode_time": _seconds(body, "eval_duration"),
+        "server_time": server_time,
+        "network_time": max(0.0, latency - server_time) if server_time is not None else None,
+    }
+
+
+def prefix_reuse(prefilled: Optional[int], prefill_time: Optional[float], total: Optional[int] = None,
+                 prefix: Optional[int] = None) -> Dict[str, Any]:
+    """
+    How many prompt tokens the server took from its prompt (KV) cache instead
+    of prefilling them, and the prefill time that saved at the prefill rate of
+    this request, from server counts only. ``prefilled`` is the server's count
+    of the tokens it prefilled. With the prompt's length ``total`` as the
+    server counted it the figures are exact; with only ``prefix``, the length
+    the server counted for the part repeated from an earlier call, the reuse
+    is a lower bound (what of that prefix was not prefilled) and so is
+    ``prompt_total_tokens``. Unknown (None) without either, as local token
+    estimates would pass their own error off as reuse.
+    """
+    if prefilled is None or (total is None and prefix is None):
+        return {"prompt_total_tokens": None, "reused_tokens": None, "prefill_saved": None}
+    reused = max(0, (total if total is not None else prefix) - prefilled)
+    return {"prompt_total_tokens": prefilled + reused, "reused_tokens": reused,
+            "prefill_saved": reused * prefill_time / prefilled if prefill_time and prefilled else None}
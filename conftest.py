@@ -1,50 +1,541 @@
 # conftest.py
+import asyncio
+import json
+import os
+import warnings
 import pytest
-import allure
-from functools import wraps
-from clients.ollama_client import OllamaClient
+from urllib.parse import urlsplit
+from clients.async_ollama_client import AsyncOllamaClient
+from clients.http_pool import DEFAULT_POOL_SIZE
+from clients.coalescing import CoalescingClient
+from clients.balancer import BalancedClient, BALANCE_STRATEGIES, parse_hosts
+from clients.cache import CachedClient, ResponseCache, client_source, CACHE_MODES, DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES
+from clients.registry import create_client, load_plugins, parse_options
+from harness.fanout import RunMetrics
+from harness.budgets import GenerationBudgets, DEFAULT_HEADROOM
+from harness.benchmark import run_benchmark, DEFAULT_SAMPLES, DEFAULT_WARMUP
+from harness.history import (PerfHistory, PerfRegressionWarning, format_trend, REGRESSION_MODES,
+                             DEFAULT_HISTORY_PATH, DEFAULT_BASELINE_RUNS, DEFAULT_ALPHA, DEFAULT_MIN_CHANGE)
+from harness.mock_server import MockOllamaServer, MockProfile
+from harness.prefixes import PrefixCacheReport, DEFAULT_HIT_SHARE
+from harness.reporting import AllureReporting, RecordingClient, SuiteTrace, DEFAULT_MAX_TEXT, DEFAULT_MAX_ATTACHMENTS
+from harness.sampling import (SelfConsistency, DEFAULT_PASS_RATE, DEFAULT_CONFIDENCE,
+                              DEFAULT_SAMPLE_PARALLEL)
+from harness.similarity import (SemanticMatcher, local_embedder, SIMILARITY_MODES, DEFAULT_LOCAL_MODEL,
+                                DEFAULT_THRESHOLD, DEFAULT_BATCH_SIZE)
+from harness.scheduler import DurationHistory, HostThroughput, ModelSlots, ThrottledClient
+
+SUITE_MOCK_PROFILE = os.path.join(os.path.dirname(__file__), "harness", "profiles", "suite.json")
 
 
 def pytest_addoption(parser):
     parser.addoption(
-        "--llm", action="store", default="ollama", help="Choose which LLM client to use"
+        "--llm", action="store", default="ollama",
+        help="Backend to test: ollama, openai (any OpenAI-compatible server), stub or one a plugin registers"
+    )
+    parser.addoption(
+        "--llm-model", action="store", default=None, help="Model to test (defaults to the backend's default)"
+    )
+    parser.addoption(
+        "--llm-host", action="store", default=None, help="Host of the model server"
+    )
+    parser.addoption(
+        "--llm-port", action="store", type=int, default=None, help="Port of the model server"
+    )
+    parser.addoption(
+        "--llm-hosts", action="store", default=None, metavar="HOST[:PORT],...",
+        help="Spread requests over several model servers (overrides --llm-host/--llm-port and --llm-mock)"
+    )
+    parser.addoption(
+        "--llm-balance", action="store", default="least-outstanding", choices=BALANCE_STRATEGIES,
+        help="How --llm-hosts picks a server: fewest requests in flight, or lowest expected wait"
+    )
+    parser.addoption(
+        "--llm-option", action="append", default=[], metavar="KEY=VALUE",
+        help="Backend specific client option, e.g. --llm-option api_key=... (repeatable)"
+    )
+    parser.addoption(
+        "--llm-plugin", action="append", default=[], metavar="MODULE",
+        help="Import this module so the backends it registers can be selected with --llm (repeatable)"
+    )
+    parser.addoption(
+        "--llm-metrics", action="store", default=None,
+        help="Write per-test outcomes and per-call latency/tokens to this JSON file (used by harness.fanout)"
+    )
+    parser.addoption(
+        "--llm-mock", action="store", nargs="?", const=SUITE_MOCK_PROFILE, default=None,
+        help="Run against a local mock server (Ollama and OpenAI APIs) driven by this JSON profile "
+             "(without a value: canned answers for this suite)"
+    )
+    parser.addoption(
+        "--llm-pool-size", action="store", type=int, default=DEFAULT_POOL_SIZE,
+        help="Keep-alive connections the client pools; match it to the parallelism of the run"
+    )
+    parser.addoption(
+        "--llm-cache", action="store", default="passthrough", choices=CACHE_MODES,
+        help="Response cache mode: passthrough (off), record (serve hits, store misses) "
+             "or replay (cache only, no model needed). Performance tests bypass it, and replay skips them"
+    )
+    parser.addoption(
+        "--llm-cache-dir", action="store", default=DEFAULT_CACHE_DIR, help="Directory of the response cache"
+    )
+    parser.addoption(
+        "--llm-cache-max-bytes", action="store", type=int, default=DEFAULT_CACHE_MAX_BYTES,
+        help="Size above which least recently used cached responses are evicted"
+    )
+    parser.addoption(
+        "--llm-coalesce", action="store_true", default=False,
+        help="Share one upstream call between concurrent identical requests"
+    )
+    parser.addoption(
+        "--llm-batch-window", action="store", type=float, default=0.0,
+        help="Seconds to gather distinct concurrent requests into one burst (0 disables; implies --llm-coalesce)"
+    )
+    parser.addoption(
+        "--llm-warmup", action="store_true", default=False,
+        help="Load the model into memory once before the first test so no test absorbs the cold start"
+    )
+    parser.addoption(
+        "--llm-keep-alive", action="store", default="30m",
+        help="How long the server keeps the model (and its prompt cache) loaded after each request, "
+             "e.g. 30m, 3600 or -1 for ever; empty leaves it to the server (Ollama backends)"
+    )
+    parser.addoption(
+        "--llm-prefix-report", action="store_true", default=False,
+        help="Report the latency of calls that hit the server's prompt cache against those that missed it"
+    )
+    parser.addoption(
+        "--llm-prefix-hit-share", action="store", type=float, default=DEFAULT_HIT_SHARE,
+        help="Share of its prompt a call must take from the prompt cache to count as a hit"
+    )
+    parser.addoption(
+        "--llm-model-capacity", action="store", type=int, default=None,
+        help="Requests per model allowed in flight across all pytest-xdist workers, at least 1 "
+             "(defaults to $OLLAMA_NUM_PARALLEL or 4)"
+    )
+    parser.addoption(
+        "--llm-longest-first", action="store_true", default=False,
+        help="Run tests slowest first according to previous runs, to shorten parallel runs"
+    )
+    parser.addoption(
+        "--llm-budgets", action="store_true", default=False,
+        help="Cap the tokens generated per call with budgets learnt per test category from earlier runs"
+    )
+    parser.addoption(
+        "--llm-budget-headroom", action="store", type=float, default=DEFAULT_HEADROOM,
+        help="Factor over the longest natural answer a category's first budget allows"
+    )
+    parser.addoption(
+        "--llm-samples", action="store", type=int, default=1,
+        help="Judge each test by its pass rate over up to this many seeded samples, "
+             "stopping as soon as the verdict is statistically decided"
+    )
+    parser.addoption(
+        "--llm-seed", action="store", type=int, default=0,
+        help="Seed of a test's first sample; sample i uses this plus i"
+    )
+    parser.addoption(
+        "--llm-sample-parallel", action="store", type=int, default=DEFAULT_SAMPLE_PARALLEL,
+        help="Samples of a test drawn at once"
+    )
+    parser.addoption(
+        "--llm-pass-rate", action="store", type=float, default=DEFAULT_PASS_RATE,
+        help="Share of a test's samples that must pass"
+    )
+    parser.addoption(
+        "--llm-confidence", action="store", type=float, default=DEFAULT_CONFIDENCE,
+        help="Confidence level over all the looks at the pass rate interval that can decide a sampled test early"
+    )
+    parser.addoption(
+        "--llm-similarity", action="store", default="off", choices=SIMILARITY_MODES,
+        help="Let the summary check accept paraphrases of its reference summary, judged by embeddings from "
+             "the backend's embedding endpoint or a local sentence-transformers model"
+    )
+    parser.addoption(
+        "--llm-embed-model", action="store", default=None,
+        help=f"Embedding model (default: the tested model, or {DEFAULT_LOCAL_MODEL} with --llm-similarity=local)"
+    )
+    parser.addoption(
+        "--llm-similarity-threshold", action="store", type=float, default=DEFAULT_THRESHOLD,
+        help="Cosine similarity to a reference answer at which a check without its own threshold passes"
+    )
+    parser.addoption(
+        "--llm-embed-batch", action="store", type=int, default=DEFAULT_BATCH_SIZE,
+        help="Texts per embedding request"
+    )
+    parser.addoption(
+        "--llm-report-max-chars", action="store", type=int, default=DEFAULT_MAX_TEXT,
+        help="Characters of each prompt and response kept in the Allure report"
+    )
+    parser.addoption(
+        "--llm-report-max-responses", action="store", type=int, default=DEFAULT_MAX_ATTACHMENTS,
+        help="Responses per test attached to the Allure report as text (all calls appear in the metadata)"
+    )
+    parser.addoption(
+        "--llm-trace", action="store", default=None,
+        help="Write a Chrome trace (chrome://tracing, ui.perfetto.dev) of every test and the phases "
+             "of its client calls to this file"
+    )
+    parser.addoption(
+        "--perf-history", action="store", default=DEFAULT_HISTORY_PATH,
+        help="SQLite file performance results are appended to (empty to disable)"
+    )
+    parser.addoption(
+        "--perf-regression", action="store", default="warn", choices=REGRESSION_MODES,
+        help="What a significant slowdown against the rolling baseline does: off, warn or fail"
+    )
+    parser.addoption(
+        "--perf-baseline-runs", action="store", type=int, default=DEFAULT_BASELINE_RUNS,
+        help="Previous runs (same model and host) whose medians make up the baseline"
+    )
+    parser.addoption(
+        "--perf-alpha", action="store", type=float, default=DEFAULT_ALPHA,
+        help="Significance level of the regression test"
+    )
+    parser.addoption(
+        "--perf-min-change", action="store", type=float, default=DEFAULT_MIN_CHANGE,
+        help="Smallest relative change of the median that counts as a regression"
+    )
+    parser.addoption(
+        "--perf-report", action="store", default=None,
+        help="Write the trend of every recorded metric (latest --perf-baseline-runs runs) to this JSON file"
+    )
+    parser.addoption(
+        "--bench-samples", action="store", type=int, default=DEFAULT_SAMPLES,
+        help="Measured runs per performance benchmark"
+    )
+    parser.addoption(
+        "--bench-warmup", action="store", type=int, default=DEFAULT_WARMUP,
+        help="Discarded runs before each performance benchmark"
     )
 
 
-@pytest.fixture
-def llm_client(request):
+def pytest_runtest_setup(item):
+    # Performance tests bypass the cache and need the model, which replay mode doesn't check for
+    if item.config.getoption("--llm-cache") == "replay" and item.get_closest_marker("performance") is not None:
+        pytest.skip("Performance tests measure the model, which --llm-cache=replay doesn't contact.")
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(
+        DurationHistory(config, longest_first=config.getoption("--llm-longest-first")), "llm-duration-history"
+    )
+    config.pluginmanager.register(HostThroughput(config), "llm-host-throughput")
+    config.addinivalue_line("markers", "llm_budget(tokens=None, stop=None): generation budget of this test's calls")
+    config.addinivalue_line("markers", "llm_samples(n, pass_rate=None): judge this test over up to n seeded samples")
+    config.pluginmanager.register(
+        SelfConsistency(config, samples=config.getoption("--llm-samples"), seed=config.getoption("--llm-seed"),
+                        parallel=config.getoption("--llm-sample-parallel"),
+                        pass_rate=config.getoption("--llm-pass-rate"),
+                        confidence=config.getoption("--llm-confidence")), "llm-self-consistency"
+    )
+    # Replayed runs generate nothing, so there is nothing to budget or learn from
+    budgets = config.getoption("--llm-budgets") and config.getoption("--llm-cache") != "replay"
+    config.pluginmanager.register(
+        GenerationBudgets(config, enabled=budgets, headroom=config.getoption("--llm-budget-headroom")),
+        "llm-generation-budgets"
+    )
+    config.pluginmanager.register(
+        AllureReporting(config, max_text=config.getoption("--llm-report-max-chars"),
+                        max_attachments=config.getoption("--llm-report-max-responses")), "llm-allure-reporting"
+    )
+    # pytest-xdist workers inherit the environment, so all of them record under the controller's run id
+    os.environ.setdefault("LLM_PERF_RUN_ID", f"{os.getpid()}-{os.urandom(4).hex()}")
+    if config.getoption("--llm-trace"):
+        config.pluginmanager.register(SuiteTrace(config.getoption("--llm-trace")), "llm-suite-trace")
+    if config.getoption("--llm-metrics"):
+        config.pluginmanager.register(RunMetrics(config.getoption("--llm-metrics")), "llm-run-metrics")
+    if config.getoption("--llm-prefix-report"):
+        config.pluginmanager.register(
+            PrefixCacheReport(config, hit_share=config.getoption("--llm-prefix-hit-share")), "llm-prefix-report"
+        )
+
+
+def _cache_source(config, client):
+    """Cache key source of a mock run: its profile, since the mock's port changes every session"""
+    profile = config.getoption("--llm-mock")
+    if profile is None:
+        return None
+    return client_source(client).rsplit("@", 1)[0] + f"@mock:{os.path.basename(profile)}"
+
+
+def _keep_alive(config):
+    """--llm-keep-alive as Ollama takes it: seconds as a number, a duration as a string; None when empty"""
+    value = config.getoption("--llm-keep-alive")
+    return parse_options([f"keep_alive={value}"])["keep_alive"] if value else None
+
+
+@pytest.fixture(scope="session")
+def llm_cache(request):
+    """
+    Session-wide response cache, or None when --llm-cache is passthrough.
+    """
+    if request.config.getoption("--llm-cache") == "passthrough":
+        yield None
+        return
+    cache = ResponseCache(request.config.getoption("--llm-cache-dir"),
+                          request.config.getoption("--llm-cache-max-bytes"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture(scope="session")
+def llm_endpoint(request):
+    """
+    (host, port) of the model server: a mock server started for the session
+    with --llm-mock, --llm-host/--llm-port otherwise (None leaves it to the backend's default).
     """
-    Fixture that returns the selected LLM client.
+    profile_path = request.config.getoption("--llm-mock")
+    if profile_path is None:
+        yield request.config.getoption("--llm-host"), request.config.getoption("--llm-port")
+        return
+    with MockOllamaServer(MockProfile.from_file(profile_path)) as server:
+        yield server.host, server.port
+
+
+@pytest.fixture(scope="session")
+def llm_backend(request, llm_endpoint):
+    """
+    Session-wide client shared by every test of this (xdist worker) process.
+    Availability is checked once; if the model is down every test using it is skipped.
     """
     client_name = request.config.getoption("--llm")
+    load_plugins(request.config.getoption("--llm-plugin"))
 
-    if client_name.lower() == "ollama":
-        client = OllamaClient()
-    else:
-        pytest.fail(f"Unknown LLM client: {client_name}")
+    hosts_spec = request.config.getoption("--llm-hosts")
+    endpoints = parse_hosts(hosts_spec) if hosts_spec else [llm_endpoint]
+    clients = []
+    for host, port in endpoints:
+        try:
+            client = create_client(client_name, model=request.config.getoption("--llm-model"), host=host, port=port,
+                                   pool_size=request.config.getoption("--llm-pool-size"),
+                                   **parse_options(request.config.getoption("--llm-option")))
+        except (TypeError, ValueError) as e:
+            pytest.fail(f"Can't create LLM client '{client_name}': {e}")
+        # Keep the model warm for the session, unless --llm-option keep_alive=... said otherwise
+        if getattr(client, "keep_alive", False) is None:
+            client.keep_alive = _keep_alive(request.config)
+        # Capacity is per server, so each host gets its own slots
+        try:
+            slots = ModelSlots(f"{getattr(client, 'endpoint', client_name)}/{client.model}",
+                               request.config.getoption("--llm-model-capacity"))
+        except ValueError as e:
+            pytest.fail(f"Can't size the model's request slots: {e}")
+        clients.append(ThrottledClient(client, slots))
+
+    client = clients[0]
+    if len(clients) > 1:
+        balanced = client = BalancedClient(clients, strategy=request.config.getoption("--llm-balance"))
+        report = request.config.pluginmanager.get_plugin("llm-host-throughput")
+        request.addfinalizer(lambda: report.add(balanced.host_stats()))
 
-    if not client.is_model_available():
+    batch_window = request.config.getoption("--llm-batch-window")
+    if request.config.getoption("--llm-coalesce") or batch_window > 0:
+        client = CoalescingClient(client, batch_window=batch_window,
+                                  max_batch=request.config.getoption("--llm-pool-size"))
+        request.addfinalizer(client.close)
+
+    # Replayed runs never talk to the model, so they must not depend on it being up
+    if request.config.getoption("--llm-cache") != "replay" and not client.is_model_available():
         pytest.skip(f"Model '{client_name}' is not available.")
 
+    if (request.config.getoption("--llm-warmup") and request.config.getoption("--llm-cache") != "replay"
+            and hasattr(client, "warm_up")):
+        client.warm_up()
+
     return client
 
 
-@pytest.fixture(autouse=True)
-def attach_llm_responses(monkeypatch, llm_client):
+@pytest.fixture
+def llm_client(request, llm_backend, llm_cache):
     """
-    Automatically attach LLM responses to Allure for any test using llm_client.
+    Fixture that returns the selected LLM client. Its calls are reported to Allure
+    (response text and latency/token metadata) without slowing the test down.
     """
-    original_generate = llm_client.generate
+    client = llm_backend
+    # Cached latencies are meaningless, so performance tests always hit the model
+    if llm_cache is not None and request.node.get_closest_marker("performance") is None:
+        client = CachedClient(llm_backend, llm_cache, request.config.getoption("--llm-cache"),
+                              source=_cache_source(request.config, llm_backend))
+    # Budgets would change what performance tests measure
+    if request.node.get_closest_marker("performance") is None:
+        client = request.config.pluginmanager.get_plugin("llm-generation-budgets").wrap(
+            client, request.node, source=_cache_source(request.config, llm_backend))
+
+    log = request.config.pluginmanager.get_plugin("llm-allure-reporting").response_log()
+    if log is None:
+        yield client
+        return
+    yield RecordingClient(client, log)
+    log.close()
 
-    @wraps(original_generate)
-    def wrapper(*args, **kwargs):
-        response = original_generate(*args, **kwargs)
-        if "text" in response and response["text"]:
-            allure.attach(
-                response["text"],
-                name="LLM Response",
-                attachment_type=allure.attachment_type.TEXT
-            )
-        return response
 
-    monkeypatch.setattr(llm_client, "generate", wrapper)
+@pytest.fixture(scope="session")
+def similarity(request):
+    """
+    SemanticMatcher for paraphrase-tolerant answer checks, or None when
+    --llm-similarity is off and the checks stay exact. Embeddings are kept
+    under the response cache directory.
+    """
+    mode = request.config.getoption("--llm-similarity")
+    if mode == "off":
+        return None
+    model = request.config.getoption("--llm-embed-model")
+    if mode == "local":
+        model = model or DEFAULT_LOCAL_MODEL
+        try:
+            embed = local_embedder(model)
+        except ImportError as e:
+            pytest.fail(str(e))
+        name = f"local-{model}"
+    else:
+        backend = request.getfixturevalue("llm_backend")
+        client_name = request.config.getoption("--llm")
+        if not hasattr(backend, "embed"):
+            pytest.fail(f"Backend '{client_name}' has no embedding endpoint, use --llm-similarity=local")
+        embed = lambda texts: backend.embed(texts, model=model)
+        name = f"{client_name}-{model or backend.model}"
+    return SemanticMatcher(embed, name, os.path.join(request.config.getoption("--llm-cache-dir"), "embeddings"),
+                           threshold=request.config.getoption("--llm-similarity-threshold"),
+                           batch_size=request.config.getoption("--llm-embed-batch"))
+
+
+def _server_label(config, client):
+    if config.getoption("--llm-hosts"):
+        return config.getoption("--llm-hosts")
+    profile_path = config.getoption("--llm-mock")
+    if profile_path is not None:
+        return f"mock:{os.path.basename(profile_path)}"
+    base_url = getattr(client, "base_url", None)
+    return urlsplit(base_url).netloc if base_url else config.getoption("--llm")
+
+
+@pytest.fixture(scope="session")
+def perf_history(request, llm_backend):
+    """
+    Session-wide PerfHistory for the model and server under test, or None with --perf-history=''.
+    """
+    path = request.config.getoption("--perf-history")
+    if not path:
+        yield None
+        return
+    history = PerfHistory(path, llm_backend.model, _server_label(request.config, llm_backend),
+                          run_id=os.environ["LLM_PERF_RUN_ID"])
+    yield history
+    history.close()
+
+
+@pytest.fixture
+def perf_record(request, perf_history):
+    """
+    Fixture that returns record(name, samples, unit="s", higher_is_better=False), which stores
+    the samples in the performance history and checks them against the rolling baseline:
+    a significant regression warns or fails the test according to --perf-regression.
+    """
+    config = request.config
+
+    def record(name, samples, unit="s", higher_is_better=False):
+        if perf_history is None:
+            return None
+        metric = f"{request.node.nodeid}::{name}"
+        comparison = None
+        if config.getoption("--perf-regression") != "off":
+            comparison = perf_history.compare(metric, samples, unit, higher_is_better,
+                                              runs=config.getoption("--perf-baseline-runs"),
+                                              alpha=config.getoption("--perf-alpha"),
+                                              min_change=config.getoption("--perf-min-change"))
+        perf_history.record(metric, samples, unit, higher_is_better)
+        if comparison is not None and comparison.regressed:
+            if config.getoption("--perf-regression") == "fail":
+                pytest.fail(comparison.describe())
+            warnings.warn(comparison.describe(), PerfRegressionWarning)
+        return comparison
+
+    return record
+
+
+@pytest.fixture
+def llm_benchmark(request, llm_client, perf_record):
+    """
+    Fixture that returns bench(prompt, metric="latency", **generate_kwargs), which samples
+    the prompt --bench-samples times after --bench-warmup discarded runs and returns a
+    BenchmarkResult. ``metric`` is a response key or a function of the response. All
+    samples go to the performance history (see perf_record).
+    """
+    samples = request.config.getoption("--bench-samples")
+    warmup = request.config.getoption("--bench-warmup")
+
+    def bench(prompt, metric="latency", name=None, unit="s", higher_is_better=False, **kwargs):
+        def measure():
+            response = llm_client.generate(prompt, **kwargs)
+            if response.get("error"):
+                pytest.fail(f"LLM request failed: {response['error']}")
+            return metric(response) if callable(metric) else response[metric]
+
+        result = run_benchmark(measure, name or prompt, samples=samples, warmup=warmup, unit=unit)
+        perf_record(result.name, result.samples, unit, higher_is_better)
+        return result
+
+    return bench
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Compare this run's metrics with their baselines and write the --perf-report trend"""
+    path = config.getoption("--perf-history")
+    if hasattr(config, "workerinput") or not path or not os.path.exists(path):
+        return
+    history = PerfHistory.of_run(path, os.environ["LLM_PERF_RUN_ID"])
+    if history is None:
+        return
+    try:
+        metrics = history.run_metrics()
+        terminalreporter.section("performance history")
+        for m in metrics:
+            comparison = history.compare(m["metric"], m["samples"], m["unit"], m["higher_is_better"],
+                                         runs=config.getoption("--perf-baseline-runs"),
+                                         alpha=config.getoption("--perf-alpha"),
+                                         min_change=config.getoption("--perf-min-change"))
+            terminalreporter.write_line(comparison.describe() if comparison else
+                                        f"{m['metric']}: no baseline yet")
+        report = config.getoption("--perf-report")
+        if report:
+            trend = history.trend(config.getoption("--perf-baseline-runs"))
+            with open(report, "w") as f:
+                json.dump(trend, f, indent=2)
+            terminalreporter.write_line(f"Trend report written to {report}")
+            terminalreporter.write_line(format_trend(trend))
+    finally:
+        history.close()
+
+
+async def _probe_async_client(client):
+    try:
+        return await client.ais_model_available()
+    finally:
+        await client.aclose()
+
+
+@pytest.fixture
+def async_llm_client(request, llm_endpoint):
+    """
+    Fixture that returns the asyncio flavor of the selected LLM client.
+    Tests drive it with asyncio.run(); the client binds to whichever loop uses it.
+    The client runs raw: unlike llm_client its calls take no ModelSlots (only
+    its own max_concurrency bounds them), never hit the response cache and are
+    not seen by instrumentation hooks (traces, --llm-metrics, Allure records).
+    """
+    client_name = request.config.getoption("--llm")
+
+    if client_name.lower() != "ollama":
+        pytest.skip(f"No asyncio client for backend '{client_name}'.")
+    host, port = llm_endpoint
+    options = {k: v for k, v in (("model", request.config.getoption("--llm-model")), ("host", host),
+                                 ("port", port)) if v is not None}
+    client = AsyncOllamaClient(max_concurrency=request.config.getoption("--llm-pool-size"),
+                               keep_alive=_keep_alive(request.config), **options)
+
+    if not asyncio.run(_probe_async_client(client)):
+        pytest.skip(f"Model '{client_name}' is not available.")
+
+    return client
+
@@ -0,0 +1,124 @@
+import math, random, statistics
+from typing import Callable, List, Optional, Tuple
+
+DEFAULT_SAMPLES = 10
+DEFAULT_WARMUP = 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    """q-th percentile (0-100) with linear interpolation between closest ranks"""
+    if not values:
+        raise ValueError("percentile of empty data")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def reject_outliers(values: List[float], k: float = 1.5,
+                    min_spread: float = 0.05) -> Tuple[List[float], List[float]]:
+    """
+    Split values into (kept, rejected) using Tukey's fences at ``k`` interquartile
+    ranges. The range is taken as at least ``min_spread`` of the median, so tightly
+    clustered samples do not get their ordinary jitter rejected.
+    """
+    if len(values) < 4:
+        return list(values), []
+    q1, q3 = percentile(values, 25), percentile(values, 75)
+    spread = max(q3 - q1, min_spread * abs(percentile(values, 50)))
+    low, high = q1 - k * spread, q3 + k * spread
+    kept = [v for v in values if low <= v <= high]
+    return kept, [v for v in values if not low <= v <= high]
+
+
+class BenchmarkResult:
+    """
+    Samples of one benchmark after warm-up.
+
+    Percentiles, and so percentile budgets and the performance history, use
+    every sample: the slow tail is what they are there to catch. Only the mean
+    and stdev and their confidence interval use the samples left after outlier
+    rejection (``kept``), so one hiccup doesn't swing them. Confidence
+    intervals are seeded bootstrap intervals, so the same samples always give
+    the same interval.
+    """
+
+    def __init__(self, name: str, samples: List[float], rejected: List[float], unit: str = "s"):
+        self.name = name
+        self.samples = samples
+        self.rejected = rejected
+        self.unit = unit
+        kept = list(samples)
+        for value in rejected:
+            kept.remove(value)
+        self.kept = kept
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.kept)
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.kept) if len(self.kept) > 1 else 0.0
+
+    def percentile(self, q: float) -> float:
+        return percentile(self.samples, q)
+
+    def resolves(self, q: float) -> bool:
+        """
+        Whether there are enough samples for the q-th percentile to be more than
+        the extreme value: at least one sample must lie beyond it (n >= 100 / (100 - q)).
+        """
+        return q <= 50 or len(self.samples) * (100 - q) >= 100
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p90(self) -> float:
+        return self.percentile(90)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+    def ci(self, q: Optional[float] = None, confidence: float = 0.95,
+           resamples: int = 1000, seed: int = 0) -> Tuple[float, float]:
+        """Bootstrap confidence interval of the q-th percentile (all samples), or of the mean when q is None"""
+        rng = random.Random(seed)
+        values = self.kept if q is None else self.samples
+        n = len(values)
+        stat = statistics.fmean if q is None else (lambda xs: percentile(xs, q))
+        estimates = sorted(stat([rng.choice(values) for _ in range(n)]) for _ in range(resamples))
+        tail = (1 - confidence) / 2 * 100
+        return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+    def assert_percentile(self, q: float, max: Optional[float] = None, min: Optional[float] = None) -> None:
+        value = self.percentile(q)
+        if max is not None:
+            assert value <= max, f"{self.name}: p{q:g} {value:.3f}{self.unit} exceeds {max}{self.unit}\n{self.summary()}"
+        if min is not None:
+            assert value >= min, f"{self.name}: p{q:g} {value:.3f}{self.unit} below {min}{self.unit}\n{self.summary()}"
+
+    def summary(self) -> str:
+        low, high = self.ci()
+        tails = " ".join(f"p{q}={self.percentile(q):.3f}{self.unit}" + ("" if self.resolves(q) else "(~max)")
+                         for q in (50, 90, 99))
+        note = "" if self.resolves(99) else f" (~max: {len(self.samples)} samples can't tell it from the slowest run)"
+        return (f"{self.name}: n={len(self.samples)} mean={self.mean:.3f}{self.unit} "
+                f"[95% CI {low:.3f}-{high:.3f}, {len(self.rejected)} outliers left out] {tails}{note}")
+
+
+def run_benchmark(measure: Callable[[], float], name: str = "benchmark", samples: int = DEFAULT_SAMPLES,
+                  warmup: int = DEFAULT_WARMUP, reject: bool = True, unit: str = "s") -> BenchmarkResult:
+    """
+    Call ``measure`` ``warmup`` times discarding the results, then ``samples``
+    times collecting the value it returns. With ``reject`` Tukey outliers are
+    marked as ``rejected``; they still count for percentiles.
+    """
+    for _ in range(warmup):
+        measure()
+    values = [measure() for _ in range(samples)]
+    rejected = reject_outliers(values)[1] if reject else []
+    return BenchmarkResult(name, values, rejected, unit)
@@ -0,0 +1,208 @@
+"""
+Adaptive generation budgets per test category.
+
+Most checks are settled by the first few tokens of an answer, yet every call
+may generate up to ``max_tokens``. With budgets on, each category (the pytest
+markers in pytest.ini) gets a token budget per model and backend, as answer
+lengths differ between them, learnt from earlier runs and kept in pytest's
+cache:
+
+* a category with no budget yet runs unlimited and records how long its
+  answers naturally are; the budget starts at the longest of them times a
+  headroom factor,
+* while its tests pass, the budget shrinks: straight to the longest answer
+  seen when every answer finished well under it, by a fixed factor
+  otherwise, so it keeps probing toward the length the checks need,
+* when a test fails with a cut-off answer, the budget doubles and never goes
+  back to the size that failed.
+
+A test can set its own budget and stop sequences with
+``@pytest.mark.llm_budget(tokens=32, stop=["\\n\\n"])``; ``tokens=None`` exempts
+it. Explicit ``max_tokens``/``stop`` arguments always win, and performance
+tests are never budgeted. The end of the run reports the calls cut short and
+the generation time that saved, estimated from each category's natural
+answer length and the decode time per token.
+"""
+import math, statistics
+from typing import Dict, Any, List, Optional, Tuple
+from clients.baseclient import BaseLLMClient
+from clients.cache import client_source, innermost
+from .bulk import pytest_markers
+
+DEFAULT_HEADROOM = 1.5
+MIN_BUDGET = 8
+MAX_BUDGET = 1000
+SHRINK = 0.8
+NATURAL_HISTORY = 50
+UNCATEGORIZED = "uncategorized"
+
+
+class BudgetedClient(BaseLLMClient):
+    """
+    Wraps a client so calls without their own ``max_tokens``/``stop`` get the
+    test's budget; chat sessions started from it (BaseLLMClient.chat_session)
+    send their turns through it too.
+    """
+
+    def __init__(self, client: BaseLLMClient, max_tokens: Optional[int] = None, stop: Optional[List[str]] = None,
+                 calls: Optional[List[Dict[str, Any]]] = None):
+        self.client = client
+        self.max_tokens = max_tokens
+        self.stop = stop
+        self.calls = calls if calls is not None else []
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def is_model_available(self) -> bool:
+        return self.client.is_model_available()
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        if self.max_tokens is not None:
+            kwargs.setdefault("max_tokens", self.max_tokens)
+        if self.stop:
+            kwargs.setdefault("stop", self.stop)
+        response = self.client.generate(prompt, **kwargs)
+        if not response.get("error") and not response.get("cached"):
+            tokens = response.get("completion_tokens") or 0
+            decode_time = response.get("decode_time") or response.get("latency") or 0.0
+            self.calls.append({"completion_tokens": tokens, "truncated": bool(response.get("truncated")),
+                               "budget": self.max_tokens if kwargs.get("max_tokens") == self.max_tokens else None,
+                               "seconds_per_token": decode_time / tokens if tokens else None})
+        return response
+
+
+class GenerationBudgets:
+    """
+    Pytest plugin holding the budgets: hands each test its budget, collects
+    the calls of every test (from all pytest-xdist workers, through the
+    reports' user properties) and updates the budgets when the run ends.
+    Budgets are kept per scope, the model and the backend serving it (see
+    scope), and within it per category.
+    """
+
+    CACHE_KEY = "llm/budgets-by-model"
+    PROPERTY = "llm_budget_calls"
+
+    def __init__(self, config, enabled: bool = False, headroom: float = DEFAULT_HEADROOM):
+        self.config = config
+        self.enabled = enabled
+        self.headroom = headroom
+        self.cache = getattr(config, "cache", None)
+        self.state: Dict[str, Dict[str, Dict[str, Any]]] = self.cache.get(self.CACHE_KEY, {}) if self.cache else {}
+        self.categories = pytest_markers()
+        self.outcomes: Dict[str, str] = {}
+        self.results: Dict[Tuple[str, str], List[Tuple[str, List[Dict[str, Any]]]]] = {}
+        self.report: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    @staticmethod
+    def scope(client: BaseLLMClient, source: Optional[str] = None) -> str:
+        """
+        ``model@backend`` of the innermost client, the backend being its class
+        and endpoint; ``source`` replaces the backend, as for cache keys
+        """
+        return f"{getattr(innermost(client), 'model', '')}@{source or client_source(client)}"
+
+    def category(self, item) -> str:
+        for marker in item.iter_markers():
+            if marker.name in self.categories:
+                return marker.name
+        return UNCATEGORIZED
+
+    def budget_for(self, item, scope: str) -> Tuple[Optional[int], Optional[List[str]]]:
+        """(max_tokens, stop) for a test: its llm_budget marker, else its category's learnt budget in ``scope``"""
+        marker = item.get_closest_marker("llm_budget")
+        if marker is not None:
+            return marker.kwargs.get("tokens", marker.args[0] if marker.args else None), marker.kwargs.get("stop")
+        if not self.enabled:
+            return None, None
+        return self.state.get(scope, {}).get(self.category(item), {}).get("budget"), None
+
+    def wrap(self, client: BaseLLMClient, item, source: Optional[str] = None) -> BaseLLMClient:
+        """
+        The test's client with its budget applied and, with budgets on, its
+        calls recorded for learning; ``source`` as for scope
+        """
+        scope = self.scope(client, source)
+        max_tokens, stop = self.budget_for(item, scope)
+        if not self.enabled:
+            return client if max_tokens is None and not stop else BudgetedClient(client, max_tokens, stop)
+        calls: List[Dict[str, Any]] = []
+        # User properties travel with the reports, so the xdist controller sees every worker's calls
+        item.user_properties.append((self.PROPERTY, (scope, self.category(item), calls)))
+        return BudgetedClient(client, max_tokens, stop, calls)
+
+    def pytest_runtest_logreport(self, report):
+        if not self.enabled:
+            return
+        if report.failed or (report.when == "call" and report.nodeid not in self.outcomes):
+            self.outcomes[report.nodeid] = report.outcome
+        if report.when == "teardown":
+            outcome = self.outcomes.pop(report.nodeid, "passed")
+            recorded = dict(report.user_properties).get(self.PROPERTY)
+            if recorded and recorded[2]:
+                scope, category, calls = recorded
+                self.results.setdefault((scope, category), []).append((outcome, calls))
+
+    def learn(self, scope: str, category: str, results: List[Tuple[str, List[Dict[str, Any]]]]) -> None:
+        entry = self.state.setdefault(scope, {}).setdefault(category,
+                                                            {"budget": None, "floor": MIN_BUDGET, "natural": []})
+        budget = entry["budget"]
+        natural = [c["completion_tokens"] for _, calls in results for c in calls
+                   if c["budget"] is None and not c["truncated"]]
+        entry["natural"] = (entry["natural"] + natural)[-NATURAL_HISTORY:]
+        failed_cut = any(outcome == "failed" and any(c["truncated"] for c in calls) for outcome, calls in results)
+        failed = any(outcome == "failed" for outcome, _ in results)
+
+        if budget is None:
+            if natural:
+                entry["budget"] = min(MAX_BUDGET, max(entry["floor"], math.ceil(max(natural) * self.headroom)))
+        elif failed_cut:
+            entry["floor"] = budget + 1
+            entry["budget"] = min(MAX_BUDGET, budget * 2)
+        elif not failed:
+            # Answers of steady length are never cut, so shrinking only after cuts would never start
+            longest = max((c["completion_tokens"] for _, calls in results for c in calls), default=budget)
+            entry["budget"] = max(entry["floor"], min(int(budget * SHRINK), longest))
+
+    def time_saved(self, scope: str, category: str) -> Tuple[int, float]:
+        """
+        Calls of this run cut short by the budget, and the decode time not spent
+        on them: each would have run to the average natural length of the
+        category's answers longer than where it was cut.
+        """
+        natural = self.state.get(scope, {}).get(category, {}).get("natural", [])
+        cut, saved = 0, 0.0
+        for _, calls in self.results.get((scope, category), []):
+            for c in calls:
+                if c["truncated"] and c["budget"] is not None:
+                    cut += 1
+                    longer = [n for n in natural if n > c["completion_tokens"]]
+                    if longer and c["seconds_per_token"]:
+                        saved += (statistics.fmean(longer) - c["completion_tokens"]) * c["seconds_per_token"]
+        return cut, saved
+
+    def pytest_sessionfinish(self, session):
+        if not self.enabled or hasattr(self.config, "workerinput"):
+            return
+        self.report = {key: self.time_saved(*key) for key in self.results}
+        for (scope, category), results in self.results.items():
+            self.learn(scope, category, results)
+        if self.cache is not None:
+            self.cache.set(self.CACHE_KEY, self.state)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.report:
+            return
+        terminalreporter.section("generation budgets")
+        total = 0.0
+        scopes = {scope for scope, _ in self.report}
+        for scope, category in sorted(self.report):
+            cut, saved = self.report[scope, category]
+            total += saved
+            budget = self.state[scope][category]["budget"]
+            # The model is enough to tell scopes apart in most runs
+            label = category if len(scopes) == 1 else f"{category} ({scope})"
+            terminalreporter.write_line(f"{label}: budget {budget if budget is not None else '-'} tokens next run, "
+                                        f"{cut} calls cut short, ~{saved:.2f}s generation saved")
+        terminalreporter.write_line(f"Total generation time saved: ~{total:.2f}s")
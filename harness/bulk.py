@@ -0,0 +1,310 @@
+"""
+Bulk evaluation of JSONL datasets.
+
+Each input line is one case::
+
+    {"id": "capital-de", "prompt": "What is the capital of Germany?",
+     "params": {"temperature": 0.0}, "tags": ["functionality"],
+     "check": {"type": "contains_any", "expected": ["berlin"]}}
+
+Cases are read lazily and run through the client with bounded parallelism;
+each result is appended to the output JSONL as soon as it is known. The output
+doubles as the checkpoint: rerunning with the same output skips every case
+already recorded there, so a crashed run resumes where it stopped. Tags use
+the pytest marker names from pytest.ini (functionality, hallucination, ...).
+Cases are validated as they are read (and the whole dataset before a CLI run
+starts); a case whose request or check still raises is recorded as failed
+with the error rather than ending the run.
+Cases are sent grouped by prompt prefix (``--prefix-window`` cases at a
+time), so prompts sharing a template reuse the server's prompt cache; the
+summary compares the latency of the calls that hit it with those that missed.
+
+    python -m harness.bulk cases.jsonl --out results.jsonl --tags hallucination --workers 8
+"""
+import argparse, configparser, hashlib, json, os, re
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .matchers import keywords
+from .prefixes import PrefixCacheStats, group_by_prefix, DEFAULT_PREFIX_WINDOW
+from .results import StreamingStats
+
+CheckResult = Tuple[bool, str]
+
+# Each check gets the response text and the case's "check" object; keyword checks
+# honour optional "word_boundary" and "case_sensitive" flags in it.
+
+
+def _keywords(check: Dict[str, Any]):
+    return keywords(check["expected"], check.get("word_boundary", False), check.get("case_sensitive", False))
+
+
+def _contains_any(text: str, check: Dict[str, Any]) -> CheckResult:
+    found = _keywords(check).found(text)
+    return bool(found), f"found {sorted(found)}" if found else f"none of {check['expected']}"
+
+
+def _contains_all(text: str, check: Dict[str, Any]) -> CheckResult:
+    missing = _keywords(check).missing(text)
+    return not missing, f"missing {missing}" if missing else "all present"
+
+
+def _not_contains(text: str, check: Dict[str, Any]) -> CheckResult:
+    found = _keywords(check).found(text)
+    return not found, f"unexpected {sorted(found)}" if found else "none present"
+
+
+def _regex(text: str, check: Dict[str, Any]) -> CheckResult:
+    match = _compiled_regex(check["expected"]).search(text)
+    return match is not None, f"matched {match.group(0)!r}" if match else f"no match for /{check['expected']}/"
+
+
+@lru_cache(maxsize=1024)
+def _compiled_regex(pattern: str) -> "re.Pattern":
+    return re.compile(pattern, flags=re.IGNORECASE | re.MULTILINE)
+
+
+def _number(text: str, check: Dict[str, Any]) -> CheckResult:
+    numbers = [int(n) for n in re.findall(r"\d+", text)]
+    return check["expected"] in numbers, f"numbers {numbers}"
+
+
+def _min_numbered_items(text: str, check: Dict[str, Any]) -> CheckResult:
+    count = len(re.findall(r"^\d+\.\s+\S+", text, flags=re.MULTILINE))
+    return count >= check["expected"], f"{count} numbered items"
+
+
+def _json_fields(text: str, check: Dict[str, Any]) -> CheckResult:
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError as e:
+        return False, f"invalid JSON: {e}"
+    if isinstance(parsed, list):
+        parsed = parsed[0] if parsed else None
+    if not isinstance(parsed, dict):
+        return False, f"expected JSON object, got {type(parsed).__name__}"
+    wrong = {k: parsed.get(k) for k, v in check["expected"].items() if str(parsed.get(k)) != str(v)}
+    return not wrong, f"wrong fields {wrong}" if wrong else "fields match"
+
+
+CHECKS: Dict[str, Callable[[str, Dict[str, Any]], CheckResult]] = {
+    "contains_any": _contains_any,
+    "contains_all": _contains_all,
+    "not_contains": _not_contains,
+    "regex": _regex,
+    "number": _number,
+    "min_numbered_items": _min_numbered_items,
+    "json_fields": _json_fields,
+}
+
+
+def pytest_markers(ini_path: str = os.path.join(os.path.dirname(__file__), os.pardir, "pytest.ini")) -> Set[str]:
+    """Marker names registered in pytest.ini, which double as dataset tags"""
+    parser = configparser.ConfigParser()
+    parser.read(ini_path)
+    lines = parser.get("pytest", "markers", fallback="").splitlines()
+    return {line.split(":")[0].strip() for line in lines if line.strip()}
+
+
+def case_id(case: Dict[str, Any]) -> str:
+    """The case's ``id``, or a stable hash of its content when it has none"""
+    if "id" in case:
+        return str(case["id"])
+    blob = json.dumps({k: case.get(k) for k in ("prompt", "params", "check")}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def case_problems(case: Any, markers: Set[str]) -> List[str]:
+    """What is wrong with a case: missing prompt, tags that aren't ``markers``, an unknown or incomplete check"""
+    if not isinstance(case, dict):
+        return ["not a JSON object"]
+    problems = []
+    if not isinstance(case.get("prompt"), str):
+        problems.append("no prompt")
+    if not isinstance(case.get("params", {}), dict):
+        problems.append("params is not an object")
+    tags = case.get("tags", [])
+    if not isinstance(tags, list):
+        problems.append("tags is not a list")
+    elif set(tags) - markers:
+        problems.append(f"unknown tags {sorted(set(tags) - markers)}")
+    check = case.get("check")
+    if check is not None:
+        if not isinstance(check, dict) or check.get("type") not in CHECKS:
+            problems.append(f"unknown check {check!r}, expected a type from {sorted(CHECKS)}")
+        elif "expected" not in check:
+            problems.append(f"{check['type']} check without 'expected'")
+    return problems
+
+
+def _lines(path: str) -> Iterator[Tuple[int, str]]:
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield number, line
+
+
+def dataset_problems(path: str, markers: Optional[Set[str]] = None) -> List[str]:
+    """Every invalid line of a JSONL dataset as ``"line N: problem"``, read in one lazy pass"""
+    markers = pytest_markers() if markers is None else markers
+    found = []
+    for number, line in _lines(path):
+        try:
+            problems = case_problems(json.loads(line), markers)
+        except ValueError as e:
+            problems = [f"invalid JSON: {e}"]
+        found += [f"line {number}: {problem}" for problem in problems]
+    return found
+
+
+def read_cases(path: str, tags: Optional[Set[str]] = None,
+               markers: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield cases from a JSONL file, keeping only those with one of
+    ``tags``; an invalid case (see case_problems) raises ValueError
+    """
+    markers = pytest_markers() if markers is None else markers
+    for number, line in _lines(path):
+        case = json.loads(line)
+        problems = case_problems(case, markers)
+        if problems:
+            raise ValueError(f"{path}, line {number}: {'; '.join(problems)}")
+        if tags and not tags.intersection(case.get("tags", [])):
+            continue
+        yield case
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    Ids already recorded in a results file. A torn last line (the run died
+    mid-write) is cut off so appending continues on a clean line boundary.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            f.truncate(end)
+    done = set()
+    for line in data[:end].splitlines():
+        try:
+            done.add(json.loads(line)["id"])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+
+def evaluate(client, case: Dict[str, Any], prefix_cache: Optional[PrefixCacheStats] = None) -> Dict[str, Any]:
+    """
+    The result record of one case. A request or check that raises (e.g. an
+    unknown generation parameter) fails just this case, with the exception as
+    its error or detail, so the run goes on and a resumed run skips the case.
+    """
+    try:
+        response = client.generate(case["prompt"], **case.get("params", {}))
+    except Exception as e:
+        response = {"error": f"{type(e).__name__}: {e}"}
+    if prefix_cache is not None:
+        prefix_cache.add(response)
+    record = {"id": case_id(case), "tags": case.get("tags", []),
+              "latency": response.get("latency"), "completion_tokens": response.get("completion_tokens"),
+              "error": response.get("error", ""), "text": response.get("text", "")}
+    check = case.get("check")
+    if record["error"]:
+        record.update(passed=False, detail=f"LLM request failed: {record['error']}")
+    elif check is None:
+        record.update(passed=True, detail="no check")
+    else:
+        try:
+            passed, detail = CHECKS[check["type"]](record["text"], check)
+        except Exception as e:
+            passed, detail = False, f"check {check.get('type')!r} raised {type(e).__name__}: {e}"
+        record.update(passed=passed, detail=detail)
+    return record
+
+
+def run_dataset(client, cases: Iterable[Dict[str, Any]], out_path: str, workers: int = 4,
+                on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Evaluate ``cases`` with at most ``workers`` requests in flight (and at most
+    twice that many cases read ahead), appending each result to ``out_path``.
+    Cases already in ``out_path`` are skipped. Returns pass/fail totals per tag,
+    the latency and completion token statistics of this run's cases,
+    aggregated as results arrive, and the prompt cache hits and misses.
+    """
+    done = completed_ids(out_path)
+    totals: Counter = Counter()
+    per_tag: Dict[str, Counter] = {}
+    latency, tokens = StreamingStats(), StreamingStats()
+    prefix_cache = PrefixCacheStats()
+
+    def record(result: Dict[str, Any]) -> None:
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        outcome = "passed" if result["passed"] else "failed"
+        totals[outcome] += 1
+        if not result["error"]:
+            latency.add(result["latency"] or 0.0)
+            tokens.add(result["completion_tokens"] or 0)
+        for tag in result["tags"]:
+            per_tag.setdefault(tag, Counter())[outcome] += 1
+        if on_result is not None:
+            on_result(result)
+
+    with open(out_path, "a") as out, ThreadPoolExecutor(workers) as pool:
+        pending = set()
+        for case in cases:
+            if case_id(case) in done:
+                totals["skipped"] += 1
+                continue
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future.result())
+            pending.add(pool.submit(evaluate, client, case, prefix_cache))
+        for future in wait(pending).done:
+            record(future.result())
+
+    return {"totals": dict(totals), "tags": {tag: dict(c) for tag, c in per_tag.items()},
+            "latency": latency.as_dict(), "completion_tokens": tokens.as_dict(),
+            "prefix_cache": prefix_cache.as_dict()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from clients.registry import available_backends, create_client
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("dataset", help="Input JSONL of cases")
+    parser.add_argument("--out", required=True, help="Results JSONL; also the resume checkpoint")
+    parser.add_argument("--tags", help="Comma-separated tags (pytest markers) to run")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--backend", default="ollama", choices=available_backends())
+    parser.add_argument("--model", default=None, help="Model to run (defaults to the backend's default)")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--prefix-window", type=int, default=DEFAULT_PREFIX_WINDOW,
+                        help="Cases read ahead and reordered so prompts sharing a prefix run together "
+                             "(0 keeps the order)")
+    args = parser.parse_args(argv)
+
+    tags = set(args.tags.split(",")) if args.tags else None
+    unknown = (tags or set()) - pytest_markers()
+    if unknown:
+        parser.error(f"unknown tags {sorted(unknown)}; expected pytest markers {sorted(pytest_markers())}")
+    # A bad case is found before any request is sent, not hours into the run
+    problems = dataset_problems(args.dataset)
+    if problems:
+        more = f"\n... and {len(problems) - 20} more" if len(problems) > 20 else ""
+        parser.error(f"invalid cases in {args.dataset}:\n" + "\n".join(problems[:20]) + more)
+
+    client = create_client(args.backend, model=args.model, host=args.host, port=args.port, pool_size=args.workers)
+    cases = group_by_prefix(read_cases(args.dataset, tags), key=lambda case: case["prompt"], window=args.prefix_window)
+    summary = run_dataset(client, cases, args.out, args.workers)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Run the suite against several backends/models concurrently and compare them.
+
+Each target is ``backend[:model][@host[:port]]``; every target gets its own
+pytest process (arguments after ``--`` are passed to all of them), which
+records per-test outcomes and per-call latency and tokens with --llm-metrics.
+The results are printed side by side: pass rate, latency percentiles,
+throughput and the tests whose outcome differs between targets.
+
+    python -m harness.fanout --target ollama:tinyllama --target ollama:mistral --target stub -- -m functionality
+"""
+import argparse, glob, json, os, subprocess, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import pytest
+
+from clients.instrumentation import Hooks, instrumentation
+from clients.registry import parse_target
+from .results import StreamingStats
+
+
+class RunMetrics(Hooks):
+    """
+    Pytest plugin writing the outcome of every test and the aggregated latency
+    and token counts of the model calls to a JSON file; calls are folded into
+    the totals as they happen, so memory stays flat however many there are.
+    Only the innermost client's calls count, so wrappers and cache hits don't
+    inflate the numbers. Under pytest-xdist each worker writes its own file,
+    suffixed with the worker id.
+    """
+
+    def __init__(self, path: str):
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        root, ext = os.path.splitext(path)
+        self.path = f"{root}.{worker}{ext}" if worker else path
+        self.tests: Dict[str, str] = {}
+        self.calls = self.errors = self.completion_tokens = 0
+        self.latency = StreamingStats()
+        self.start = time.time()
+        self._lock = threading.Lock()
+        instrumentation.add(self)
+
+    def after_request(self, client, prompt: str, response: Dict[str, Any]) -> None:
+        if hasattr(client, "client"):
+            return
+        with self._lock:
+            self.calls += 1
+            if response.get("error"):
+                self.errors += 1
+            else:
+                self.latency.add(response.get("latency", 0.0))
+                self.completion_tokens += response.get("completion_tokens") or 0
+
+    def pytest_runtest_logreport(self, report):
+        # Setup skips and teardown errors decide the outcome as much as the call phase
+        if report.when == "call" or report.outcome != "passed":
+            self.tests[report.nodeid] = report.outcome
+
+    def pytest_unconfigure(self, config):
+        instrumentation.remove(self)
+        with open(self.path, "w") as f:
+            json.dump({"backend": config.getoption("--llm"), "model": config.getoption("--llm-model"),
+                       "wall_time": time.time() - self.start, "tests": self.tests, "calls": self.calls,
+                       "errors": self.errors, "completion_tokens": self.completion_tokens,
+                       "latency": self.latency.to_json()}, f)
+
+
+def load_metrics(path: str) -> Dict[str, Any]:
+    """The metrics of one run, merged over the files its pytest-xdist workers wrote"""
+    root, ext = os.path.splitext(path)
+    merged: Dict[str, Any] = {"wall_time": 0.0, "tests": {}, "calls": 0, "errors": 0, "completion_tokens": 0,
+                              "latency": StreamingStats()}
+    # The run's own file, or one per pytest-xdist worker (not those of targets whose name starts alike)
+    for name in glob.glob(glob.escape(path)) + glob.glob(glob.escape(root) + ".gw*" + ext):
+        with open(name) as f:
+            part = json.load(f)
+        merged["wall_time"] = max(merged["wall_time"], part["wall_time"])
+        merged["tests"].update(part["tests"])
+        for key in ("calls", "errors", "completion_tokens"):
+            merged[key] += part[key]
+        merged["latency"].merge(StreamingStats.from_json(part["latency"]))
+    return merged
+
+
+def summarize(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    outcomes = list(metrics["tests"].values())
+    passed, failed = outcomes.count("passed"), outcomes.count("failed")
+    latency: StreamingStats = metrics["latency"]
+    return {
+        "passed": passed, "failed": failed, "skipped": outcomes.count("skipped"),
+        "pass_rate": passed / (passed + failed) if passed + failed else None,
+        "calls": metrics["calls"], "errors": metrics["errors"],
+        "p50_latency": latency.percentile(50) if latency.count else None,
+        "p95_latency": latency.percentile(95) if latency.count else None,
+        "tokens_per_sec": metrics["completion_tokens"] / latency.total if latency.total else None,
+        "wall_time": metrics["wall_time"],
+    }
+
+
+def differing_tests(runs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+    """Tests whose outcome is not the same for every target (a test a target didn't run counts as "-")"""
+    names = sorted({name for metrics in runs.values() for name in metrics["tests"]})
+    table = {name: {target: metrics["tests"].get(name, "-") for target, metrics in runs.items()} for name in names}
+    return {name: outcomes for name, outcomes in table.items() if len(set(outcomes.values())) > 1}
+
+
+def format_comparison(summaries: Dict[str, Dict[str, Any]], differences: Dict[str, Dict[str, str]]) -> str:
+    rows = [("pass rate", "pass_rate", "{:.1%}"), ("passed", "passed", "{}"), ("failed", "failed", "{}"),
+            ("skipped", "skipped", "{}"), ("calls", "calls", "{}"), ("errors", "errors", "{}"),
+            ("p50 latency", "p50_latency", "{:.3f}s"), ("p95 latency", "p95_latency", "{:.3f}s"),
+            ("tokens/sec", "tokens_per_sec", "{:.1f}"), ("wall time", "wall_time", "{:.1f}s")]
+    targets = list(summaries)
+    width = max([12] + [len(t) for t in targets])
+    lines = [" " * 12 + "".join(f"  {t:>{width}}" for t in targets)]
+    for label, key, fmt in rows:
+        cells = [fmt.format(s[key]) if s[key] is not None else "-" for s in summaries.values()]
+        lines.append(f"{label:<12}" + "".join(f"  {c:>{width}}" for c in cells))
+    if differences:
+        lines.append("")
+        lines.append(f"{len(differences)} tests differ:")
+        for name, outcomes in differences.items():
+            lines.append(f"  {name}: " + ", ".join(f"{t}={o}" for t, o in outcomes.items()))
+    return "\n".join(lines)
+
+
+def pytest_command(target: str, metrics_path: str, pytest_args: List[str]) -> List[str]:
+    spec = parse_target(target)
+    command = [sys.executable, "-m", "pytest", "-q", f"--llm={spec['backend']}", f"--llm-metrics={metrics_path}"]
+    for option in ("model", "host", "port"):
+        if spec[option] is not None:
+            command.append(f"--llm-{option}={spec[option]}")
+    return command + pytest_args
+
+
+def run_target(target: str, workdir: str, pytest_args: List[str]) -> Dict[str, Any]:
+    name = "".join(c if c.isalnum() else "_" for c in target)
+    metrics_path = os.path.join(workdir, f"{name}.json")
+    env = dict(os.environ)
+    # Each target is its own performance history run
+    env.pop("LLM_PERF_RUN_ID", None)
+    with open(os.path.join(workdir, f"{name}.log"), "w") as log:
+        code = subprocess.run(pytest_command(target, metrics_path, pytest_args), stdout=log,
+                              stderr=subprocess.STDOUT, env=env).returncode
+    metrics = load_metrics(metrics_path)
+    metrics["exit_code"] = code
+    return metrics
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    pytest_args: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, pytest_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", action="append", required=True,
+                        help="backend[:model][@host[:port]], e.g. ollama:mistral or openai:llama3@localhost:8080")
+    parser.add_argument("--max-parallel", type=int, default=None, help="Targets run at once (default: all)")
+    parser.add_argument("--workdir", default=None, help="Keep each target's metrics and pytest log here")
+    parser.add_argument("--out", default=None, help="Write the summaries and differing tests to this JSON file")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="llm-fanout-")
+    os.makedirs(workdir, exist_ok=True)
+    with ThreadPoolExecutor(args.max_parallel or len(args.target)) as pool:
+        futures = {t: pool.submit(run_target, t, workdir, pytest_args) for t in args.target}
+        runs = {t: f.result() for t, f in futures.items()}
+
+    summaries = {t: summarize(metrics) for t, metrics in runs.items()}
+    differences = differing_tests(runs)
+    print(format_comparison(summaries, differences))
+    for target, metrics in runs.items():
+        if not metrics["tests"]:
+            print(f"{target}: no tests ran (exit code {metrics['exit_code']}), see {workdir}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"targets": summaries, "differences": differences}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Persisted performance history and regression detection.
+
+Every performance measurement is stored in a local SQLite file, one row per
+metric per run, keyed by model, host and commit. The median of a new
+measurement is compared with the medians of the previous runs on the same
+model and host (the rolling baseline): one value per run, since samples of
+one run share its conditions and pooling them would overstate the evidence,
+tested one-sided against the Student t prediction interval of the baseline
+runs. A change counts as a regression only if it is both significant and
+larger than a minimum relative change.
+
+    python -m harness.history --model tinyllama --runs 10
+"""
+import argparse, json, math, os, sqlite3, statistics, subprocess, threading, time
+from typing import Dict, Any, List, Optional, Sequence
+
+DEFAULT_HISTORY_PATH = os.path.join(".llm_perf", "history.sqlite")
+DEFAULT_BASELINE_RUNS = 10
+DEFAULT_ALPHA = 0.01
+DEFAULT_MIN_CHANGE = 0.10
+MIN_BASELINE_RUNS = 3
+REGRESSION_MODES = ("off", "warn", "fail")
+
+
+class PerfRegressionWarning(UserWarning):
+    pass
+
+
+def current_commit() -> str:
+    """Commit of the checked-out tree ($LLM_PERF_COMMIT overrides), or "unknown" outside git"""
+    commit = os.environ.get("LLM_PERF_COMMIT")
+    if commit:
+        return commit
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return out.stdout.strip() or "unknown"
+
+
+def _beta_fraction(a: float, b: float, x: float) -> float:
+    """Continued fraction of the incomplete beta function (modified Lentz)"""
+    tiny = 1e-300
+    c, d = 1.0, 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        for aa in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                   -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + aa * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + aa / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1) < 1e-12:
+            break
+    return h
+
+
+def _beta_regularized(a: float, b: float, x: float) -> float:
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _beta_fraction(a, b, x) / a
+    return 1 - front * _beta_fraction(b, a, 1 - x) / b
+
+
+def t_sf(t: float, df: float) -> float:
+    """P(T > t) for Student's t distribution with ``df`` degrees of freedom"""
+    tail = 0.5 * _beta_regularized(df / 2, 0.5, df / (df + t * t))
+    return tail if t >= 0 else 1 - tail
+
+
+def prediction_p(current: float, baseline: Sequence[float], greater: bool = True) -> float:
+    """
+    One-sided p-value that a run whose median is ``current`` is greater (or,
+    with ``greater=False``, smaller) than the medians of the earlier runs in
+    ``baseline`` allow for: the Student t prediction of one more run from
+    them. Each run counts once however many samples it took, so a metric
+    measured once per run is judged as fairly as one measured a hundred times.
+    """
+    n = len(baseline)
+    if n < 2:
+        return 1.0
+    excess = current - statistics.fmean(baseline) if greater else statistics.fmean(baseline) - current
+    spread = statistics.stdev(baseline)
+    if spread == 0:
+        return 0.0 if excess > 0 else 1.0
+    return t_sf(excess / (spread * math.sqrt(1 + 1 / n)), n - 1)
+
+
+class Comparison:
+    """A metric of this run against its rolling baseline, the medians of earlier runs"""
+
+    def __init__(self, metric: str, unit: str, current: Sequence[float], baseline: Sequence[float],
+                 higher_is_better: bool, alpha: float, min_change: float):
+        self.metric = metric
+        self.unit = unit
+        self.current = statistics.median(current)
+        self.baseline = statistics.median(baseline)
+        self.baseline_runs = len(baseline)
+        self.change = (self.current - self.baseline) / self.baseline if self.baseline else 0.0
+        self.p_value = prediction_p(self.current, baseline, greater=not higher_is_better)
+        worse = -self.change if higher_is_better else self.change
+        self.regressed = self.p_value < alpha and worse >= min_change
+
+    def describe(self) -> str:
+        verdict = "REGRESSION" if self.regressed else "ok"
+        return (f"{self.metric}: median {self.current:.3f}{self.unit} vs baseline {self.baseline:.3f}{self.unit} "
+                f"over {self.baseline_runs} runs ({self.change:+.1%}, p={self.p_value:.4f}) {verdict}")
+
+
+class PerfHistory:
+    """
+    History store for one model on one host. ``run_id`` groups the metrics of
+    one suite run (all pytest-xdist workers share it); baselines never include
+    the current run.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, model: str = "", host: str = "",
+                 commit: Optional[str] = None, run_id: Optional[str] = None):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.model = model
+        self.host = host
+        self.commit = commit or current_commit()
+        self.run_id = run_id or f"{time.time():.6f}-{os.getpid()}"
+        self._lock = threading.Lock()
+        # Workers of one run write concurrently; wait for each other's transactions
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (run_id TEXT, metric TEXT, model TEXT, host TEXT, "
+                         "commit_id TEXT, recorded_at REAL, unit TEXT, higher_is_better INTEGER, "
+                         "median REAL, samples TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_metric ON results (metric, model, host, recorded_at)")
+        self._db.commit()
+
+    @classmethod
+    def of_run(cls, path: str, run_id: str) -> Optional["PerfHistory"]:
+        """The history ``run_id`` recorded into, with its model and host; None if it recorded nothing"""
+        history = cls(path, run_id=run_id, commit="-")
+        with history._lock:
+            row = history._db.execute("SELECT model, host, commit_id FROM results WHERE run_id = ? LIMIT 1",
+                                      (run_id,)).fetchone()
+        if row is None:
+            history.close()
+            return None
+        history.model, history.host, history.commit = row
+        return history
+
+    def record(self, metric: str, samples: Sequence[float], unit: str = "s", higher_is_better: bool = False) -> None:
+        with self._lock:
+            self._db.execute("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (self.run_id, metric, self.model, self.host, self.commit, time.time(), unit,
+                              int(higher_is_better), statistics.median(samples), json.dumps(list(samples))))
+            self._db.commit()
+
+    def baseline(self, metric: str, runs: int = DEFAULT_BASELINE_RUNS) -> List[List[float]]:
+        """Samples of ``metric`` from the latest ``runs`` earlier runs, newest first"""
+        with self._lock:
+            rows = self._db.execute("SELECT samples FROM results WHERE metric = ? AND model = ? AND host = ? "
+                                    "AND run_id != ? ORDER BY recorded_at DESC LIMIT ?",
+                                    (metric, self.model, self.host, self.run_id, runs)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def compare(self, metric: str, samples: Sequence[float], unit: str = "s", higher_is_better: bool = False,
+                runs: int = DEFAULT_BASELINE_RUNS, alpha: float = DEFAULT_ALPHA,
+                min_change: float = DEFAULT_MIN_CHANGE) -> Optional[Comparison]:
+        """
+        Compare the median of ``samples`` with the medians of the earlier runs;
+        None until there are MIN_BASELINE_RUNS of them
+        """
+        history = self.baseline(metric, runs)
+        if len(history) < MIN_BASELINE_RUNS or not samples:
+            return None
+        medians = [statistics.median(run) for run in history if run]
+        return Comparison(metric, unit, samples, medians, higher_is_better, alpha, min_change)
+
+    def run_metrics(self) -> List[Dict[str, Any]]:
+        """Metrics recorded by the current run"""
+        with self._lock:
+            rows = self._db.execute("SELECT metric, unit, higher_is_better, samples FROM results "
+                                    "WHERE run_id = ? ORDER BY recorded_at", (self.run_id,)).fetchall()
+        return [{"metric": m, "unit": u, "higher_is_better": bool(h), "samples": json.loads(s)}
+                for m, u, h, s in rows]
+
+    def trend(self, runs: int = DEFAULT_BASELINE_RUNS) -> Dict[str, List[Dict[str, Any]]]:
+        """Per metric, the medians of the latest ``runs`` runs, oldest first"""
+        with self._lock:
+            rows = self._db.execute("SELECT metric, run_id, commit_id, recorded_at, median, unit FROM results "
+                                    "WHERE model = ? AND host = ? ORDER BY recorded_at DESC",
+                                    (self.model, self.host)).fetchall()
+        trend: Dict[str, List[Dict[str, Any]]] = {}
+        for metric, run_id, commit, recorded_at, median, unit in rows:
+            points = trend.setdefault(metric, [])
+            if len(points) < runs:
+                points.append({"run_id": run_id, "commit": commit, "recorded_at": recorded_at,
+                               "median": median, "unit": unit})
+        return {metric: points[::-1] for metric, points in trend.items()}
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def format_trend(trend: Dict[str, List[Dict[str, Any]]]) -> str:
+    lines = []
+    for metric, points in sorted(trend.items()):
+        lines.append(metric)
+        first = points[0]["median"]
+        for p in points:
+            change = (p["median"] - first) / first if first else 0.0
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(p["recorded_at"]))
+            lines.append(f"  {when}  {p['commit']:<12} {p['median']:10.3f}{p['unit']}  {change:+7.1%}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--model", default="tinyllama")
+    parser.add_argument("--host", default="localhost:11434", help="Host label the runs were recorded under")
+    parser.add_argument("--runs", type=int, default=DEFAULT_BASELINE_RUNS)
+    parser.add_argument("--json", action="store_true", help="Print the trend as JSON")
+    args = parser.parse_args(argv)
+
+    history = PerfHistory(args.path, args.model, args.host, commit="-")
+    trend = history.trend(args.runs)
+    history.close()
+    print(json.dumps(trend, indent=2) if args.json else format_trend(trend) or "No history recorded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Open-loop load generation against an LLM client.
+
+Requests are sent on a schedule (constant rate or Poisson arrivals) no matter
+how many are still in flight, so an overloaded server shows up as growing
+latency instead of silently throttling the generator. Latency is measured from
+each request's *scheduled* send time. Sweeping the offered rate yields
+latency-vs-load and throughput-vs-concurrency curves and the saturation knee.
+Latencies are aggregated as they arrive, so a stage's memory does not grow
+with the number of requests.
+
+    python -m harness.load --rates 0.5,1,2,4,8 --duration 30 --out load-report.json
+"""
+import argparse, asyncio, json, random, time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import cycle
+from typing import Dict, Any, List, Optional, Sequence
+from .results import StreamingStats
+
+ARRIVALS = ("constant", "poisson")
+
+
+def arrival_times(rate: float, duration: float, arrival: str = "poisson",
+                  rng: Optional[random.Random] = None) -> List[float]:
+    """Send offsets (seconds from stage start) for ``rate`` requests/sec over ``duration`` seconds"""
+    if arrival not in ARRIVALS:
+        raise ValueError(f"Unknown arrival process '{arrival}', expected one of {ARRIVALS}")
+    rng = rng or random.Random(0)
+    times, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate) if arrival == "poisson" else 1 / rate
+        if t >= duration:
+            return times
+        times.append(t)
+
+
+def ramp(start_rate: float, end_rate: float, steps: int) -> List[float]:
+    """Geometrically spaced offered rates from ``start_rate`` to ``end_rate``"""
+    if steps < 2:
+        return [start_rate]
+    factor = (end_rate / start_rate) ** (1 / (steps - 1))
+    return [start_rate * factor ** i for i in range(steps)]
+
+
+def _span_rate(count: int, span: float, fallback: float) -> float:
+    """Events per second of ``count`` events spread over ``span`` seconds from first to last"""
+    if count > 1 and span > 0:
+        return (count - 1) / span
+    return count / fallback if fallback > 0 else 0.0
+
+
+class StageResult:
+    """
+    Outcome of one fixed-rate stage of a load run; ``latencies`` are those of
+    the completed requests. ``arrival_span`` is the time from the first send
+    to the last, ``completion_span`` that from the first completion to the last.
+    """
+
+    def __init__(self, offered_rate: float, duration: float, latencies: StreamingStats, errors: int,
+                 wall_time: float, arrival_span: float = 0.0, completion_span: float = 0.0):
+        self.offered_rate = offered_rate
+        self.duration = duration
+        self.latencies = latencies
+        self.errors = errors
+        self.wall_time = wall_time
+        self.arrival_span = arrival_span
+        self.completion_span = completion_span
+
+    @property
+    def sent(self) -> int:
+        return self.latencies.count + self.errors
+
+    @property
+    def arrival_rate(self) -> float:
+        """Rate actually sent, which for Poisson arrivals scatters around the offered rate"""
+        return _span_rate(self.sent, self.arrival_span, self.duration)
+
+    @property
+    def throughput(self) -> float:
+        """
+        Completion rate between the first and the last completion. Neither the
+        wait for the first answer nor the drain after the last send counts as
+        lost throughput: a server that keeps up completes requests as fast as
+        they were sent, however long each one takes.
+        """
+        return _span_rate(self.latencies.count, self.completion_span, self.wall_time)
+
+    @property
+    def mean_concurrency(self) -> float:
+        # Little's law: requests in the system = time spent in it / wall time
+        return self.latencies.total / self.wall_time if self.wall_time > 0 else 0.0
+
+    def latency(self, q: float) -> Optional[float]:
+        return self.latencies.percentile(q) if self.latencies.count else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"offered_rate": self.offered_rate, "arrival_rate": self.arrival_rate,
+                "duration": self.duration, "sent": self.sent,
+                "completed": self.latencies.count, "errors": self.errors,
+                "throughput": self.throughput, "mean_concurrency": self.mean_concurrency,
+                "latency_p50": self.latency(50), "latency_p90": self.latency(90), "latency_p99": self.latency(99)}
+
+
+def find_knee(stages: Sequence[StageResult], efficiency: float = 0.9,
+              latency_factor: float = 2.0) -> Optional[StageResult]:
+    """
+    First stage where the server stops keeping up: it completes requests at
+    less than ``efficiency`` of the rate they were sent at, errors, or its
+    median latency exceeds ``latency_factor`` times the median at the lightest
+    load. Latency alone, however long, doesn't make a stage saturated.
+    """
+    ordered = sorted(stages, key=lambda s: s.offered_rate)
+    baseline = next((s.latency(50) for s in ordered if s.latencies.count), None)
+    for stage in ordered:
+        if (stage.errors or not stage.latencies.count
+                or stage.throughput < efficiency * stage.arrival_rate
+                or (baseline and stage.latency(50) > latency_factor * baseline)):
+            return stage
+    return None
+
+
+class LoadReport:
+    def __init__(self, stages: List[StageResult], arrival: str, knee: Optional[StageResult]):
+        self.stages = stages
+        self.arrival = arrival
+        self.knee = knee
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"arrival": self.arrival,
+                "stages": [s.as_dict() for s in self.stages],
+                "latency_vs_load": [[s.offered_rate, s.latency(50), s.latency(99)] for s in self.stages],
+                "throughput_vs_concurrency": [[s.mean_concurrency, s.throughput] for s in self.stages],
+                "saturation_rate": self.knee.offered_rate if self.knee else None,
+                "max_sustained_throughput": max((s.throughput for s in self.stages
+                                                 if self.knee is None or s.offered_rate < self.knee.offered_rate),
+                                                default=None)}
+
+    def to_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+class LoadGenerator:
+    """
+    Drives a client with open-loop arrivals. Async clients (``agenerate``) are
+    awaited directly; sync clients run on a thread pool sized ``max_threads``.
+    """
+
+    def __init__(self, client, prompts: Sequence[str], seed: int = 0, max_threads: int = 256, **generate_kwargs):
+        self.client = client
+        self.prompts = list(prompts)
+        self.seed = seed
+        self.generate_kwargs = generate_kwargs
+        self._executor = None if hasattr(client, "agenerate") else ThreadPoolExecutor(max_threads)
+
+    async def _call(self, prompt: str) -> Dict[str, Any]:
+        if self._executor is None:
+            return await self.client.agenerate(prompt, **self.generate_kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.client.generate, prompt, **self.generate_kwargs))
+
+    async def run_stage(self, rate: float, duration: float, arrival: str = "poisson") -> StageResult:
+        schedule = arrival_times(rate, duration, arrival, random.Random(self.seed))
+        prompts = cycle(self.prompts)
+        latencies = StreamingStats()
+        errors = 0
+        first_done = last_done = None
+        start = time.monotonic()
+
+        async def fire(offset: float, prompt: str) -> None:
+            nonlocal errors, first_done, last_done
+            await asyncio.sleep(max(0.0, start + offset - time.monotonic()))
+            response = await self._call(prompt)
+            now = time.monotonic()
+            if response.get("error"):
+                errors += 1
+            else:
+                latencies.add(now - (start + offset))
+                first_done = now if first_done is None else first_done
+                last_done = now
+
+        await asyncio.gather(*(fire(offset, next(prompts)) for offset in schedule))
+        return StageResult(rate, duration, latencies, errors, time.monotonic() - start,
+                           arrival_span=schedule[-1] - schedule[0] if schedule else 0.0,
+                           completion_span=last_done - first_done if first_done is not None else 0.0)
+
+    async def sweep(self, rates: Sequence[float], duration: float, arrival: str = "poisson") -> LoadReport:
+        stages = [await self.run_stage(rate, duration, arrival) for rate in rates]
+        return LoadReport(stages, arrival, find_knee(stages))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from clients.async_ollama_client import AsyncOllamaClient
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="tinyllama")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--rates", help="Comma-separated offered rates in requests/sec")
+    parser.add_argument("--ramp", help="START:END:STEPS, geometrically spaced rates")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per stage")
+    parser.add_argument("--arrival", choices=ARRIVALS, default="poisson")
+    parser.add_argument("--prompt", action="append", help="Prompt to send (repeatable)")
+    parser.add_argument("--max-tokens", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="load-report.json")
+    args = parser.parse_args(argv)
+
+    if args.ramp:
+        start, end, steps = args.ramp.split(":")
+        rates = ramp(float(start), float(end), int(steps))
+    elif args.rates:
+        rates = [float(r) for r in args.rates.split(",")]
+    else:
+        parser.error("one of --rates or --ramp is required")
+
+    async def run() -> LoadReport:
+        async with AsyncOllamaClient(args.model, args.host, args.port, max_concurrency=4096) as client:
+            generator = LoadGenerator(client, args.prompt or ["Write one sentence about AI."],
+                                      seed=args.seed, max_tokens=args.max_tokens)
+            return await generator.sweep(rates, args.duration, args.arrival)
+
+    report = asyncio.run(run())
+    report.to_json(args.out)
+    for stage in report.stages:
+        print(json.dumps(stage.as_dict()))
+    print(f"Saturation at {report.knee.offered_rate:.2f} req/s" if report.knee else "No saturation within the sweep")
+
+
+if __name__ == "__main__":
+    main()
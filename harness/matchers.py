@@ -0,0 +1,154 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Up to this many keywords, C-level substring search per keyword beats a regex scan
+_SUBSTRING_LIMIT = 128
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex alternation of ``words`` factored into a prefix trie ("ab(?:c)?|b").
+    Python's backtracking engine then tests one branch per character instead
+    of every word at every position, and prefers the longest word.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordSet:
+    """
+    Keywords compiled once for repeated matching against many texts.
+
+    Each text is case-folded once (unless ``case_sensitive``). Small sets are
+    then matched with one C-level substring search per keyword; large sets, and
+    any set with ``word_boundary``, with a single trie-factored regex scan.
+    ``found`` reports every keyword present, including ones that overlap or
+    are contained in other keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str], word_boundary: bool = False, case_sensitive: bool = False):
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(keywords))
+        self.word_boundary = word_boundary
+        self.case_sensitive = case_sensitive
+        self._by_folded: Dict[str, List[str]] = {}
+        for k in self.keywords:
+            self._by_folded.setdefault(self.fold(k), []).append(k)
+        folded = list(self._by_folded)
+        self._use_regex = word_boundary or len(folded) > _SUBSTRING_LIMIT
+        self._regex = self._scan = None
+        if folded and self._use_regex:
+            body = trie_pattern(folded)
+            if word_boundary:
+                body = rf"\b{body}\b"
+            self._regex = re.compile(body)
+            # The lookahead finds a match at every position, not just non-overlapping ones
+            self._scan = re.compile(f"(?=({body}))")
+        self._implied: Dict[str, List[str]] = {}
+
+    def fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.casefold()
+
+    def _contained(self, hit: str) -> List[str]:
+        """
+        Keywords matching inside ``hit``. The scan reports only the longest keyword
+        at each position, so shorter ones starting there are recovered from it.
+        Worked out on first use, from the hit's substrings rather than the keyword list.
+        """
+        contained = self._implied.get(hit)
+        if contained is None:
+            n = len(hit)
+            # The ends of the hit already had boundaries in the text it was found in
+            edge = [True] + [_is_word(hit[i - 1]) != _is_word(hit[i]) for i in range(1, n)] + [True]
+            contained = [hit[i:j] for i in range(n) for j in range(i + 1, n + 1)
+                         if hit[i:j] in self._by_folded and (not self.word_boundary or edge[i] and edge[j])]
+            self._implied[hit] = contained
+        return contained
+
+    def _found_folded(self, folded_text: str) -> Set[str]:
+        if not self._use_regex:
+            return {f for f in self._by_folded if f in folded_text}
+        if self._scan is None:
+            return set()
+        hits = {m.group(1) for m in self._scan.finditer(folded_text)}
+        return {g for f in hits for g in self._contained(f)}
+
+    def search(self, text: str) -> Optional[str]:
+        """A keyword occurring in ``text``, or None"""
+        folded_text = self.fold(text)
+        if self._use_regex:
+            match = self._regex.search(folded_text) if self._regex else None
+            return self._by_folded[match.group(0)][0] if match else None
+        return next((ks[0] for f, ks in self._by_folded.items() if f in folded_text), None)
+
+    def any(self, text: str) -> bool:
+        return self.search(text) is not None
+
+    def found(self, text: str) -> Set[str]:
+        return {k for f in self._found_folded(self.fold(text)) for k in self._by_folded[f]}
+
+    def missing(self, text: str) -> List[str]:
+        found = self.found(text)
+        return [k for k in self.keywords if k not in found]
+
+    def all(self, text: str) -> bool:
+        return not self.missing(text)
+
+
+@lru_cache(maxsize=1024)
+def _compiled(words: Tuple[str, ...], word_boundary: bool, case_sensitive: bool) -> KeywordSet:
+    return KeywordSet(words, word_boundary, case_sensitive)
+
+
+def keywords(words: Iterable[str], word_boundary: bool = False, case_sensitive: bool = False) -> KeywordSet:
+    """Compiled KeywordSet for ``words``, memoised so helpers can call it on every assertion"""
+    return _compiled(tuple(words), word_boundary, case_sensitive)
+
+
+class CheckSet:
+    """
+    Many named keyword checks evaluated together.
+
+    The keywords of all checks are merged into one KeywordSet, so each response
+    is folded and scanned once however many checks apply to it. Checks are
+    ``(mode, words)`` pairs where mode is ``"any"``, ``"all"`` or ``"none"``.
+    """
+
+    MODES = ("any", "all", "none")
+
+    def __init__(self, checks: Dict[str, Tuple[str, Sequence[str]]],
+                 word_boundary: bool = False, case_sensitive: bool = False):
+        for name, (mode, _) in checks.items():
+            if mode not in self.MODES:
+                raise ValueError(f"Check '{name}' has unknown mode '{mode}', expected one of {self.MODES}")
+        self.checks = {name: (mode, tuple(words)) for name, (mode, words) in checks.items()}
+        self._keywords = KeywordSet([w for _, words in self.checks.values() for w in words],
+                                    word_boundary, case_sensitive)
+
+    def evaluate(self, text: str) -> Dict[str, bool]:
+        found = self._keywords.found(text)
+        results = {}
+        for name, (mode, words) in self.checks.items():
+            hits = sum(w in found for w in words)
+            results[name] = hits > 0 if mode == "any" else hits == len(words) if mode == "all" else hits == 0
+        return results
+
+    def evaluate_many(self, texts: Iterable[str]) -> List[Dict[str, bool]]:
+        return [self.evaluate(text) for text in texts]
@@ -0,0 +1,492 @@
+"""
+Stand-in Ollama server for benchmarking the harness without a model.
+
+Implements the parts of the Ollama API the clients use (``/api/generate``
+and ``/api/chat`` with and without streaming, ``/api/embed``, ``/api/tags``)
+and of the OpenAI API (``/v1/chat/completions``, ``/v1/embeddings``,
+``/v1/models``), and behaves according
+to a scriptable JSON profile: time-to-first-token distribution, prefill and
+decode rates, parallel slots, cold-load time, injected errors and canned
+answers. Like Ollama it keeps the prompts of its slots cached, so a
+follow-up turn only prefills what is new (and reports that). Its tokens
+are the pieces of clients.tokens.split_pieces: every count it reports,
+context ids and streamed chunks come from that one split. Embeddings
+are hashed bags of words (see clients.embeddings). All
+randomness is seeded, so a profile replays the same latencies every run.
+
+    python -m harness.mock_server --profile harness/profiles/suite.json --port 11434
+"""
+import argparse, json, random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+from clients.embeddings import hashed_embedding
+from clients.stub_client import find_answer
+from clients.tokens import split_pieces
+
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "models": ["tinyllama"],
+    "seed": 0,
+    "ttft": {"dist": "fixed", "value": 0.05},
+    "tokens_per_sec": 100,
+    "prefill_tokens_per_sec": None,
+    "token_jitter": {"dist": "fixed", "value": 0.0},
+    "num_parallel": 4,
+    "load_time": 0.0,
+    "keep_alive": "5m",
+    "error_rate": 0.0,
+    "error_status": 500,
+    "drop_rate": 0.0,
+    "answers": [],
+    "default_response": "I'm not sure.",
+}
+
+_DURATION = re.compile(r"(\d+(?:\.\d*)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(value) -> float:
+    """
+    Seconds of an Ollama ``keep_alive``: a number of seconds or a duration
+    such as ``"10m"`` or ``"1h30m"``. Negative means forever (infinity).
+    """
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        text = str(value).strip()
+        try:
+            seconds = float(text)
+        except ValueError:
+            body = text.lstrip("-")
+            if not body or _DURATION.sub("", body):
+                raise ValueError(f"Invalid keep_alive '{value}'") from None
+            seconds = sum(float(n) * _UNITS[unit] for n, unit in _DURATION.findall(body))
+            seconds = -seconds if text.startswith("-") else seconds
+    return float("inf") if seconds < 0 else seconds
+
+
+class MockProfile:
+    """
+    Behaviour of the mock server. Durations are distributions, given as
+    ``{"dist": name, ...}`` with one of
+
+    * ``fixed`` (``value``), ``uniform`` (``low``, ``high``),
+    * ``normal`` (``mean``, ``stdev``; clipped at 0),
+    * ``lognormal`` (``median``, ``sigma``), ``exponential`` (``mean``).
+
+    ``answers`` is an ordered list of ``{"match": substring, "response": text}``;
+    the first entry whose substring occurs in the prompt (case-insensitively)
+    answers it, otherwise ``default_response`` does. An entry with
+    ``"responses"`` instead samples one of them, picked by the request's
+    ``seed`` when it has one. With
+    ``prefill_tokens_per_sec`` the first token is further delayed by the
+    prefill of the prompt tokens not found in the prompt cache. ``keep_alive``
+    is how long a model stays loaded after a request that doesn't set its own.
+    """
+
+    def __init__(self, spec: Optional[Dict[str, Any]] = None):
+        self.spec = {**DEFAULT_PROFILE, **(spec or {})}
+        self._rng = random.Random(self.spec["seed"])
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> "MockProfile":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def __getattr__(self, name):
+        try:
+            return self.spec[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def sample(self, dist: Dict[str, Any]) -> float:
+        with self._lock:
+            rng = self._rng
+            kind = dist.get("dist", "fixed")
+            if kind == "fixed":
+                return dist["value"]
+            if kind == "uniform":
+                return rng.uniform(dist["low"], dist["high"])
+            if kind == "normal":
+                return max(0.0, rng.gauss(dist["mean"], dist["stdev"]))
+            if kind == "lognormal":
+                return dist["median"] * rng.lognormvariate(0, dist["sigma"])
+            if kind == "exponential":
+                return rng.expovariate(1 / dist["mean"])
+        raise ValueError(f"Unknown distribution '{kind}'")
+
+    def chance(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < probability
+
+    def answer(self, prompt: str, seed: Optional[int] = None) -> str:
+        with self._lock:
+            return find_answer(self.answers, prompt, self.default_response, seed, self._rng)
+
+    def serves(self, model: str) -> bool:
+        name = model if ":" in model else f"{model}:latest"
+        return any(name == (m if ":" in m else f"{m}:latest") for m in self.models)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockOllamaServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        out = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            names = [m if ":" in m else f"{m}:latest" for m in self.server.profile.models]
+            self._send_json(200, {"models": [{"name": n, "model": n} for n in names]})
+        elif self.path == "/v1/models":
+            self._send_json(200, {"object": "list",
+                                  "data": [{"id": m, "object": "model"} for m in self.server.profile.models]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat", "/api/embed", "/v1/chat/completions", "/v1/embeddings"):
+            self._send_json(404, {"error": "not found"})
+            return
+        body = self._read_json()
+        profile = self.server.profile
+        if not profile.serves(body.get("model", "")):
+            self._send_json(404, {"error": f"model '{body.get('model')}' not found"})
+            return
+        if profile.chance(profile.drop_rate):
+            self.close_connection = True
+            return
+        if profile.chance(profile.error_rate):
+            self._send_json(profile.error_status, {"error": "injected failure"})
+            return
+        with self.server.slots:
+            self.server.count_request()
+            if self.path == "/v1/chat/completions":
+                self._chat_completion(body, profile)
+            elif self.path in ("/api/embed", "/v1/embeddings"):
+                self._embed(body, openai=self.path == "/v1/embeddings")
+            else:
+                self._generate(body, profile, chat=self.path == "/api/chat")
+
+    def _plan(self, answer: str, limit: Optional[int], profile: MockProfile, stop: Optional[List[str]] = None):
+        """
+        Tokens of the answer (cut at the first ``stop`` sequence, at most
+        ``limit`` of them), whether ``limit`` cut it short, time to first token
+        and the gaps between tokens
+        """
+        for sequence in stop or ():
+            answer = answer.split(sequence, 1)[0]
+        tokens = split_pieces(answer)
+        truncated = limit is not None and 0 <= limit < len(tokens)
+        if truncated:
+            tokens = tokens[:limit]
+        ttft = profile.sample(profile.ttft)
+        gaps = [1 / profile.tokens_per_sec + profile.sample(profile.token_jitter) for _ in tokens[1:]]
+        return tokens, truncated, ttft, gaps
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _generate(self, body: Dict[str, Any], profile: MockProfile, chat: bool = False) -> None:
+        start = time.perf_counter()
+        load_time = self.server.load(body["model"], body.get("keep_alive"))
+        if chat:
+            contents = [m.get("content", "") for m in body.get("messages") or []]
+            users = [m.get("content", "") for m in body.get("messages") or [] if m.get("role") == "user"]
+            prompt = users[-1] if users else None
+            pieces = split_pieces("\n".join(contents))
+        else:
+            prompt = body.get("prompt")
+            pieces = self.server.decode(body.get("context") or []) + split_pieces(prompt or "")
+        if prompt is None:
+            empty = {"message": {"role": "assistant", "content": ""}} if chat else {"response": ""}
+            self._send_json(200, {"model": body["model"], **empty, "done": True, "done_reason": "load"})
+            return
+
+        options = body.get("options") or {}
+        answer = profile.answer(prompt, options.get("seed"))
+        tokens, truncated, ttft, gaps = self._plan(answer, options.get("num_predict"), profile,
+                                                   options.get("stop"))
+        answer = "".join(tokens)
+        # The conversation including this answer stays cached for the next turn
+        cached = self.server.prompt_cache.lookup(pieces)
+        after = split_pieces("\n".join(contents + [answer])) if chat else pieces + split_pieces(answer)
+        self.server.prompt_cache.store(after)
+        evaluated = len(pieces) - cached
+        prefill = evaluated / profile.prefill_tokens_per_sec if profile.prefill_tokens_per_sec else None
+        if prefill is not None:
+            ttft += prefill
+
+        def piece(text: str) -> Dict[str, Any]:
+            return {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+
+        def stats(eval_count: int) -> Dict[str, Any]:
+            return {"model": body["model"], "done": True, "done_reason": "length" if truncated else "stop",
+                    **({} if chat else {"context": self.server.encode(after)}),
+                    "total_duration": int((time.perf_counter() - start) * 1e9),
+                    "load_duration": int(load_time * 1e9),
+                    "prompt_eval_count": evaluated,
+                    "prompt_eval_duration": int((ttft if prefill is None else prefill) * 1e9),
+                    "eval_count": eval_count,
+                    "eval_duration": int(sum(gaps[:max(0, eval_count - 1)]) * 1e9)}
+
+        if not body.get("stream", True):
+            time.sleep(ttft + sum(gaps))
+            self._send_json(200, {**piece(answer), **stats(len(tokens))})
+            return
+
+        self._start_stream("application/x-ndjson")
+        try:
+            time.sleep(ttft)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(gaps[i - 1])
+                self._write_chunk({"model": body["model"], **piece(token), "done": False})
+            self._write_chunk({**piece(""), **stats(len(tokens))})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (early termination), just like Ollama we stop generating
+            self.close_connection = True
+
+    def _chat_completion(self, body: Dict[str, Any], profile: MockProfile) -> None:
+        self.server.load(body["model"])
+        messages = [m for m in body.get("messages", []) if m.get("role") == "user"]
+        prompt = messages[-1].get("content", "") if messages else ""
+        answer = profile.answer(prompt, body.get("seed"))
+        tokens, truncated, ttft, gaps = self._plan(answer, body.get("max_tokens"), profile,
+                                                   body.get("stop"))
+        finish_reason = "length" if truncated else "stop"
+        prompt_tokens = len(split_pieces(prompt))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        base = {"id": "chatcmpl-mock", "model": body["model"], "created": int(time.time())}
+
+        if not body.get("stream"):
+            time.sleep(ttft + sum(gaps))
+            self._send_json(200, {**base, "object": "chat.completion", "usage": usage,
+                                  "choices": [{"index": 0, "finish_reason": finish_reason,
+                                               "message": {"role": "assistant", "content": "".join(tokens)}}]})
+            return
+
+        self._start_stream("text/event-stream")
+        chunk = {**base, "object": "chat.completion.chunk"}
+        try:
+            time.sleep(ttft)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(gaps[i - 1])
+                self._write_event({**chunk, "choices": [{"index": 0, "delta": {"content": token}}]})
+            self._write_event({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._write_event({**chunk, "choices": [], "usage": usage})
+            self._write_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _embed(self, body: Dict[str, Any], openai: bool = False) -> None:
+        self.server.load(body["model"], None if openai else body.get("keep_alive"))
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        vectors = [hashed_embedding(text) for text in texts]
+        prompt_tokens = sum(len(split_pieces(text)) for text in texts)
+        if openai:
+            self._send_json(200, {"object": "list", "model": body["model"],
+                                  "data": [{"object": "embedding", "index": i, "embedding": v}
+                                           for i, v in enumerate(vectors)],
+                                  "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}})
+        else:
+            self._send_json(200, {"model": body["model"], "embeddings": vectors, "prompt_eval_count": prompt_tokens})
+
+    def _write_chunk(self, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _write_event(self, body) -> None:
+        data = b"data: " + (body.encode() if isinstance(body, str) else json.dumps(body).encode()) + b"\n\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class PromptCache:
+    """
+    Token sequences held by the server's slots, as Ollama keeps each slot's
+    KV cache: a request reuses the longest cached prefix of its prompt and its
+    slot then holds the prompt plus the answer.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._entries: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _common(a: List[str], b: List[str]) -> int:
+        n = 0
+        for x, y in zip(a, b):
+            if x != y:
+                break
+            n += 1
+        return n
+
+    def lookup(self, pieces: List[str]) -> int:
+        """Length of the longest cached prefix of ``pieces``; at least one piece is always evaluated"""
+        with self._lock:
+            best = max((self._common(e, pieces) for e in self._entries), default=0)
+        return min(best, max(0, len(pieces) - 1))
+
+    def store(self, pieces: List[str]) -> None:
+        with self._lock:
+            # Continue the slot holding this conversation, otherwise evict the least recently used
+            scored = [(self._common(e, pieces), i) for i, e in enumerate(self._entries)]
+            best = max(scored, default=(0, -1))
+            if best[0]:
+                del self._entries[best[1]]
+            elif len(self._entries) >= self.slots:
+                del self._entries[0]
+            self._entries.append(pieces)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """
+    Threaded mock server; ``start()`` serves in a background thread. Port 0
+    picks a free port, available afterwards as ``port``.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, profile: Optional[MockProfile] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.profile = profile or MockProfile()
+        self.slots = threading.BoundedSemaphore(self.profile.num_parallel)
+        self.prompt_cache = PromptCache(self.profile.num_parallel)
+        self.requests = 0
+        self.loads = 0
+        self._vocab: Dict[str, int] = {}
+        self._pieces: List[str] = []
+        # Loaded models and when (time.monotonic) each is unloaded
+        self._resident: Dict[str, float] = {}
+        # Models being loaded, set once they are resident
+        self._loading: Dict[str, threading.Event] = {}
+        self._load_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count_request(self) -> None:
+        with self._load_lock:
+            self.requests += 1
+
+    def encode(self, pieces: List[str]) -> List[int]:
+        """Context token ids of ``pieces``, as returned by /api/generate"""
+        with self._load_lock:
+            for p in pieces:
+                if p not in self._vocab:
+                    self._vocab[p] = len(self._pieces)
+                    self._pieces.append(p)
+            return [self._vocab[p] for p in pieces]
+
+    def decode(self, ids: List[int]) -> List[str]:
+        with self._load_lock:
+            return [self._pieces[i] for i in ids if 0 <= i < len(self._pieces)]
+
+    def load(self, model: str, keep_alive=None) -> float:
+        """
+        Simulate loading ``model`` unless it is resident; returns the time
+        spent. The model then stays loaded for ``keep_alive`` (the profile's
+        by default) from this request on; 0 unloads it right after. The load
+        itself runs outside the lock: requests for resident models go ahead,
+        those for the model being loaded wait for that one load.
+        """
+        start = time.monotonic()
+        with self._load_lock:
+            expired = [m for m, until in self._resident.items() if until <= start]
+            for m in expired:
+                del self._resident[m]
+            if expired:
+                # The slots' KV caches go with the model
+                self.prompt_cache.clear()
+            loading = self._loading.get(model)
+            owner = model not in self._resident and loading is None
+            if owner:
+                loading = self._loading[model] = threading.Event()
+        load_time = 0.0
+        if owner:
+            time.sleep(self.profile.load_time)
+            load_time = self.profile.load_time
+            with self._load_lock:
+                self.loads += 1
+                del self._loading[model]
+            loading.set()
+        elif loading is not None:
+            loading.wait()
+            load_time = time.monotonic() - start
+        with self._load_lock:
+            self._resident[model] = time.monotonic() + keep_alive_seconds(
+                self.profile.keep_alive if keep_alive is None else keep_alive)
+        return load_time
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", help="JSON profile (defaults built in)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    args = parser.parse_args(argv)
+
+    profile = MockProfile.from_file(args.profile) if args.profile else MockProfile()
+    server = MockOllamaServer(profile, args.host, args.port)
+    print(f"Mock Ollama serving {profile.models} on http://{server.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
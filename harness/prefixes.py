@@ -0,0 +1,173 @@
+"""
+Warm model reuse: prompts ordered for the prompt cache, and what the cache saved.
+
+While a model stays loaded, Ollama keeps the tokens of each parallel slot's
+last prompt (its KV cache) and prefills only the part of a new prompt that
+differs from them. Prompts built from the same template, few-shot examples
+or document share a long prefix: sent one after another they mostly hit the
+cache, interleaved with unrelated prompts they evict each other. The client's
+``keep_alive`` (``--llm-keep-alive``) keeps the model, and so the cache,
+loaded for the whole session; group_by_prefix orders a stream of prompts so
+those sharing a prefix run consecutively, and PrefixCacheStats compares the
+calls that hit the cache with those that missed it.
+"""
+import threading
+from itertools import islice
+from typing import Callable, Dict, Any, Iterable, Iterator, List, TypeVar
+
+import pytest
+
+from clients.instrumentation import Hooks, instrumentation
+from .results import StreamingStats
+
+DEFAULT_PREFIX_WINDOW = 256
+DEFAULT_HIT_SHARE = 0.5
+
+T = TypeVar("T")
+
+
+def group_by_prefix(items: Iterable[T], key: Callable[[T], str] = str,
+                    window: int = DEFAULT_PREFIX_WINDOW) -> Iterator[T]:
+    """
+    ``items`` reordered so that those whose ``key`` (the prompt) starts alike
+    come one after another. Items are read ``window`` at a time, so a lazily
+    read dataset stays lazy, and each window is sorted by prompt: sorted order
+    puts prompts with a common start next to each other, those sharing the
+    longest prefixes closest. A window of 1 or less keeps the order.
+    """
+    if window <= 1:
+        yield from items
+        return
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, window))
+        if not chunk:
+            return
+        chunk.sort(key=key)
+        yield from chunk
+
+
+class PrefixCacheStats:
+    """
+    Prefill time, time to first token and latency of calls that took at least
+    ``hit_share`` of their prompt from the server's prompt cache (hits) and of
+    the other calls (misses), plus the prefill time the cache saved and the
+    model load time the calls waited for. Calls are split by the reuse the
+    server's own counts give (see clients.tokens.prefix_reuse), never by
+    local token estimates: Ollama's /api/generate returns the prompt's tokens
+    with the context, OpenAI-compatible servers may report their cached
+    tokens. Responses without such counts (/api/chat, other backends,
+    errors, cache replays) are ignored. Safe to add to from several threads.
+    """
+
+    METRICS = ("prefill_time", "ttft", "latency")
+
+    def __init__(self, hit_share: float = DEFAULT_HIT_SHARE):
+        self.hit_share = hit_share
+        self.stats = {kind: {m: StreamingStats() for m in self.METRICS} for kind in ("hit", "miss")}
+        self.prefill_saved = 0.0
+        self.load_time = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, response: Dict[str, Any]) -> None:
+        reused, total = response.get("reused_tokens"), response.get("prompt_total_tokens")
+        if reused is None or not total or response.get("error") or response.get("cached"):
+            return
+        kind = "hit" if reused >= self.hit_share * total else "miss"
+        with self._lock:
+            for metric in self.METRICS:
+                if response.get(metric) is not None:
+                    self.stats[kind][metric].add(response[metric])
+            self.prefill_saved += response.get("prefill_saved") or 0.0
+            self.load_time += response.get("load_time") or 0.0
+
+    @property
+    def calls(self) -> int:
+        return sum(self.stats[kind]["latency"].count for kind in self.stats)
+
+    def merge(self, other: "PrefixCacheStats") -> None:
+        with self._lock:
+            for kind, metrics in other.stats.items():
+                for metric, stats in metrics.items():
+                    self.stats[kind][metric].merge(stats)
+            self.prefill_saved += other.prefill_saved
+            self.load_time += other.load_time
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summary for reports: per kind the calls and median of each metric"""
+        summary: Dict[str, Any] = {"prefill_saved": self.prefill_saved, "load_time": self.load_time}
+        for kind, metrics in self.stats.items():
+            summary[kind] = {"calls": metrics["latency"].count,
+                             **{m: s.percentile(50) if s.count else None for m, s in metrics.items()}}
+        return summary
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"hit_share": self.hit_share, "prefill_saved": self.prefill_saved, "load_time": self.load_time,
+                "stats": {kind: {m: s.to_json() for m, s in metrics.items()} for kind, metrics in self.stats.items()}}
+
+    @classmethod
+    def from_json(cls, state: Dict[str, Any]) -> "PrefixCacheStats":
+        stats = cls(state["hit_share"])
+        stats.prefill_saved, stats.load_time = state["prefill_saved"], state["load_time"]
+        stats.stats = {kind: {m: StreamingStats.from_json(s) for m, s in metrics.items()}
+                       for kind, metrics in state["stats"].items()}
+        return stats
+
+    def format(self) -> List[str]:
+        """Report lines: hits and misses side by side and the difference the cache made"""
+        summary = self.as_dict()
+        lines = []
+        for kind, label in (("hit", "Cache hits (>="), ("miss", "Cache misses (<")):
+            s = summary[kind]
+            medians = ", ".join(f"{m} {s[m]:.3f}s" for m in self.METRICS if s[m] is not None)
+            lines.append(f"{label} {self.hit_share:.0%} of the prompt reused): {s['calls']} calls"
+                         + (f", median {medians}" if medians else ""))
+        hit, miss = summary["hit"], summary["miss"]
+        for metric in self.METRICS:
+            if hit[metric] is not None and miss[metric]:
+                change = hit[metric] - miss[metric]
+                lines.append(f"Hits vs misses, median {metric}: {change:+.3f}s ({change / miss[metric]:+.0%})")
+        lines.append(f"Prefill time saved by the cache: {self.prefill_saved:.3f}s; "
+                     f"model load time waited for: {self.load_time:.3f}s")
+        return lines
+
+
+class PrefixCacheReport(Hooks):
+    """
+    Pytest plugin collecting PrefixCacheStats of the model calls and
+    reporting them at the end of the run. Only the innermost client's calls
+    count. pytest-xdist workers hand their stats to the controller, which
+    merges them.
+    """
+
+    WORKER_KEY = "llm_prefix_cache"
+
+    def __init__(self, config, hit_share: float = DEFAULT_HIT_SHARE):
+        self.config = config
+        self.stats = PrefixCacheStats(hit_share)
+        instrumentation.add(self)
+
+    def after_request(self, client, prompt: str, response: Dict[str, Any]) -> None:
+        if not hasattr(client, "client"):
+            self.stats.add(response)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, "workeroutput"):
+            self.config.workeroutput[self.WORKER_KEY] = self.stats.to_json()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        state = getattr(node, "workeroutput", {}).get(self.WORKER_KEY)
+        if state:
+            self.stats.merge(PrefixCacheStats.from_json(state))
+
+    def pytest_unconfigure(self, config):
+        instrumentation.remove(self)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.stats.calls or hasattr(self.config, "workerinput"):
+            return
+        terminalreporter.section("prompt cache")
+        for line in self.stats.format():
+            terminalreporter.write_line(line)
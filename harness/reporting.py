@@ -0,0 +1,201 @@
+"""
+Buffered Allure reporting of LLM calls.
+
+Tests that use the ``llm_client`` fixture get their calls recorded in memory:
+truncated response text plus latency and token metadata. The test thread only
+adds each attachment's entry to the Allure result. Rendering and writing the
+file happen on a background thread, so the test never waits on report I/O.
+The per-call metadata goes into one structured JSON attachment per test.
+Pending writes are drained just before Allure writes the test's result.
+"""
+import json, os, queue, threading
+from typing import Dict, Any, Callable, List, Optional, Union
+import pytest
+from allure_commons import plugin_manager
+from allure_commons.model2 import Attachment, ATTACHMENT_PATTERN
+from allure_commons.types import AttachmentType
+from allure_commons.utils import uuid4
+from clients.baseclient import BaseLLMClient
+from clients.instrumentation import ChromeTrace, instrumentation
+
+DEFAULT_MAX_TEXT = 4000
+DEFAULT_MAX_ATTACHMENTS = 20
+DEFAULT_QUEUE_SIZE = 1000
+
+METRIC_KEYS = ("latency", "prompt_tokens", "completion_tokens", "token_source", "load_time", "prefill_time",
+               "decode_time", "network_time", "ttft", "decode_tokens_per_sec", "connection_reused",
+               "cached", "coalesced", "stopped_early", "prompt_total_tokens", "reused_tokens", "prefill_saved",
+               "host", "attempts", "error")
+
+
+def truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n... [truncated {len(text) - limit} of {len(text)} characters]"
+
+
+class AttachmentWriter:
+    """
+    Writes Allure attachment files from a background thread.
+
+    ``submit`` adds the attachment to the given Allure result right away (a list
+    append; Allure keeps its results per thread, so this must happen on the
+    test's thread) and queues the file for the writer. Bodies may be callables
+    that are only rendered on the writer thread. When more than ``max_queue``
+    files are pending, new attachments are dropped and counted rather than
+    slowing the test down.
+    """
+
+    def __init__(self, max_queue: int = DEFAULT_QUEUE_SIZE):
+        self.dropped = 0
+        self.failed = 0
+        self._queue: "queue.Queue" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="allure-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, result, name: str, body: Union[str, Callable[[], str]],
+               attachment_type: AttachmentType) -> None:
+        file_name = ATTACHMENT_PATTERN.format(prefix=uuid4(), ext=attachment_type.extension)
+        try:
+            self._queue.put_nowait((file_name, body))
+        except queue.Full:
+            self.dropped += 1
+            return
+        result.attachments.append(Attachment(source=file_name, name=name, type=attachment_type.mime_type))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                file_name, body = item
+                plugin_manager.hook.report_attached_data(body=body() if callable(body) else body, file_name=file_name)
+            except Exception:
+                # A report that cannot be written must not fail the run
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every submitted attachment is written"""
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+class ResponseLog:
+    """
+    The LLM calls of one test. Each response with text is queued as a text
+    attachment as soon as it arrives (the first ``max_attachments`` of them,
+    each cut at ``max_text`` characters); ``close`` queues the metadata of
+    all calls as one JSON attachment.
+    """
+
+    def __init__(self, writer: AttachmentWriter, result,
+                 max_text: int = DEFAULT_MAX_TEXT, max_attachments: int = DEFAULT_MAX_ATTACHMENTS):
+        self.writer = writer
+        self.result = result
+        self.max_text = max_text
+        self.max_attachments = max_attachments
+        self.calls: List[Dict[str, Any]] = []
+        self._attached = 0
+
+    def record(self, prompt: str, response: Dict[str, Any]) -> None:
+        # Cut texts right away, so a long response is not kept alive until the writer gets to it
+        self.calls.append({"prompt": truncate(prompt, self.max_text),
+                           **{k: response[k] for k in METRIC_KEYS if k in response}})
+        text = response.get("text")
+        if text and self._attached < self.max_attachments:
+            self._attached += 1
+            self.writer.submit(self.result, "LLM Response", truncate(text, self.max_text), AttachmentType.TEXT)
+
+    def _render(self, calls: List[Dict[str, Any]]) -> str:
+        return json.dumps({"calls": calls, "responses_attached": self._attached}, indent=2, default=str)
+
+    def close(self) -> None:
+        if self.calls:
+            calls, self.calls = self.calls, []
+            self.writer.submit(self.result, "LLM Calls", lambda: self._render(calls), AttachmentType.JSON)
+
+
+class RecordingClient(BaseLLMClient):
+    """Wraps a client so every generate call is recorded in a ResponseLog"""
+
+    def __init__(self, client: BaseLLMClient, log: ResponseLog):
+        self.client = client
+        self.log = log
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def is_model_available(self) -> bool:
+        return self.client.is_model_available()
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        response = self.client.generate(prompt, **kwargs)
+        self.log.record(prompt, response)
+        return response
+
+
+class AllureReporting:
+    """
+    Pytest plugin owning the attachment writer. It stays inert unless
+    allure-pytest is reporting (``--alluredir``), and only tests that ask
+    for a ResponseLog cost anything.
+    """
+
+    def __init__(self, config, max_text: int = DEFAULT_MAX_TEXT, max_attachments: int = DEFAULT_MAX_ATTACHMENTS):
+        self.config = config
+        self.max_text = max_text
+        self.max_attachments = max_attachments
+        self._writer: Optional[AttachmentWriter] = None
+
+    def response_log(self) -> Optional[ResponseLog]:
+        """A log for the running test, or None when Allure is not reporting"""
+        listener = self.config.pluginmanager.get_plugin("allure_listener")
+        if listener is None:
+            return None
+        test = listener.allure_logger.get_test(None)
+        if test is None:
+            return None
+        if self._writer is None:
+            self._writer = AttachmentWriter()
+        return ResponseLog(self._writer, test, self.max_text, self.max_attachments)
+
+    def pytest_runtest_logfinish(self, nodeid, location):
+        # Allure writes the test result after this hook; its attachments must be in by then
+        if self._writer is not None:
+            self._writer.flush()
+
+    def pytest_unconfigure(self, config):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class SuiteTrace:
+    """
+    Pytest plugin tracing the run into a Chrome trace file: one span per test
+    around the client spans of its calls. Under pytest-xdist each worker writes
+    its own file, suffixed with the worker id, and the controller, which runs
+    no tests, writes none.
+    """
+
+    def __init__(self, path: str):
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        root, ext = os.path.splitext(path)
+        self.path = f"{root}.{worker}{ext}" if worker else path
+        self.trace = ChromeTrace()
+        instrumentation.add(self.trace)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        with instrumentation.span(item.nodeid):
+            yield
+
+    def pytest_unconfigure(self, config):
+        instrumentation.remove(self.trace)
+        if not config.pluginmanager.has_plugin("dsession"):
+            self.trace.dump(self.path)
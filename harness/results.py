@@ -0,0 +1,233 @@
+"""
+Memory-bounded handling of results for long and high-volume runs.
+
+A response dict keeps every field and the whole text alive for as long as it
+is referenced. ResultStore keeps each result's metrics in typed arrays (a few
+bytes per field) and its text inline only while the text is short and the
+inline total is under a budget; other texts go to a spill file and are read
+back on demand. StreamingStats aggregates a metric in constant memory, so a
+100k-prompt run summarises its latencies without keeping them.
+"""
+import math, tempfile, threading
+from array import array
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+DEFAULT_SPILL_THRESHOLD = 4096
+DEFAULT_MAX_INLINE_BYTES = 8 * 1024 * 1024
+DEFAULT_PRECISION = 0.01
+
+
+class StreamingStats:
+    """
+    Count, mean, standard deviation, extremes and approximate percentiles of a
+    stream of non-negative values in constant memory. Percentiles come from a
+    histogram of logarithmic buckets, each ``precision`` wide in relative terms,
+    so ``percentile`` is within that relative error of the exact value (values
+    within a factor of 10^8 of each other need under 2000 buckets). Stats of
+    several streams, e.g. of pytest-xdist workers, merge exactly.
+    """
+
+    __slots__ = ("precision", "count", "total", "mean", "_m2", "min", "max", "zeros", "buckets", "_log_base")
+
+    def __init__(self, precision: float = DEFAULT_PRECISION):
+        self.precision = precision
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.zeros = 0
+        self.buckets: Dict[int, int] = {}
+        self._log_base = math.log1p(2 * precision)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        # Welford's update keeps the variance accurate over long streams
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+        else:
+            bucket = math.floor(math.log(value) / self._log_base)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def extend(self, values: Iterable[float]) -> "StreamingStats":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "StreamingStats") -> None:
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.zeros += other.zeros
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, q: float) -> float:
+        """q-th percentile (0-100), nearest rank"""
+        if not self.count:
+            raise ValueError("percentile of empty data")
+        rank = round((self.count - 1) * q / 100)
+        if rank < self.zeros:
+            return self.min
+        seen = self.zeros
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                # Geometric midpoint of the bucket, within ``precision`` of every value in it
+                value = math.exp((bucket + 0.5) * self._log_base)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summary of the stream for reports"""
+        return {"count": self.count, "mean": self.mean if self.count else None, "stdev": self.stdev,
+                "min": self.min, "max": self.max,
+                **{f"p{q}": self.percentile(q) if self.count else None for q in (50, 90, 95, 99)}}
+
+    def to_json(self) -> Dict[str, Any]:
+        """Full state, for merging stats written by other processes"""
+        return {"precision": self.precision, "count": self.count, "total": self.total, "mean": self.mean,
+                "m2": self._m2, "min": self.min, "max": self.max, "zeros": self.zeros,
+                "buckets": {str(b): n for b, n in self.buckets.items()}}
+
+    @classmethod
+    def from_json(cls, state: Dict[str, Any]) -> "StreamingStats":
+        stats = cls(state["precision"])
+        stats.count, stats.total, stats.mean, stats._m2 = state["count"], state["total"], state["mean"], state["m2"]
+        stats.min, stats.max, stats.zeros = state["min"], state["max"], state["zeros"]
+        stats.buckets = {int(b): n for b, n in state["buckets"].items()}
+        return stats
+
+
+class ResultRecord:
+    """One result of a ResultStore, read from its columns on access"""
+
+    __slots__ = ("_store", "index")
+
+    def __init__(self, store: "ResultStore", index: int):
+        self._store = store
+        self.index = index
+
+    def __getattr__(self, name):
+        if name in ResultStore.FIELDS:
+            value = self._store.columns[name][self.index]
+            # NaN or -1 mark a missing value
+            return None if value != value or value < 0 else value
+        raise AttributeError(name)
+
+    @property
+    def text(self) -> str:
+        return self._store.text(self.index)
+
+    @property
+    def error(self) -> str:
+        return self._store.errors.get(self.index, "")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "error": self.error, **{name: getattr(self, name) for name in self._store.FIELDS}}
+
+
+class ResultStore:
+    """
+    Append-only store of responses. Metrics go to typed arrays, one per field
+    (a missing value is NaN, or -1 for counts), and each field also feeds a
+    StreamingStats. Texts up to ``spill_threshold`` characters stay in memory
+    until the texts held there reach ``max_inline_bytes``; every other text is
+    appended to a temporary spill file. Error messages, which are rare, are
+    kept in a dict. Safe to add to from several threads.
+    """
+
+    FIELDS = {"latency": "d", "ttft": "d", "prompt_tokens": "l", "completion_tokens": "l"}
+
+    def __init__(self, spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+                 max_inline_bytes: int = DEFAULT_MAX_INLINE_BYTES, spill_dir: Optional[str] = None):
+        self.spill_threshold = spill_threshold
+        self.max_inline_bytes = max_inline_bytes
+        self.spill_dir = spill_dir
+        self.columns = {name: array(code) for name, code in self.FIELDS.items()}
+        self.stats = {name: StreamingStats() for name in self.FIELDS}
+        self.errors: Dict[int, str] = {}
+        self.inline_bytes = 0
+        self.spilled_bytes = 0
+        self._inline: Dict[int, str] = {}
+        # Byte offset and length in the spill file; -1 when the text is inline
+        self._offsets = array("q")
+        self._lengths = array("l")
+        self._spill = None
+        self._lock = threading.Lock()
+
+    def add(self, response: Dict[str, Any]) -> int:
+        """Store a response; returns its index"""
+        text = response.get("text") or ""
+        with self._lock:
+            index = len(self._offsets)
+            for name, code in self.FIELDS.items():
+                value = response.get(name)
+                self.columns[name].append(value if value is not None else (math.nan if code == "d" else -1))
+                if value is not None:
+                    self.stats[name].add(value)
+            if response.get("error"):
+                self.errors[index] = response["error"]
+            if len(text) <= self.spill_threshold and self.inline_bytes + len(text) <= self.max_inline_bytes:
+                self._inline[index] = text
+                self.inline_bytes += len(text)
+                self._offsets.append(-1)
+                self._lengths.append(0)
+            else:
+                data = text.encode()
+                if self._spill is None:
+                    self._spill = tempfile.TemporaryFile(dir=self.spill_dir, prefix="llm-results-")
+                self._spill.seek(0, 2)
+                self._offsets.append(self._spill.tell())
+                self._lengths.append(len(data))
+                self._spill.write(data)
+                self.spilled_bytes += len(data)
+        return index
+
+    def text(self, index: int) -> str:
+        with self._lock:
+            if self._offsets[index] < 0:
+                return self._inline[index]
+            self._spill.seek(self._offsets[index])
+            return self._spill.read(self._lengths[index]).decode()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> ResultRecord:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ResultRecord(self, index % len(self))
+
+    def __iter__(self) -> Iterator[ResultRecord]:
+        return (ResultRecord(self, i) for i in range(len(self)))
+
+    def close(self) -> None:
+        """Drop the spill file; texts that were spilled can't be read afterwards"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
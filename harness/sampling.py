@@ -0,0 +1,211 @@
+"""
+Multi-sample evaluation: judge a test by its pass rate over seeded samples.
+
+A single answer at temperature 0.8 makes a borderline prompt a coin flip.
+With ``--llm-samples=N`` the body of each test using ``llm_client`` runs up to
+N times, every sample with its own seed (``--llm-seed`` plus the sample's
+number, so a rerun draws the same samples), ``--llm-sample-parallel`` of
+them at once through the shared client. After each wave but the last the
+Wilson score interval of the pass rate decides the test as soon as it lies
+wholly above or below the required pass rate, so only borderline tests draw
+all N samples; otherwise the pass rate of all N samples decides. Every look
+at the interval is a chance to stop on a fluke, so each look uses an equal
+share of the error rate (Bonferroni). A test can set its own count and pass
+rate with ``@pytest.mark.llm_samples(10, pass_rate=0.8)``; performance tests
+always run once.
+
+Only ``llm_client`` is seeded per sample. Other function-scoped fixtures
+exist once per test, so the samples of a test using any would share them:
+such tests draw their samples one at a time.
+"""
+import inspect, math, warnings
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+from typing import Dict, Any, List, Optional, Tuple
+
+import pytest
+
+from clients.baseclient import BaseLLMClient
+
+DEFAULT_PASS_RATE = 0.5
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SAMPLE_PARALLEL = 4
+MAX_SAMPLES = 1000
+
+
+class SampleCountWarning(UserWarning):
+    """Too few samples for the pass rate interval to ever stop a test early"""
+
+
+def wilson_interval(passed: int, total: int, confidence: float = DEFAULT_CONFIDENCE) -> Tuple[float, float]:
+    """Wilson score interval of a pass rate; unlike the normal approximation it stays sensible at 0/n and n/n"""
+    if total == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = passed / total
+    scale = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / scale
+    half = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / scale
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def interim_looks(samples: int, parallel: int) -> int:
+    """Looks at the interval before the last wave, the ones that can stop a test early"""
+    return math.ceil(samples / parallel) - 1
+
+
+def interim_confidence(confidence: float, looks: int) -> float:
+    """Confidence of each look so that all ``looks`` together keep ``confidence`` (Bonferroni)"""
+    return 1 - (1 - confidence) / max(1, looks)
+
+
+def can_stop_early(samples: int, pass_rate: float, confidence: float, parallel: int) -> bool:
+    """Whether a unanimous outcome at the last interim look would decide the test"""
+    looks = interim_looks(samples, parallel)
+    if looks < 1:
+        return False
+    drawn = looks * parallel
+    level = interim_confidence(confidence, looks)
+    return wilson_interval(drawn, drawn, level)[0] >= pass_rate or wilson_interval(0, drawn, level)[1] < pass_rate
+
+
+def min_samples(pass_rate: float, confidence: float, parallel: int) -> Optional[int]:
+    """Fewest samples with which a test can stop early, None if even MAX_SAMPLES can't"""
+    return next((n for n in range(2, MAX_SAMPLES + 1) if can_stop_early(n, pass_rate, confidence, parallel)), None)
+
+
+class SeededClient(BaseLLMClient):
+    """Wraps a client so calls without their own ``seed`` sample with this one"""
+
+    def __init__(self, client: BaseLLMClient, seed: int):
+        self.client = client
+        self.seed = seed
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def is_model_available(self) -> bool:
+        return self.client.is_model_available()
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        kwargs.setdefault("seed", self.seed)
+        return self.client.generate(prompt, **kwargs)
+
+
+class SelfConsistency:
+    """
+    Pytest plugin running the samples of each test (in place of pytest's own
+    call of the test function) and reporting per test how many samples it
+    took. The counts reach the pytest-xdist controller through the reports'
+    user properties.
+    """
+
+    PROPERTY = "llm_samples"
+
+    def __init__(self, config, samples: int = 1, seed: int = 0, parallel: int = DEFAULT_SAMPLE_PARALLEL,
+                 pass_rate: float = DEFAULT_PASS_RATE, confidence: float = DEFAULT_CONFIDENCE):
+        self.config = config
+        self.samples = samples
+        self.seed = seed
+        self.parallel = parallel
+        self.pass_rate = pass_rate
+        self.confidence = confidence
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._warned = set()
+
+    def settings(self, item) -> Tuple[int, float]:
+        """(samples, required pass rate) of a test; one sample means the test runs as usual"""
+        if "llm_client" not in item.fixturenames or item.get_closest_marker("performance") is not None:
+            return 1, self.pass_rate
+        marker = item.get_closest_marker("llm_samples")
+        if marker is None:
+            return self.samples, self.pass_rate
+        n = marker.kwargs.get("n", marker.args[0] if marker.args else self.samples)
+        return n, marker.kwargs.get("pass_rate", self.pass_rate)
+
+    def run_sample(self, item, seed: int) -> Optional[str]:
+        """Run the test body once with ``seed``; None if it passed, else why it failed"""
+        funcargs = {**item.funcargs, "llm_client": SeededClient(item.funcargs["llm_client"], seed)}
+        try:
+            item.obj(**{name: funcargs[name] for name in item._fixtureinfo.argnames})
+        except (AssertionError, pytest.fail.Exception) as e:
+            return str(e).strip() or type(e).__name__
+        return None
+
+    @staticmethod
+    def shared_fixtures(item) -> List[str]:
+        """Function-scoped fixtures of a test other than llm_client, which all its samples would share"""
+        defs = item._fixtureinfo.name2fixturedefs
+        return [name for name in item._fixtureinfo.argnames
+                if name != "llm_client" and name in defs and defs[name][-1].scope == "function"]
+
+    def warn_if_undecidable(self, n: int, pass_rate: float, parallel: int) -> None:
+        if (n, pass_rate, parallel) in self._warned or can_stop_early(n, pass_rate, self.confidence, parallel):
+            return
+        self._warned.add((n, pass_rate, parallel))
+        needed = min_samples(pass_rate, self.confidence, parallel)
+        warnings.warn(f"{n} samples at a required pass rate of {pass_rate:.0%} can never stop a test early"
+                      + (f"; that takes at least {needed} samples, {parallel} at a time" if needed else ""),
+                      SampleCountWarning)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_pyfunc_call(self, pyfuncitem):
+        n, pass_rate = self.settings(pyfuncitem)
+        if n <= 1 or inspect.iscoroutinefunction(pyfuncitem.obj):
+            return None
+
+        shared = self.shared_fixtures(pyfuncitem)
+        parallel = 1 if shared else self.parallel
+        self.warn_if_undecidable(n, pass_rate, parallel)
+        level = interim_confidence(self.confidence, interim_looks(n, parallel))
+        passed, failures = 0, []
+        decided = False
+        with ThreadPoolExecutor(min(parallel, n)) as pool:
+            while passed + len(failures) < n:
+                drawn = passed + len(failures)
+                seeds = range(self.seed + drawn, self.seed + min(n, drawn + parallel))
+                for failure in pool.map(lambda s: self.run_sample(pyfuncitem, s), seeds):
+                    if failure is None:
+                        passed += 1
+                    else:
+                        failures.append(failure)
+                if passed + len(failures) < n:
+                    low, high = wilson_interval(passed, passed + len(failures), level)
+                    decided = low >= pass_rate or high < pass_rate
+                    if decided:
+                        break
+
+        total = passed + len(failures)
+        low, high = wilson_interval(passed, total, level)
+        result = {"passed": passed, "samples": total, "budget": n, "low": low, "high": high, "level": level,
+                  "pass_rate": pass_rate, "decided": decided, "shared": shared}
+        pyfuncitem.user_properties.append((self.PROPERTY, result))
+        # Stopped early, the interval lies on the side of the pass rate the share of passes is on
+        if passed / total < pass_rate:
+            pytest.fail(f"Passed {passed} of {total} samples ({passed / total:.0%}, {level:.1%} CI "
+                        f"{low:.0%}-{high:.0%}), below the required {pass_rate:.0%}. "
+                        f"First failure: {failures[0]}", pytrace=False)
+        return True
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call":
+            result = dict(report.user_properties).get(self.PROPERTY)
+            if result is not None:
+                self.results[report.nodeid] = result
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.results or hasattr(self.config, "workerinput"):
+            return
+        terminalreporter.section("self-consistency")
+        drawn = budget = 0
+        for nodeid, r in sorted(self.results.items()):
+            drawn += r["samples"]
+            budget += r["budget"]
+            verdict = "stopped early" if r["decided"] else "decided by the pass rate"
+            terminalreporter.write_line(f"{nodeid}: {r['passed']}/{r['samples']} passed "
+                                        f"({r['level']:.1%} CI {r['low']:.0%}-{r['high']:.0%}, "
+                                        f"needs {r['pass_rate']:.0%}), {verdict} after {r['samples']} of "
+                                        f"{r['budget']} samples"
+                                        + (f", one at a time (shares {', '.join(r['shared'])})" if r["shared"] else ""))
+        terminalreporter.write_line(f"Samples drawn: {drawn} of {budget} "
+                                    f"({1 - drawn / budget:.0%} saved by early stopping)")
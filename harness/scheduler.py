@@ -0,0 +1,185 @@
+import hashlib, os, random, tempfile, threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+import pytest
+from clients.balancer import format_host_stats, merge_host_stats
+from clients.baseclient import BaseLLMClient
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock, so slots are only shared between the threads of a process
+    fcntl = None
+
+DEFAULT_MODEL_CAPACITY = 4
+
+
+def default_model_capacity() -> int:
+    """$OLLAMA_NUM_PARALLEL, the server's requests per model, or DEFAULT_MODEL_CAPACITY when unset"""
+    value = os.environ.get("OLLAMA_NUM_PARALLEL", "").strip()
+    if not value:
+        return DEFAULT_MODEL_CAPACITY
+    try:
+        return max(1, int(value))
+    except ValueError:
+        raise ValueError(f"OLLAMA_NUM_PARALLEL must be a whole number of requests, got '{value}'") from None
+
+
+class ModelSlots:
+    """
+    Counting semaphore shared by every thread and process on this machine.
+
+    Each of the ``capacity`` slots is a lock file; holding an exclusive
+    ``flock`` on one of them is holding the slot. The kernel releases the lock
+    if the holder dies, so a crashed pytest worker never leaks a slot. Threads
+    of one process first wait on an in-process semaphore; a thread that finds
+    every slot taken by other processes blocks in ``flock`` on one of them
+    rather than polling. Without ``fcntl`` (Windows) only the in-process
+    semaphore applies.
+    """
+
+    def __init__(self, key: str, capacity: Optional[int] = None, directory: Optional[str] = None):
+        # No slots at all would block every call for ever
+        self.capacity = capacity = max(1, default_model_capacity() if capacity is None else capacity)
+        self._local = threading.BoundedSemaphore(capacity)
+        self._paths: List[str] = []
+        if fcntl is not None:
+            directory = directory or os.path.join(tempfile.gettempdir(), "llm-slots")
+            os.makedirs(directory, exist_ok=True)
+            digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+            self._paths = [os.path.join(directory, f"{digest}-{i}.lock") for i in range(capacity)]
+
+    def acquire(self) -> Optional[int]:
+        """Take a slot; returns the lock file descriptor to release (None without ``fcntl``)"""
+        self._local.acquire()
+        if fcntl is None:
+            return None
+        try:
+            start = random.randrange(self.capacity)
+            for i in range(self.capacity):
+                fd = os.open(self._paths[(start + i) % self.capacity], os.O_CREAT | os.O_RDWR)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    os.close(fd)
+            # Every slot is held by other processes: sleep in the kernel until this one frees
+            fd = os.open(self._paths[start], os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            return fd
+        except BaseException:
+            self._local.release()
+            raise
+
+    def release(self, fd: Optional[int]) -> None:
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._local.release()
+
+    @contextmanager
+    def slot(self):
+        fd = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(fd)
+
+
+class ThrottledClient(BaseLLMClient):
+    """Wraps a client so at most ``slots.capacity`` generate calls reach the model at once"""
+
+    def __init__(self, client: BaseLLMClient, slots: ModelSlots):
+        self.client = client
+        self.slots = slots
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def is_model_available(self) -> bool:
+        return self.client.is_model_available()
+
+    def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        with self.slots.slot():
+            return self.client.generate(prompt, **kwargs)
+
+
+class DurationHistory:
+    """
+    Pytest plugin remembering how long each test took, in pytest's cache.
+
+    Durations are smoothed with an exponential moving average. With
+    ``longest_first`` the collected tests are reordered slowest first (tests
+    with no history before all others), which keeps the makespan short when
+    pytest-xdist hands them out to workers in order.
+    """
+
+    CACHE_KEY = "llm/durations"
+
+    def __init__(self, config, longest_first: bool = False, alpha: float = 0.5):
+        self.config = config
+        self.longest_first = longest_first
+        self.alpha = alpha
+        # config.cache is missing altogether with -p no:cacheprovider
+        self.cache = getattr(config, "cache", None)
+        self.durations: Dict[str, float] = self.cache.get(self.CACHE_KEY, {}) if self.cache else {}
+
+    def estimate(self, nodeid: str) -> Optional[float]:
+        return self.durations.get(nodeid)
+
+    def record(self, nodeid: str, seconds: float) -> None:
+        previous = self.durations.get(nodeid)
+        self.durations[nodeid] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+
+    def order(self, items: List[Any]) -> List[Any]:
+        return sorted(items, key=lambda item: -self.durations.get(item.nodeid, float("inf")))
+
+    def pytest_collection_modifyitems(self, config, items):
+        if self.longest_first:
+            items[:] = self.order(items)
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call" and not report.skipped:
+            self.record(report.nodeid, report.duration)
+
+    def pytest_sessionfinish(self, session):
+        # Under xdist the controller sees every worker's reports; only it writes the history
+        if self.cache is not None and not hasattr(self.config, "workerinput"):
+            self.cache.set(self.CACHE_KEY, self.durations)
+
+
+class HostThroughput:
+    """
+    Pytest plugin reporting, at the end of the run, what each host of a
+    BalancedClient delivered. pytest-xdist workers hand their stats to the
+    controller, which merges them.
+    """
+
+    WORKER_KEY = "llm_host_stats"
+
+    def __init__(self, config):
+        self.config = config
+        self.parts: List[Dict[str, Dict[str, Any]]] = []
+
+    def add(self, stats: Dict[str, Dict[str, Any]]) -> None:
+        if hasattr(self.config, "workeroutput"):
+            self.config.workeroutput[self.WORKER_KEY] = stats
+        else:
+            self.parts.append(stats)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        stats = getattr(node, "workeroutput", {}).get(self.WORKER_KEY)
+        if stats:
+            self.parts.append(stats)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.parts:
+            return
+        terminalreporter.section("per-host throughput")
+        for line in format_host_stats(merge_host_stats(self.parts)):
+            terminalreporter.write_line(line)
@@ -0,0 +1,178 @@
+"""
+Embedding similarity for answer checks that should accept paraphrases.
+
+Keyword checks fail a correct summary that words things differently ("won
+the 1921 physics prize" never says "Nobel"). With similarity on, a check
+whose keywords are missing still passes when the answer's embedding is close
+enough (cosine similarity) to the test's reference answer. Topical closeness
+says nothing about which entity an answer names or whether it refuses, so
+entity and refusal checks stay keyword-only.
+
+Embeddings come from the backend's embedding endpoint or from a local
+sentence-transformers model on the CPU. They are computed in batches and kept
+in an on-disk index keyed by a hash of the text, so a reference answer is
+embedded once per embedding model and every later run reads it back.
+"""
+import glob, hashlib, os, re, threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clients.cache import DEFAULT_CACHE_DIR
+
+SIMILARITY_MODES = ("off", "backend", "local")
+DEFAULT_INDEX_DIR = os.path.join(DEFAULT_CACHE_DIR, "embeddings")
+DEFAULT_LOCAL_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_THRESHOLD = 0.75
+DEFAULT_BATCH_SIZE = 32
+
+Embed = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+def text_key(text: str) -> bytes:
+    """Index key of a text: the first 128 bits of its SHA-256, in hex"""
+    return hashlib.sha256(text.encode()).hexdigest()[:32].encode()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length, so cosine similarity is a dot product"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class EmbeddingIndex:
+    """
+    Append-only file of embeddings: fixed-size records of a text key and a
+    float32 vector, read through a memory map. Each batch is appended with a
+    single write, so pytest-xdist workers can share the file; records other
+    processes added are picked up by remapping when a key is not found. The
+    vector size is part of the file name and is learnt from the first batch.
+    """
+
+    def __init__(self, directory: str, name: str):
+        os.makedirs(directory, exist_ok=True)
+        self.base = os.path.join(directory, re.sub(r"[^\w.-]+", "_", name))
+        existing = sorted(glob.glob(glob.escape(self.base) + ".*d.emb"), key=os.path.getmtime)
+        self.dim: Optional[int] = int(existing[-1].rsplit(".", 2)[-2][:-1]) if existing else None
+        self.rows: Dict[bytes, int] = {}
+        self._records: Optional[np.memmap] = None
+        self._scanned = 0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return f"{self.base}.{self.dim}d.emb"
+
+    def _dtype(self) -> np.dtype:
+        return np.dtype([("key", "S32"), ("vector", "<f4", (self.dim,))])
+
+    def _refresh(self) -> None:
+        if self.dim is None or not os.path.exists(self.path):
+            return
+        count = os.path.getsize(self.path) // self._dtype().itemsize
+        if count == self._scanned:
+            return
+        self._records = np.memmap(self.path, dtype=self._dtype(), mode="r", shape=(count,))
+        keys = self._records["key"]
+        for row in range(self._scanned, count):
+            key = bytes(keys[row])
+            if not key:
+                # Another process is still writing this record
+                break
+            self.rows[key] = row
+            self._scanned = row + 1
+
+    def get(self, keys: Sequence[bytes]) -> Dict[bytes, int]:
+        """Rows of the ``keys`` the index holds"""
+        with self._lock:
+            if any(key not in self.rows for key in keys):
+                self._refresh()
+            return {key: self.rows[key] for key in keys if key in self.rows}
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        with self._lock:
+            return np.array(self._records["vector"][list(rows)])
+
+    def add(self, keys: Sequence[bytes], vectors: np.ndarray) -> None:
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embeddings of size {vectors.shape[1]} don't fit index {self.path}")
+            records = np.empty(len(keys), dtype=self._dtype())
+            records["key"] = keys
+            records["vector"] = vectors
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, records.tobytes())
+            finally:
+                os.close(fd)
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class SemanticMatcher:
+    """
+    Scores answers against reference texts by the cosine similarity of their
+    embeddings. ``embed`` maps a list of texts to their vectors; the texts the
+    index does not hold yet are embedded ``batch_size`` at a time and stored.
+    ``name`` identifies the embedding model, since vectors of different models
+    don't compare.
+    """
+
+    def __init__(self, embed: Embed, name: str, directory: str = DEFAULT_INDEX_DIR,
+                 threshold: float = DEFAULT_THRESHOLD, batch_size: int = DEFAULT_BATCH_SIZE):
+        self._embed = embed
+        self.name = name
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.index = EmbeddingIndex(directory, name)
+        self.embedded = 0
+        self.reused = 0
+
+    def vectors(self, texts: Sequence[str]) -> np.ndarray:
+        """Unit-length embeddings of ``texts``, one row per text"""
+        keys = [text_key(text) for text in texts]
+        rows = self.index.get(keys)
+        missing = list({key: text for key, text in zip(keys, texts) if key not in rows}.items())
+        # Fresh vectors are used as embedded: the index can't map them yet while a record another
+        # process appended before them is still being written
+        fresh: Dict[bytes, np.ndarray] = {}
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors = normalize(np.asarray(self._embed([text for _, text in batch]), dtype=np.float32))
+            self.index.add([key for key, _ in batch], vectors)
+            fresh.update(zip([key for key, _ in batch], vectors))
+        self.embedded += len(missing)
+        self.reused += len(rows)
+        stored = dict(zip(rows, self.index.vectors(list(rows.values())))) if rows else {}
+        return np.array([stored[key] if key in stored else fresh[key] for key in keys], dtype=np.float32)
+
+    def scores(self, texts: Sequence[str], references: Sequence[str]) -> np.ndarray:
+        """Cosine similarity of every text (rows) to every reference (columns)"""
+        matrix = self.vectors([*texts, *references])
+        return matrix[:len(texts)] @ matrix[len(texts):].T
+
+    def similarity(self, text: str, reference: str) -> float:
+        return float(self.scores([text], [reference])[0, 0])
+
+    def best(self, text: str, references: Sequence[str]) -> Tuple[float, str]:
+        """The highest similarity of ``text`` to any of ``references``, and that reference"""
+        row = self.scores([text], references)[0]
+        i = int(np.argmax(row))
+        return float(row[i]), references[i]
+
+    def matches(self, text: str, references: Sequence[str], threshold: Optional[float] = None) -> bool:
+        return self.best(text, references)[0] >= (self.threshold if threshold is None else threshold)
+
+
+def local_embedder(model_name: str = DEFAULT_LOCAL_MODEL) -> Embed:
+    """A sentence-transformers model run on the CPU; needs ``pip install sentence-transformers``"""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError("Local embeddings need sentence-transformers: pip install sentence-transformers") from e
+    model = SentenceTransformer(model_name, device="cpu")
+    return lambda texts: model.encode(list(texts), batch_size=len(texts), convert_to_numpy=True)
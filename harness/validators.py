@@ -0,0 +1,288 @@
+"""
+Incremental validators for streamed structured output.
+
+A validator consumes the response as it arrives and reaches a verdict as soon
+as one is certain: JSON that can no longer become valid (or whose fields
+already disagree with the expected ones) fails at the offending character, and
+a numbered list passes once enough items are complete. Passed as ``stop_when``
+they end the generation at that point::
+
+    validator = JsonValidator({"name": "John"})
+    response = llm_client.generate(prompt, stop_when=validator)
+    assert validator.finish(response["text"]), validator.error
+
+Each call only looks at the text added since the previous one.
+"""
+import json, re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = " \t\n\r"
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_NUMBER_CHARS = set("0123456789+-.eE")
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = set('"\\/bfnrtu')
+_HEX = set("0123456789abcdefABCDEF")
+_ITEM = re.compile(r"\d+\.\s+\S")
+
+
+class StreamValidator(ABC):
+    """
+    Base for incremental validators. ``verdict`` is None while undecided, then
+    True or False (with the reason in ``error``); calling the validator with the
+    text so far feeds it the new part and returns whether a verdict is reached.
+    """
+
+    def __init__(self):
+        self.verdict: Optional[bool] = None
+        self.error = ""
+        self._consumed = 0
+
+    def __call__(self, text: str) -> bool:
+        if self.verdict is None and len(text) > self._consumed:
+            self.feed(text[self._consumed:])
+        self._consumed = max(self._consumed, len(text))
+        return self.verdict is not None
+
+    @abstractmethod
+    def feed(self, chunk: str) -> None:
+        """Consume the next part of the output, setting the verdict once it is certain"""
+        pass
+
+    def finish(self, text: str) -> bool:
+        """Consume whatever of ``text`` is still unseen, treat it as the whole output and return the verdict"""
+        self(text)
+        if self.verdict is None:
+            self._end()
+        return bool(self.verdict)
+
+    @abstractmethod
+    def _end(self) -> None:
+        """The output is complete: settle the verdict"""
+        pass
+
+    def _fail(self, error: str) -> None:
+        self.verdict = False
+        self.error = error
+
+
+class JsonValidator(StreamValidator):
+    """
+    Streaming JSON syntax check plus expected ``fields`` of the top-level object
+    (or of the first element of a top-level list). A field value is decoded once,
+    from just its own characters, when it completes; an expected value that is a
+    type is checked with isinstance, anything else by comparing ``str`` forms.
+    """
+
+    def __init__(self, fields: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.fields = dict(fields or {})
+        self.found: Dict[str, Any] = {}
+        self._stack: List[str] = []
+        self._expect = "value"
+        self._token: Optional[str] = None
+        self._chars: List[str] = []
+        self._escape = 0
+        self._is_key = False
+        self._key: Optional[str] = None
+        self._target_depth: Optional[int] = None
+        self._target_closed = False
+        self._capture: Optional[List[str]] = None
+        self._capture_depth = 0
+        self._pos = 0
+
+    def __repr__(self) -> str:
+        # Stable across runs, so response cache keys that include stop_when stay stable too
+        return f"JsonValidator({self.fields!r})"
+
+    def feed(self, chunk: str) -> None:
+        for c in chunk:
+            self._char(c)
+            if self.verdict is not None:
+                return
+
+    def _char(self, c: str) -> None:
+        self._pos += 1
+        if self._token == "number" and c not in _NUMBER_CHARS:
+            self._end_number()
+            if self.verdict is not None:
+                return
+        if self._capture is not None:
+            self._capture.append(c)
+        if self._token == "string":
+            self._string_char(c)
+        elif self._token == "number":
+            self._chars.append(c)
+        elif self._token == "literal":
+            self._chars.append(c)
+            word = "".join(self._chars)
+            if word in _LITERALS:
+                self._token = None
+                self._end_value()
+            elif not any(literal.startswith(word) for literal in _LITERALS):
+                self._fail(f"Expecting value at char {self._pos - len(word) + 1}")
+        elif c not in _WHITESPACE:
+            self._structural(c)
+
+    def _string_char(self, c: str) -> None:
+        if self._escape == -1:
+            if c not in _ESCAPES:
+                return self._fail(f"Invalid \\escape at char {self._pos}")
+            self._escape = 4 if c == "u" else 0
+        elif self._escape > 0:
+            if c not in _HEX:
+                return self._fail(f"Invalid \\uXXXX escape at char {self._pos}")
+            self._escape -= 1
+        elif c == "\\":
+            self._escape = -1
+        elif c == '"':
+            self._token = None
+            return self._end_key() if self._is_key else self._end_value()
+        elif c < " ":
+            return self._fail(f"Invalid control character at char {self._pos}")
+        if self._is_key:
+            self._chars.append(c)
+
+    def _structural(self, c: str) -> None:
+        expect = self._expect
+        if expect == "end":
+            self._fail(f"Extra data at char {self._pos}")
+        elif expect == "colon":
+            if c != ":":
+                return self._fail(f"Expecting ':' delimiter at char {self._pos}")
+            self._expect = "value"
+        elif expect == "comma_or_close":
+            if c == ",":
+                self._expect = "key" if self._stack[-1] == "{" else "value"
+            elif c == ("}" if self._stack[-1] == "{" else "]"):
+                self._close()
+            else:
+                self._fail(f"Expecting ',' delimiter at char {self._pos}")
+        elif expect in ("key", "key_or_close"):
+            if c == '"':
+                self._token, self._is_key, self._chars = "string", True, []
+            elif c == "}" and expect == "key_or_close":
+                self._close()
+            else:
+                self._fail(f"Expecting property name enclosed in double quotes at char {self._pos}")
+        elif c == "]" and expect == "value_or_close":
+            if self._target_depth is None:
+                return self._fail("Expected non-empty list, got []")
+            self._close()
+        else:
+            self._start_value(c)
+
+    def _in_target(self) -> bool:
+        return len(self._stack) == self._target_depth and not self._target_closed
+
+    def _start_value(self, c: str) -> None:
+        depth = len(self._stack)
+        if self._target_depth is None and c != "{" and (depth == 1 or c != "["):
+            return self._fail(f"Expected JSON object at char {self._pos}")
+        if self._in_target() and self._key in self.fields:
+            self._capture, self._capture_depth = [c], depth
+        if c in "{[":
+            self._stack.append(c)
+            self._expect = "key_or_close" if c == "{" else "value_or_close"
+            if c == "{" and self._target_depth is None:
+                self._target_depth = depth + 1
+        elif c == '"':
+            self._token, self._is_key = "string", False
+        elif c in "-0123456789":
+            self._token, self._chars = "number", [c]
+        elif c in "tfn":
+            self._token, self._chars = "literal", [c]
+        else:
+            self._fail(f"Expecting value at char {self._pos}")
+
+    def _end_key(self) -> None:
+        if self._in_target():
+            self._key = json.loads('"' + "".join(self._chars) + '"')
+        self._expect = "colon"
+
+    def _end_number(self) -> None:
+        self._token = None
+        number = "".join(self._chars)
+        if not _NUMBER.fullmatch(number):
+            return self._fail(f"Invalid number {number!r} ending at char {self._pos - 1}")
+        self._end_value()
+
+    def _close(self) -> None:
+        if self._in_target():
+            self._target_closed = True
+            missing = [field for field in self.fields if field not in self.found]
+            if missing:
+                return self._fail(f"Expected {missing[0]}='{self.fields[missing[0]]}', got None")
+        self._stack.pop()
+        self._end_value()
+
+    def _end_value(self) -> None:
+        if self._capture is not None and len(self._stack) == self._capture_depth:
+            self._check_field(self._key, json.loads("".join(self._capture)))
+            self._capture = None
+            if self.verdict is not None:
+                return
+        self._expect = "comma_or_close" if self._stack else "end"
+
+    def _check_field(self, field: str, value: Any) -> None:
+        self.found[field] = value
+        expected = self.fields[field]
+        if isinstance(expected, type):
+            if not isinstance(value, expected):
+                self._fail(f"Expected {field} of type {expected.__name__}, got {value!r}")
+        elif str(value) != str(expected):
+            self._fail(f"Expected {field}='{expected}', got {value}")
+
+    def _end(self) -> None:
+        if self._token == "number":
+            self._end_number()
+            if self.verdict is not None:
+                return
+        if not self._stack and self._expect == "value" and self._token is None:
+            self._fail("Expecting value: empty output")
+        elif self._token or self._expect != "end":
+            self._fail(f"Unexpected end of output at char {self._pos}")
+        else:
+            self.verdict = True
+
+
+class NumberedListValidator(StreamValidator):
+    """
+    Counts complete ``1. item`` lines and passes once ``min_items`` are in;
+    leading whitespace of the output is ignored. Only the current, unfinished
+    line is buffered.
+    """
+
+    def __init__(self, min_items: int = 3):
+        super().__init__()
+        self.min_items = min_items
+        self.items = 0
+        self._line: List[str] = []
+        self._started = False
+
+    def __repr__(self) -> str:
+        return f"NumberedListValidator(min_items={self.min_items})"
+
+    def feed(self, chunk: str) -> None:
+        if not self._started:
+            chunk = chunk.lstrip()
+            self._started = bool(chunk)
+        *complete, rest = chunk.split("\n")
+        for line in complete:
+            self._line.append(line)
+            self._count_line()
+            if self.verdict is not None:
+                return
+        self._line.append(rest)
+
+    def _count_line(self) -> None:
+        if _ITEM.match("".join(self._line)):
+            self.items += 1
+            if self.items >= self.min_items:
+                self.verdict = True
+        self._line = []
+
+    def _end(self) -> None:
+        self._count_line()
+        if self.verdict is None:
+            self._fail(f"Expected at least {self.min_items} numbered items, found {self.items}.")
@@ -0,0 +1,68 @@
+import asyncio
+import gc
+import time
+import warnings
+
+from clients.async_ollama_client import AsyncOllamaClient
+from harness.mock_server import MockOllamaServer, MockProfile
+
+SLOW = MockProfile({"ttft": {"dist": "fixed", "value": 0.1}, "num_parallel": 8, "default_response": "Hi."})
+
+
+def test_semaphore_bounds_calls_on_the_wire_and_reports_queue_wait():
+    with MockOllamaServer(SLOW) as server:
+        client = AsyncOllamaClient(port=server.port, max_concurrency=2)
+
+        async def run_all():
+            async with client:
+                return await asyncio.gather(*(client.agenerate(f"q{i}") for i in range(6)))
+
+        start = time.monotonic()
+        responses = asyncio.run(run_all())
+        elapsed = time.monotonic() - start
+    assert all(not r["error"] and r["text"] == "Hi." for r in responses)
+    # Three waves of two calls
+    assert elapsed >= 0.3
+    waits = sorted(r["queue_wait"] for r in responses)
+    assert waits[1] < 0.05 and waits[2] > 0.08 and waits[-1] > 0.18
+    assert all(0.1 <= r["latency"] < 0.18 for r in responses)
+
+
+def test_sessions_are_closed_with_their_loop_and_rebuilt():
+    with MockOllamaServer() as server:
+        client = AsyncOllamaClient(port=server.port)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert not asyncio.run(client.agenerate("first"))["error"]
+            first = client._session
+            assert first.closed
+            assert not asyncio.run(client.agenerate("second"))["error"]
+            assert client._session is not first and client._session.closed
+            asyncio.run(client.aclose())
+            gc.collect()
+        assert server.requests == 2
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)], [str(w.message) for w in caught]
+
+
+def test_sessions_of_loops_that_were_not_shut_down():
+    with MockOllamaServer() as server:
+        client = AsyncOllamaClient(port=server.port)
+        closed, running = asyncio.new_event_loop(), asyncio.new_event_loop()
+        assert not closed.run_until_complete(client.agenerate("first"))["error"]
+        stale = client._session
+        closed.close()
+        assert not running.run_until_complete(client.agenerate("second"))["error"]
+        assert stale.closed
+        # A loop that is still open closes its session itself when it shuts down
+        stale = client._session
+        assert not asyncio.run(client.agenerate("third"))["error"]
+        assert not stale.closed
+        running.run_until_complete(running.shutdown_asyncgens())
+        assert stale.closed
+        running.close()
+
+
+def test_errors_are_reported_not_raised():
+    client = AsyncOllamaClient(port=1, timeout=2)
+    response = asyncio.run(client.agenerate("hi"))
+    assert response["error"] and response["text"] == "" and response["queue_wait"] == 0.0
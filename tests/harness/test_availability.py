@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from clients.availability import availability_cache, model_listed
+from clients.ollama_client import OllamaClient
+from harness.mock_server import MockOllamaServer, MockProfile
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    availability_cache.clear()
+    yield
+    availability_cache.clear()
+
+
+def test_untagged_names_mean_latest():
+    with MockOllamaServer(MockProfile({"models": ["llama3", "phi3:mini"]})) as server:
+        available = {m: OllamaClient(model=m, port=server.port).is_model_available()
+                     for m in ("llama3", "llama3:latest", "llama3:8b", "phi3:mini", "phi3")}
+    assert available == {"llama3": True, "llama3:latest": True, "llama3:8b": False, "phi3:mini": True,
+                         "phi3": False}
+    assert model_listed({"models": [{"model": "llama3:latest"}]}, "llama3")
+    assert not model_listed({}, "llama3")
+
+
+def test_listing_is_cached_until_the_ttl_expires():
+    with MockOllamaServer(MockProfile({"models": ["llama3"]})) as server:
+        client = OllamaClient(model="llama3", port=server.port, availability_ttl=0.2)
+        assert client.is_model_available()
+        # Other clients of the same server and model share the answer
+        assert OllamaClient(model="llama3", port=server.port).is_model_available()
+        server.profile.spec["models"] = []
+        assert client.is_model_available()
+        assert client.connection_stats()["requests"] == 1
+        time.sleep(0.25)
+        assert not client.is_model_available()
+        assert client.connection_stats()["requests"] == 2
+
+
+def test_warm_up_loads_each_model_once():
+    with MockOllamaServer(MockProfile({"models": ["a", "b"], "load_time": 0.2})) as server:
+        a, b = OllamaClient(model="a", port=server.port), OllamaClient(model="b", port=server.port)
+        assert a.warm_up() >= 0.2
+        assert a.warm_up() < 0.1 and OllamaClient(model="a", port=server.port).warm_up() < 0.1
+        assert b.warm_up() >= 0.2
+        assert server.loads == 2
+        # The model is resident, so generating pays no load time either
+        assert a.generate("Hi")["load_time"] == 0.0
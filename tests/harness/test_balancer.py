@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from clients.baseclient import BaseLLMClient
+from clients.balancer import BalancedClient, CircuitBreaker, merge_host_stats, parse_hosts
+
+
+class FakeHost(BaseLLMClient):
+    """Answers after ``latency`` seconds, or with an error while ``down``"""
+
+    def __init__(self, name, latency=0.0, down=False, available=True):
+        self.model = "m"
+        self.base_url = name
+        self.latency = latency
+        self.down = down
+        self.available = available
+        self.calls = 0
+        self.running = self.most_running = 0
+        self._lock = threading.Lock()
+
+    def is_model_available(self) -> bool:
+        return self.available
+
+    def generate(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running -= 1
+        if self.down:
+            return {"text": "", "error": "connection refused", "latency": 0.0}
+        return {"text": self.base_url, "error": "", "latency": self.latency, "completion_tokens": 2}
+
+
+def test_parse_hosts():
+    assert parse_hosts("gpu1:11434, gpu2,,10.0.0.3:11435") == [("gpu1", 11434), ("gpu2", None), ("10.0.0.3", 11435)]
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert (breaker.state, breaker.trips, breaker.allow()) == ("open", 1, False)
+    time.sleep(0.06)
+    assert breaker.available() and breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()
+    breaker.failure()
+    assert (breaker.state, breaker.trips) == ("open", 2)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.success()
+    assert (breaker.state, breaker.failures) == ("closed", 0)
+
+
+def test_failed_calls_are_retried_elsewhere_and_trip_the_host():
+    # Hosts without a latency yet are tried first, so the bad one keeps getting calls until it trips
+    bad, good = FakeHost("bad", down=True), FakeHost("good", latency=0.001)
+    client = BalancedClient([bad, good], failure_threshold=2, reset_timeout=60)
+    responses = [client.generate("p") for _ in range(6)]
+    assert all(r["text"] == "good" and not r["error"] for r in responses)
+    assert bad.calls == 2
+    stats = client.host_stats()
+    assert stats["bad"]["state"] == "open" and stats["bad"]["failures"] == 2
+    assert stats["good"]["requests"] == 6 and stats["good"]["completion_tokens"] == 12
+
+
+def test_no_healthy_hosts():
+    client = BalancedClient([FakeHost("a", down=True)], failure_threshold=1, reset_timeout=60)
+    assert client.generate("p")["error"] == "connection refused"
+    assert client.generate("p")["error"] == "No healthy hosts"
+    unavailable = BalancedClient([FakeHost("a", available=False), FakeHost("b")])
+    assert unavailable.is_model_available()
+    assert unavailable.host_stats()["a"]["state"] == "open"
+    assert not BalancedClient([FakeHost("a", available=False)]).is_model_available()
+    with pytest.raises(ValueError):
+        BalancedClient([FakeHost("a")], strategy="round-robin")
+
+
+def test_least_outstanding_spreads_concurrent_calls():
+    hosts = [FakeHost(f"h{i}", latency=0.02) for i in range(3)]
+    client = BalancedClient(hosts)
+    with ThreadPoolExecutor(6) as pool:
+        list(pool.map(lambda _: client.generate("p"), range(12)))
+    assert all(h.calls >= 2 and h.most_running <= 2 for h in hosts)
+
+
+def test_latency_strategy_prefers_the_faster_host():
+    fast, slow = FakeHost("fast", latency=0.001), FakeHost("slow", latency=0.02)
+    client = BalancedClient([fast, slow], strategy="latency")
+    for _ in range(20):
+        client.generate("p")
+    assert slow.calls == 1 and fast.calls == 19
+
+
+def test_host_stats_of_workers_merge():
+    part = {"a": {"state": "closed", "trips": 0, "requests": 4, "failures": 0, "completion_tokens": 8,
+                  "busy": 2.0, "first": 10.0, "last": 12.0}}
+    other = {"a": {**part["a"], "state": "open", "trips": 1, "first": 11.0, "last": 14.0}}
+    merged = merge_host_stats([part, other])["a"]
+    assert (merged["state"], merged["requests"], merged["first"], merged["last"]) == ("open", 8, 10.0, 14.0)
+    assert merged["requests_per_sec"] == 2.0 and merged["mean_latency"] == 0.5
@@ -0,0 +1,60 @@
+import statistics
+
+import pytest
+
+from harness.benchmark import BenchmarkResult, percentile, reject_outliers, run_benchmark
+
+STEADY = [1.0, 1.1, 0.9, 1.0, 1.05, 0.95, 1.0, 1.02, 0.98]
+
+
+def test_percentile_interpolates_between_ranks():
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile([1, 2, 3, 4, 5], 0) == 1
+    assert percentile([1, 2, 3, 4, 5], 100) == 5
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_reject_outliers_keeps_ordinary_jitter():
+    kept, rejected = reject_outliers(STEADY + [9.0])
+    assert rejected == [9.0]
+    assert kept == STEADY
+    assert reject_outliers([1.0, 1.0, 1.0, 1.01, 0.99])[1] == []
+
+
+def test_slow_tail_counts_for_percentiles_not_for_mean():
+    values = iter(STEADY + [9.0])
+    result = run_benchmark(lambda: next(values), "latency", samples=10, warmup=0)
+    assert result.samples == STEADY + [9.0]
+    assert result.rejected == [9.0]
+    assert result.mean == pytest.approx(statistics.fmean(STEADY))
+    assert result.percentile(95) > 5
+    with pytest.raises(AssertionError, match="p95"):
+        result.assert_percentile(95, max=2.0)
+
+
+def test_without_rejection_everything_is_kept():
+    result = run_benchmark(iter(STEADY + [9.0]).__next__, samples=10, warmup=0, reject=False)
+    assert result.kept == result.samples and result.rejected == []
+
+
+def test_warmup_runs_are_discarded():
+    values = iter([100.0] + STEADY)
+    result = run_benchmark(lambda: next(values), samples=9, warmup=1)
+    assert max(result.samples) < 2
+
+
+def test_summary_flags_percentiles_too_few_samples_resolve():
+    small = BenchmarkResult("small", STEADY, [])
+    assert not small.resolves(99) and not small.resolves(95) and small.resolves(50)
+    assert "p99=" in small.summary() and "~max" in small.summary()
+    large = BenchmarkResult("large", STEADY * 12, [])
+    assert large.resolves(99)
+    assert "~max" not in large.summary()
+
+
+def test_ci_is_reproducible_and_brackets_the_mean():
+    result = BenchmarkResult("r", STEADY, [])
+    low, high = result.ci()
+    assert low <= result.mean <= high
+    assert result.ci() == (low, high)
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+
+from clients.baseclient import BaseLLMClient
+from harness.budgets import BudgetedClient, GenerationBudgets
+
+
+class FakeClient(BaseLLMClient):
+    """Answers with ``length`` tokens, cut at ``max_tokens``"""
+
+    endpoint = "fake://server"
+
+    def __init__(self, model: str, length: int = 40):
+        self.model = model
+        self.length = length
+        self.kwargs = []
+
+    def is_model_available(self) -> bool:
+        return True
+
+    def generate(self, prompt, max_tokens=1000, **kwargs):
+        self.kwargs.append({"max_tokens": max_tokens, **kwargs})
+        tokens = min(self.length, max_tokens)
+        return {"text": "x " * tokens, "error": "", "latency": tokens * 0.01, "completion_tokens": tokens,
+                "decode_time": tokens * 0.01, "truncated": tokens < self.length}
+
+
+class FakeItem:
+    def __init__(self, category="hallucination", nodeid="test_x"):
+        self.nodeid = nodeid
+        self.user_properties = []
+        self._markers = [SimpleNamespace(name=category)]
+
+    def iter_markers(self):
+        return iter(self._markers)
+
+    def get_closest_marker(self, name):
+        return None
+
+
+def run(budgets, client, outcome="passed", category="hallucination"):
+    item = FakeItem(category)
+    budgets.wrap(client, item).generate("prompt")
+    for when in ("call", "teardown"):
+        budgets.pytest_runtest_logreport(SimpleNamespace(nodeid=item.nodeid, when=when, outcome=outcome,
+                                                         failed=outcome == "failed",
+                                                         user_properties=item.user_properties))
+
+
+def finish(budgets):
+    budgets.pytest_sessionfinish(None)
+    budgets.results.clear()
+
+
+@pytest.fixture
+def budgets():
+    return GenerationBudgets(SimpleNamespace(), enabled=True, headroom=1.5)
+
+
+def test_budgets_are_learnt_per_model(budgets):
+    small, large = FakeClient("small", length=10), FakeClient("large", length=100)
+    run(budgets, small)
+    run(budgets, large)
+    finish(budgets)
+    assert budgets.state[budgets.scope(small)]["hallucination"]["budget"] == 15
+    assert budgets.state[budgets.scope(large)]["hallucination"]["budget"] == 150
+    run(budgets, large)
+    assert large.kwargs[-1]["max_tokens"] == 150
+    assert budgets.scope(large, source="mock") == "large@mock"
+
+
+def test_budget_shrinks_while_passing_and_doubles_on_cut_failures(budgets):
+    client = FakeClient("m", length=40)
+    run(budgets, client)
+    finish(budgets)
+    entry = budgets.state[budgets.scope(client)]["hallucination"]
+    entry["budget"] = 30
+    run(budgets, client)
+    finish(budgets)
+    assert entry["budget"] == 24
+    run(budgets, client, outcome="failed")
+    finish(budgets)
+    assert (entry["budget"], entry["floor"]) == (48, 25)
+
+
+def test_budget_converges_on_steady_answers(budgets):
+    # Answers are always 40 tokens and the check needs the first 12 of them
+    client = FakeClient("m", length=40)
+    history = []
+    for _ in range(20):
+        item = FakeItem()
+        response = budgets.wrap(client, item).generate("prompt")
+        outcome = "passed" if response["completion_tokens"] >= 12 else "failed"
+        for when in ("call", "teardown"):
+            budgets.pytest_runtest_logreport(SimpleNamespace(nodeid=item.nodeid, when=when, outcome=outcome,
+                                                             failed=outcome == "failed",
+                                                             user_properties=item.user_properties))
+        finish(budgets)
+        history.append(budgets.state[budgets.scope(client)]["hallucination"]["budget"])
+    assert history[:3] == [60, 40, 32]
+    assert history[-5:] == [12] * 5
+
+
+def test_time_saved_counts_cut_calls(budgets):
+    client = FakeClient("m", length=40)
+    run(budgets, client)
+    finish(budgets)
+    budgets.state[budgets.scope(client)]["hallucination"]["budget"] = 20
+    run(budgets, client)
+    cut, saved = budgets.time_saved(budgets.scope(client), "hallucination")
+    assert cut == 1 and saved == pytest.approx(0.2)
+
+
+def test_chat_sessions_are_budgeted():
+    client = FakeClient("m")
+    session = BudgetedClient(client, max_tokens=5, stop=["\n"]).chat_session(system="Be brief.")
+    session.send("Hi")
+    session.send("Again")
+    assert [k["max_tokens"] for k in client.kwargs] == [5, 5]
+    assert all(k["stop"] == ["\n"] and "messages" in k for k in client.kwargs)
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from harness.bulk import CHECKS, completed_ids, dataset_problems, evaluate, read_cases, run_dataset
+
+MARKERS = {"functionality", "hallucination"}
+
+
+class FakeClient:
+    """Answers "Berlin" unless a case passes parameters it doesn't know"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompt, temperature=0.8):
+        self.prompts.append(prompt)
+        return {"text": "Berlin is the capital.", "latency": 0.1, "completion_tokens": 4, "error": ""}
+
+
+def write_cases(path, cases):
+    path.write_text("".join(json.dumps(case) + "\n" for case in cases))
+    return str(path)
+
+
+def case(n, **fields):
+    return {"id": f"c{n}", "prompt": f"Question {n}", "tags": ["functionality"],
+            "check": {"type": "contains_any", "expected": ["berlin"]}, **fields}
+
+
+def test_checks():
+    text = "1. Berlin\n2. Bonn\n{}"
+    assert CHECKS["contains_all"]("Berlin and Bonn", {"expected": ["berlin", "bonn"]})[0]
+    assert not CHECKS["not_contains"](text, {"expected": ["bonn"]})[0]
+    assert CHECKS["regex"](text, {"expected": r"^2\. Bonn$"})[0]
+    assert CHECKS["min_numbered_items"](text, {"expected": 2})[0]
+    assert CHECKS["json_fields"]('{"city": "Berlin"}', {"expected": {"city": "Berlin"}})[0]
+    assert not CHECKS["json_fields"]("Berlin", {"expected": {"city": "Berlin"}})[0]
+
+
+def test_a_case_that_raises_fails_alone():
+    bad_params = evaluate(FakeClient(), case(1, params={"temprature": 0}))
+    assert not bad_params["passed"] and "TypeError" in bad_params["error"]
+    bad_check = evaluate(FakeClient(), case(2, check={"type": "regex", "expected": "("}))
+    assert not bad_check["passed"] and "raised error" in bad_check["detail"]
+
+
+def test_run_survives_bad_cases_and_resumes_past_them(tmp_path):
+    cases = [case(1), case(2, params={"top_k": 5}), case(3, check={"type": "number", "expected": 3})]
+    out = str(tmp_path / "results.jsonl")
+    summary = run_dataset(FakeClient(), cases, out, workers=2)
+    assert summary["totals"] == {"passed": 1, "failed": 2}
+    assert completed_ids(out) == {"c1", "c2", "c3"}
+
+    client = FakeClient()
+    assert run_dataset(client, cases + [case(4)], out)["totals"] == {"skipped": 3, "passed": 1}
+    assert client.prompts == ["Question 4"]
+
+
+def test_torn_last_line_is_cut_on_resume(tmp_path):
+    out = tmp_path / "results.jsonl"
+    out.write_text('{"id": "c1"}\n{"id": "c2", "pass')
+    assert completed_ids(str(out)) == {"c1"}
+    assert out.read_text() == '{"id": "c1"}\n'
+
+
+def test_cases_are_validated_when_read(tmp_path):
+    path = write_cases(tmp_path / "cases.jsonl", [
+        case(1), case(2, tags=["functionalty"]), case(3, check={"type": "contains_some", "expected": []}),
+        case(4, check={"type": "regex"}), {"id": "c5"}])
+    with open(path, "a") as f:
+        f.write("{not json\n")
+    problems = dataset_problems(path, MARKERS)
+    assert [p.split(":")[0] for p in problems] == ["line 2", "line 3", "line 4", "line 5", "line 6"]
+    assert "unknown tags ['functionalty']" in problems[0]
+    reader = read_cases(path, markers=MARKERS)
+    assert next(reader)["id"] == "c1"
+    with pytest.raises(ValueError, match="line 2"):
+        next(reader)
+
+
+def test_tag_filter(tmp_path):
+    path = write_cases(tmp_path / "cases.jsonl", [case(1), case(2, tags=["hallucination"])])
+    assert [c["id"] for c in read_cases(path, {"hallucination"}, MARKERS)] == ["c2"]
@@ -0,0 +1,106 @@
+import pytest
+
+from clients.baseclient import BaseLLMClient
+from clients.cache import CachedClient, ResponseCache, _describe
+
+
+class FakeClient(BaseLLMClient):
+    endpoint = "fake://server"
+
+    def __init__(self, error=""):
+        self.model = "m"
+        self.error = error
+        self.calls = 0
+
+    def is_model_available(self) -> bool:
+        return False
+
+    def generate(self, prompt, temperature=0.8, max_tokens=100, stop_when=None):
+        self.calls += 1
+        return {"text": f"{prompt}/{temperature}", "error": self.error, "latency": 1.0}
+
+
+class Wrapper(BaseLLMClient):
+    def __init__(self, client):
+        self.client = client
+        self.model = client.model
+
+    def is_model_available(self) -> bool:
+        return True
+
+    def generate(self, prompt, **kwargs):
+        return self.client.generate(prompt, **kwargs)
+
+
+def first_line(text):
+    return text.splitlines()[0]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    yield cache
+    cache.close()
+
+
+def test_record_then_replay(cache):
+    client = FakeClient()
+    recorder = CachedClient(client, cache, "record")
+    assert recorder.generate("hi")["cached"] is False
+    assert recorder.generate("hi", temperature=0.8)["cached"] is True
+    assert recorder.generate("hi", temperature=0.1)["cached"] is False
+    assert (client.calls, recorder.hits, recorder.misses) == (2, 1, 2)
+
+    offline = FakeClient()
+    replay = CachedClient(offline, cache, "replay", source=recorder.source)
+    assert replay.is_model_available()
+    assert replay.generate("hi")["text"] == "hi/0.8"
+    assert "replay mode" in replay.generate("unseen")["error"]
+    assert offline.calls == 0
+
+
+def test_keys_see_through_wrappers_but_not_across_servers(cache):
+    client = FakeClient()
+    CachedClient(client, cache).generate("hi", stop_when=first_line)
+    assert CachedClient(Wrapper(client), cache).generate("hi", stop_when=first_line)["cached"]
+    assert not CachedClient(client, cache).generate("hi")["cached"]
+    assert not CachedClient(client, cache, source="other-server").generate("hi", stop_when=first_line)["cached"]
+
+
+def test_predicates_sharing_a_name_get_their_own_keys(cache):
+    def contains(word):
+        return lambda text: word in text
+
+    def recursive(text):
+        return text and recursive(text[1:])
+
+    client = FakeClient()
+    predicates = [lambda text: "PASS" in text, lambda text: "FAIL" in text, contains("PASS"), contains("FAIL")]
+    assert len({p.__qualname__ for p in predicates[:2]}) == 1
+    for predicate in predicates:
+        assert not CachedClient(client, cache).generate("hi", stop_when=predicate)["cached"]
+    # The same code closing over the same values is the same predicate, in this run or the next
+    assert CachedClient(client, cache).generate("hi", stop_when=contains("PASS"))["cached"]
+    assert " at 0x" not in _describe(contains("PASS")) and _describe(recursive)
+
+
+def test_errors_are_not_stored_and_passthrough_skips_the_cache(cache):
+    CachedClient(FakeClient(error="boom"), cache).generate("hi")
+    assert len(cache) == 0
+    client = FakeClient()
+    passthrough = CachedClient(client, cache, "passthrough")
+    passthrough.generate("hi")
+    passthrough.generate("hi")
+    assert client.calls == 2 and len(cache) == 0
+    with pytest.raises(ValueError):
+        CachedClient(client, cache, "rewind")
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=100)
+    cache.put("a", {"text": "x" * 30})
+    cache.put("b", {"text": "y" * 30})
+    assert cache.get("a") is not None
+    cache.put("c", {"text": "z" * 30})
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    cache.close()
@@ -0,0 +1,73 @@
+from clients.chat import ChatSession
+from clients.ollama_client import OllamaClient
+from harness.mock_server import MockOllamaServer, MockProfile
+
+# A fresh profile per server, as test_failed_turns_stay_out_of_the_conversation switches errors on
+SPEC = {"ttft": {"dist": "fixed", "value": 0.0}, "tokens_per_sec": 1000, "error_status": 400,
+        "answers": [{"match": "capital", "response": "Paris is the capital of France."}],
+        "default_response": "It has about two million people."}
+
+
+def recording(client):
+    """The payloads ``client`` sends, in order"""
+    sent, post = [], client._post
+    client._post = lambda payload, **kwargs: sent.append(payload) or post(payload, **kwargs)
+    return sent
+
+
+def test_chat_mode_sends_the_earlier_messages():
+    with MockOllamaServer(MockProfile(SPEC)) as server:
+        client = OllamaClient(port=server.port)
+        sent = recording(client)
+        session = ChatSession(client, system="Be brief.")
+        session.send("What is the capital of France?")
+        session.send("How many people live there?")
+    assert [m["role"] for m in sent[1]["messages"]] == ["system", "user", "assistant", "user"]
+    assert sent[1]["messages"][2]["content"] == "Paris is the capital of France."
+    assert "context" not in sent[1] and len(session.messages) == 5
+    assert session.turns[1]["reused_tokens"] > 0
+
+
+def test_context_mode_sends_the_returned_context_instead_of_messages():
+    with MockOllamaServer(MockProfile(SPEC)) as server:
+        client = OllamaClient(port=server.port)
+        sent = recording(client)
+        session = ChatSession(client, mode="context")
+        first = session.send("What is the capital of France?")
+        second = session.send("How many people live there?")
+    assert sent[0]["context"] == [] and sent[1]["context"] == first["context"]
+    assert sent[1]["prompt"] == "How many people live there?"
+    assert "messages" not in sent[1] and session.messages == []
+    assert session.context == second["context"]
+    # The whole first exchange came from the server's cache
+    assert second["reused_tokens"] == len(first["context"])
+
+
+def test_failed_turns_stay_out_of_the_conversation():
+    with MockOllamaServer(MockProfile(SPEC)) as server:
+        client = OllamaClient(port=server.port)
+        chat, context = ChatSession(client), ChatSession(client, mode="context")
+        for session in (chat, context):
+            session.send("What is the capital of France?")
+        known = (list(chat.messages), context.context)
+        server.profile.spec["error_rate"] = 1.0
+        for session in (chat, context):
+            assert session.send("How many people live there?")["error"]
+        assert (chat.messages, context.context, context._pending) == (*known, [])
+        assert len(chat.turns) == len(context.turns) == 2
+
+
+def test_turns_without_context_are_carried_over_as_text():
+    with MockOllamaServer(MockProfile(SPEC)) as server:
+        client = OllamaClient(port=server.port)
+        sent = recording(client)
+        session = ChatSession(client, mode="context")
+        session.add("system", "Be brief.")
+        # An early stop returns no context
+        stopped = session.send("What is the capital of France?", stop_when=lambda text: "Paris" in text)
+        assert stopped["stopped_early"] and session.context is None
+        assert session._pending == ["System: Be brief.", "User: What is the capital of France?", "Assistant: Paris"]
+        session.send("How many people live there?")
+    assert sent[1]["prompt"] == ("System: Be brief.\nUser: What is the capital of France?\nAssistant: Paris\n"
+                                 "How many people live there?")
+    assert session._pending == [] and session.context
@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from clients.baseclient import BaseLLMClient
+from clients.coalescing import CoalescingClient
+
+
+class FakeClient(BaseLLMClient):
+    """Takes ``delay`` seconds per call, recording the prompts and how many calls overlapped"""
+
+    def __init__(self, delay=0.05):
+        self.model = "m"
+        self.delay = delay
+        self.prompts = []
+        self.running = self.most_running = 0
+        self._lock = threading.Lock()
+
+    def is_model_available(self) -> bool:
+        return True
+
+    def generate(self, prompt, temperature=0.8):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if prompt == "fail":
+            raise RuntimeError("upstream failed")
+        return {"text": f"{prompt}/{temperature}", "error": ""}
+
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    upstream = FakeClient()
+    client = CoalescingClient(upstream)
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda _: client.generate("same"), range(8)))
+    assert upstream.prompts == ["same"]
+    assert sum(r["coalesced"] for r in responses) == 7
+    assert {r["text"] for r in responses} == {"same/0.8"}
+    assert client.coalescing_stats() == {"requests": 8, "upstream_calls": 1, "saved_calls": 7, "batches": 0}
+    # Once the call has finished, the next identical one goes upstream again
+    assert client.generate("same")["coalesced"] is False
+
+
+def test_different_parameters_are_not_coalesced():
+    upstream = FakeClient()
+    client = CoalescingClient(upstream)
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda t: client.generate("same", temperature=t), (0.1, 0.9)))
+    assert len(upstream.prompts) == 2
+
+
+def test_followers_see_the_leaders_error():
+    client = CoalescingClient(FakeClient())
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(client.generate, "fail") for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    assert client.coalescing_stats()["upstream_calls"] == 1
+
+
+def test_micro_batches_are_bounded():
+    upstream = FakeClient()
+    client = CoalescingClient(upstream, batch_window=0.02, max_batch=3)
+    try:
+        with ThreadPoolExecutor(9) as pool:
+            list(pool.map(lambda i: client.generate(f"p{i}"), range(9)))
+        assert sorted(upstream.prompts) == [f"p{i}" for i in range(9)]
+        assert upstream.most_running <= 3
+        assert client.coalescing_stats()["batches"] < 9
+        # A lone call goes out without waiting for the window
+        assert client.generate("alone")["text"] == "alone/0.8"
+    finally:
+        client.close()
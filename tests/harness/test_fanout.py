@@ -0,0 +1,67 @@
+import json
+import sys
+from types import SimpleNamespace
+
+from clients.instrumentation import instrumentation
+from harness.fanout import (RunMetrics, differing_tests, format_comparison, load_metrics, pytest_command,
+                            summarize)
+from harness.results import StreamingStats
+
+
+def write_part(path, tests, latencies, wall_time=1.0, tokens_per_call=10):
+    path.write_text(json.dumps({
+        "backend": "stub", "model": None, "wall_time": wall_time, "tests": tests, "calls": len(latencies),
+        "errors": 0, "completion_tokens": tokens_per_call * len(latencies),
+        "latency": StreamingStats().extend(latencies).to_json()}))
+
+
+def test_worker_files_are_merged_but_not_those_of_similar_targets(tmp_path):
+    write_part(tmp_path / "stub.gw0.json", {"a": "passed"}, [0.1, 0.2], wall_time=2.0)
+    write_part(tmp_path / "stub.gw1.json", {"b": "failed"}, [0.3])
+    write_part(tmp_path / "stub_x.json", {"c": "passed"}, [9.0])
+    metrics = load_metrics(str(tmp_path / "stub.json"))
+    assert metrics["tests"] == {"a": "passed", "b": "failed"}
+    assert (metrics["calls"], metrics["wall_time"], metrics["latency"].count) == (3, 2.0, 3)
+    summary = summarize(metrics)
+    assert summary["pass_rate"] == 0.5 and summary["tokens_per_sec"] == 30 / metrics["latency"].total
+    assert summarize(load_metrics(str(tmp_path / "missing.json")))["p50_latency"] is None
+
+
+def test_differing_tests_and_comparison():
+    runs = {"stub": {"tests": {"a": "passed", "b": "passed"}},
+            "ollama:tiny": {"tests": {"a": "passed", "b": "failed", "c": "skipped"}}}
+    differences = differing_tests(runs)
+    assert differences == {"b": {"stub": "passed", "ollama:tiny": "failed"},
+                           "c": {"stub": "-", "ollama:tiny": "skipped"}}
+    summaries = {t: {"pass_rate": None, "passed": 0, "failed": 0, "skipped": 0, "calls": 0, "errors": 0,
+                     "p50_latency": None, "p95_latency": None, "tokens_per_sec": None, "wall_time": 1.0}
+                 for t in runs}
+    table = format_comparison(summaries, differences)
+    assert "2 tests differ:" in table and "b: stub=passed, ollama:tiny=failed" in table
+
+
+def test_pytest_command():
+    command = pytest_command("openai:llama3@localhost:8080", "m.json", ["-m", "functionality"])
+    assert command[:3] == [sys.executable, "-m", "pytest"]
+    assert command[4:] == ["--llm=openai", "--llm-metrics=m.json", "--llm-model=llama3", "--llm-host=localhost",
+                           "--llm-port=8080", "-m", "functionality"]
+    assert pytest_command("stub", "m.json", []) == [sys.executable, "-m", "pytest", "-q", "--llm=stub",
+                                                    "--llm-metrics=m.json"]
+
+
+def test_run_metrics_counts_innermost_calls_and_setup_outcomes(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+    metrics = RunMetrics(str(tmp_path / "run.json"))
+    try:
+        backend, wrapper = object(), SimpleNamespace(client=object())
+        metrics.after_request(backend, "p", {"latency": 0.5, "completion_tokens": 5})
+        metrics.after_request(wrapper, "p", {"latency": 0.5, "completion_tokens": 5})
+        metrics.after_request(backend, "p", {"error": "boom"})
+        for nodeid, when, outcome in [("a", "call", "passed"), ("b", "setup", "skipped"), ("a", "teardown", "passed")]:
+            metrics.pytest_runtest_logreport(SimpleNamespace(nodeid=nodeid, when=when, outcome=outcome))
+    finally:
+        metrics.pytest_unconfigure(SimpleNamespace(getoption=lambda name: None))
+    assert metrics not in instrumentation.hooks
+    written = load_metrics(str(tmp_path / "run.json"))
+    assert written["tests"] == {"a": "passed", "b": "skipped"}
+    assert (written["calls"], written["errors"], written["completion_tokens"]) == (2, 1, 5)
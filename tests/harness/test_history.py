@@ -0,0 +1,57 @@
+import pytest
+
+from harness.history import DEFAULT_ALPHA, Comparison, PerfHistory, prediction_p, t_sf
+
+
+def test_t_tail_probabilities():
+    assert t_sf(0, 5) == pytest.approx(0.5)
+    assert t_sf(1, 1) == pytest.approx(0.25)
+    assert t_sf(2.0, 10) == pytest.approx(0.036694, abs=1e-6)
+    assert t_sf(-2.0, 10) == pytest.approx(1 - 0.036694, abs=1e-6)
+
+
+def test_prediction_p_judges_one_run_against_run_medians():
+    runs = [1.00, 1.04, 0.97, 1.02, 0.99]
+    assert prediction_p(1.03, runs) > 0.2
+    assert prediction_p(1.5, runs) < 0.001
+    assert prediction_p(1.5, runs, greater=False) > 0.99
+    assert prediction_p(2.0, [1.0]) == 1.0
+    assert prediction_p(1.1, [1.0, 1.0, 1.0]) == 0.0
+
+
+def compare(current, runs, higher_is_better=False):
+    return Comparison("m", "s", current, runs, higher_is_better, DEFAULT_ALPHA, 0.10)
+
+
+def test_single_sample_slowdown_is_flagged():
+    # One TTFT sample per run, as in the streaming test: ten times slower must not pass
+    runs = [0.050, 0.052, 0.049, 0.051]
+    assert compare([0.5], runs).regressed
+    assert not compare([0.051], runs).regressed
+    assert not compare([0.005], runs).regressed
+
+
+def test_higher_is_better():
+    runs = [100.0, 98.0, 103.0, 101.0]
+    assert compare([50.0], runs, higher_is_better=True).regressed
+    assert not compare([150.0], runs, higher_is_better=True).regressed
+
+
+def test_run_to_run_spread_is_not_a_regression():
+    # Runs differ by ~15% from one another; a run at the edge of that is ordinary
+    runs = [1.0, 1.15, 0.9, 1.1, 0.95, 1.2, 0.85]
+    assert not compare([1.22] * 50, runs).regressed
+
+
+def test_history_compares_per_run_medians(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    for i, run in enumerate([[1.0, 1.1, 5.0], [0.9, 1.0, 1.0], [1.0, 1.05, 0.95]]):
+        history = PerfHistory(path, "model", "host", commit="c", run_id=f"run{i}")
+        history.record("latency", run)
+        history.close()
+    history = PerfHistory(path, "model", "host", commit="c", run_id="now")
+    assert history.compare("latency", [1.0], runs=2) is None
+    comparison = history.compare("latency", [1.02, 0.98, 1.0])
+    assert comparison.baseline_runs == 3 and comparison.baseline == 1.0 and not comparison.regressed
+    assert history.compare("latency", [2.0, 2.1]).regressed
+    history.close()
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from clients.http_pool import PooledSession, _SafeRetry
+from harness.mock_server import MockOllamaServer, MockProfile
+
+
+def test_connections_are_reused_within_the_pool_size():
+    with MockOllamaServer() as server:
+        session = PooledSession(pool_size=2)
+        url = f"http://{server.host}:{server.port}/api/tags"
+        for _ in range(5):
+            assert session.get(url, timeout=5).ok
+        assert session.stats() == {"requests": 5, "new_connections": 1, "reused_connections": 4}
+        assert session.last_reused
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: session.get(url, timeout=5), range(40)))
+        stats = session.stats()
+        assert stats["new_connections"] <= 2 and stats["reused_connections"] >= 43
+        session.close()
+
+
+def test_post_read_timeout_is_not_resent():
+    with MockOllamaServer(MockProfile({"ttft": {"dist": "fixed", "value": 1.0}})) as server:
+        session = PooledSession(backoff_factor=0)
+        start = time.monotonic()
+        with pytest.raises(requests.exceptions.ConnectionError):
+            session.post(f"http://{server.host}:{server.port}/api/generate", timeout=0.3,
+                         json={"model": "tinyllama", "prompt": "Hi", "stream": False})
+        assert time.monotonic() - start < 0.9
+        time.sleep(0.1)
+        assert server.requests == 1
+        session.close()
+
+
+def test_post_is_retried_only_when_the_server_cant_have_run_it():
+    retry = _SafeRetry(total=2, status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET", "POST"}))
+    assert retry.is_retry("POST", 503)
+    assert not retry.is_retry("POST", 504) and not retry.is_retry("POST", 502)
+    assert retry.is_retry("GET", 504)
+    assert retry.new().read == retry.read and isinstance(retry.new(), _SafeRetry)
+
+
+def test_connect_errors_are_retried():
+    session = PooledSession(retries=2, backoff_factor=0)
+    with pytest.raises(requests.exceptions.ConnectionError, match="Max retries"):
+        session.get("http://127.0.0.1:1/api/tags", timeout=1)
+    session.close()
@@ -0,0 +1,81 @@
+import asyncio, random
+
+import pytest
+
+from harness.load import LoadGenerator, StageResult, arrival_times, find_knee, ramp
+from harness.results import StreamingStats
+
+
+class FakeServer:
+    """Async client answering after ``latency`` seconds, ``capacity`` requests at a time (None: unlimited)"""
+
+    def __init__(self, latency: float, capacity=None, error_every: int = 0):
+        self.latency = latency
+        self.capacity = capacity
+        self.error_every = error_every
+        self.calls = 0
+        self._semaphore = None
+
+    async def agenerate(self, prompt, **kwargs):
+        self.calls += 1
+        call = self.calls
+        if self.capacity is None:
+            await asyncio.sleep(self.latency)
+        else:
+            self._semaphore = self._semaphore or asyncio.Semaphore(self.capacity)
+            async with self._semaphore:
+                await asyncio.sleep(self.latency)
+        if self.error_every and call % self.error_every == 0:
+            return {"text": "", "error": "boom"}
+        return {"text": "ok", "error": ""}
+
+
+def sweep(server, rates, duration):
+    generator = LoadGenerator(server, ["prompt"])
+    return asyncio.run(generator.sweep(rates, duration, arrival="constant"))
+
+
+def test_arrival_times():
+    assert arrival_times(4, 1, "constant") == [0.25, 0.5, 0.75]
+    poisson = arrival_times(50, 10, "poisson", random.Random(1))
+    assert 400 < len(poisson) < 600 and poisson == sorted(poisson)
+    with pytest.raises(ValueError):
+        arrival_times(1, 1, "bursty")
+
+
+def test_ramp_is_geometric():
+    assert ramp(1, 8, 4) == pytest.approx([1, 2, 4, 8])
+    assert ramp(3, 9, 1) == [3]
+
+
+def test_slow_server_that_keeps_up_is_not_saturated():
+    # Each request takes half the stage, but the server never queues
+    report = sweep(FakeServer(latency=0.2), [10, 20, 40], duration=0.4)
+    for stage in report.stages:
+        assert stage.throughput == pytest.approx(stage.arrival_rate, rel=0.1)
+    assert report.knee is None
+
+
+def test_capacity_limit_is_found():
+    # Two slots of 50 ms each: 40 requests/second at most
+    report = sweep(FakeServer(latency=0.05, capacity=2), [10, 20, 120], duration=0.4)
+    assert report.knee is not None and report.knee.offered_rate == 120
+    assert report.knee.throughput == pytest.approx(40, rel=0.2)
+    assert report.as_dict()["max_sustained_throughput"] == pytest.approx(20, rel=0.15)
+
+
+def test_errors_mark_the_knee():
+    report = sweep(FakeServer(latency=0.01, error_every=3), [10, 20], duration=0.5)
+    first = report.stages[0]
+    assert (first.sent, first.errors, first.latencies.count) == (4, 1, 3)
+    assert report.knee is first
+
+
+def test_find_knee_on_latency_growth():
+    def stage(rate, p50):
+        return StageResult(rate, 10, StreamingStats().extend([p50] * 10), 0, 10,
+                           arrival_span=9, completion_span=9)
+
+    stages = [stage(1, 1.0), stage(2, 1.5), stage(4, 2.5)]
+    assert find_knee(stages).offered_rate == 4
+    assert find_knee(stages[:2]) is None
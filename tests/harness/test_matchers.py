@@ -0,0 +1,63 @@
+import random
+import re
+
+import pytest
+
+from harness.matchers import CheckSet, KeywordSet, keywords, trie_pattern
+
+TEXTS = ["The capital of France is Paris.", "Parisian cafés near the Seine", "I don't know, it's UNKNOWN.",
+         "rome, romeo and romance", "", "new york-new jersey"]
+
+
+def reference_found(words, text, word_boundary=False, case_sensitive=False):
+    """Keywords in ``text`` by one regex search per keyword"""
+    flags = 0 if case_sensitive else re.IGNORECASE
+    return {w for w in words
+            if re.search(rf"\b{re.escape(w)}\b" if word_boundary else re.escape(w), text, flags)}
+
+
+def test_trie_pattern_matches_exactly_the_words():
+    words = ["ab", "abc", "b", "a.c"]
+    pattern = re.compile(f"(?:{trie_pattern(words)})")
+    assert all(pattern.fullmatch(w) for w in words)
+    assert not any(pattern.fullmatch(w) for w in ["a", "abcd", "axc", ""])
+    assert pattern.match("abcd").group(0) == "abc"
+
+
+@pytest.mark.parametrize("word_boundary", [False, True])
+@pytest.mark.parametrize("case_sensitive", [False, True])
+def test_found_matches_one_search_per_keyword(word_boundary, case_sensitive):
+    words = ["paris", "Paris", "par", "rome", "romeo", "unknown", "new york", "york", "é", "cafés", "new"]
+    matcher = KeywordSet(words, word_boundary, case_sensitive)
+    for text in TEXTS:
+        expected = reference_found(words, text, word_boundary, case_sensitive)
+        assert matcher.found(text) == expected, text
+        assert matcher.any(text) == bool(expected)
+        assert matcher.missing(text) == [w for w in dict.fromkeys(words) if w not in expected]
+
+
+def test_large_sets_use_the_regex_scan_and_agree():
+    rng = random.Random(0)
+    words = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 5))) for _ in range(400)]
+    matcher = KeywordSet(words)
+    assert matcher._use_regex
+    for _ in range(20):
+        text = "".join(rng.choice("abc ") for _ in range(60))
+        assert matcher.found(text) == reference_found(words, text)
+        hit = matcher.search(text)
+        assert hit is None or hit.casefold() in text.casefold()
+
+
+def test_keywords_are_memoised_and_empty_sets_match_nothing():
+    assert keywords(["a", "b"]) is keywords(("a", "b"))
+    assert KeywordSet([]).found("anything") == set() and KeywordSet([], word_boundary=True).search("x") is None
+    assert KeywordSet([]).all("anything")
+
+
+def test_check_set():
+    checks = CheckSet({"capital": ("any", ["paris", "lyon"]), "both": ("all", ["france", "paris"]),
+                       "refusal": ("none", ["don't know"])})
+    assert checks.evaluate(TEXTS[0]) == {"capital": True, "both": True, "refusal": True}
+    assert checks.evaluate_many(TEXTS[2:3]) == [{"capital": False, "both": False, "refusal": False}]
+    with pytest.raises(ValueError):
+        CheckSet({"bad": ("some", ["x"])})
@@ -0,0 +1,36 @@
+import threading, time
+
+from clients.ollama_client import OllamaClient
+from clients.tokens import split_pieces
+from harness.mock_server import MockOllamaServer, MockProfile
+
+
+def test_loading_one_model_does_not_block_another():
+    server = MockOllamaServer(MockProfile({"models": ["a", "b"], "load_time": 0.3}))
+    assert server.load("b") == 0.3
+    waits = {}
+    loaders = [threading.Thread(target=lambda n=n: waits.__setitem__(n, server.load("a"))) for n in range(2)]
+    for t in loaders:
+        t.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    assert server.load("b") == 0.0
+    assert time.monotonic() - start < 0.1
+    for t in loaders:
+        t.join()
+    assert server.loads == 2
+    assert all(wait >= 0.25 for wait in waits.values())
+    server.server_close()
+
+
+def test_counts_come_from_one_split():
+    profile = MockProfile({"default_response": "Berlin is the capital, population 3,850,809."})
+    with MockOllamaServer(profile) as server:
+        client = OllamaClient(port=server.port)
+        prompt = "What is the capital of Germany?"
+        first = client.generate(prompt, context=[])
+        assert first["completion_tokens"] == len(split_pieces(first["text"]))
+        assert first["prompt_tokens"] == len(split_pieces(prompt))
+        assert len(first["context"]) == first["prompt_tokens"] + first["completion_tokens"]
+        truncated = client.generate(prompt, max_tokens=3)
+        assert truncated["truncated"] and truncated["completion_tokens"] == 3
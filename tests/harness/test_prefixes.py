@@ -0,0 +1,83 @@
+from itertools import count
+from types import SimpleNamespace
+
+from clients.ollama_client import OllamaClient
+from harness.mock_server import MockOllamaServer, MockProfile
+from harness.prefixes import PrefixCacheReport, PrefixCacheStats, group_by_prefix
+
+
+def response(reused, total=100, **metrics):
+    return {"reused_tokens": reused, "prompt_total_tokens": total, "error": "", "prefill_time": 0.1,
+            "ttft": 0.2, "latency": 1.0, "prefill_saved": 0.5, "load_time": 0.0, **metrics}
+
+
+def test_group_by_prefix_sorts_within_windows():
+    prompts = ["Summarise: b", "Translate: x", "Summarise: a", "Translate: y"]
+    assert list(group_by_prefix(prompts, window=4)) == sorted(prompts)
+    assert list(group_by_prefix(prompts, window=2)) == ["Summarise: b", "Translate: x",
+                                                        "Summarise: a", "Translate: y"]
+    assert list(group_by_prefix(prompts, window=1)) == prompts
+    cases = [{"prompt": p} for p in prompts]
+    assert [c["prompt"] for c in group_by_prefix(cases, key=lambda c: c["prompt"], window=4)] == sorted(prompts)
+
+
+def test_group_by_prefix_reads_lazily():
+    read = count()
+    grouped = group_by_prefix((str(next(read)) for _ in range(1000)), window=10)
+    assert len([next(grouped) for _ in range(5)]) == 5
+    assert next(read) == 10
+
+
+def test_stats_split_hits_and_misses():
+    stats = PrefixCacheStats(hit_share=0.5)
+    stats.add(response(80, latency=0.5))
+    stats.add(response(50))
+    stats.add(response(10, latency=2.0))
+    for ignored in (response(None), response(90, total=None), response(90, error="boom"), response(90, cached=True)):
+        stats.add(ignored)
+    summary = stats.as_dict()
+    assert (summary["hit"]["calls"], summary["miss"]["calls"], stats.calls) == (2, 1, 3)
+    assert summary["miss"]["latency"] == 2.0
+    assert summary["prefill_saved"] == 1.5
+    assert "Hits vs misses, median latency" in "\n".join(stats.format())
+
+
+def test_stats_merge_and_json_round_trip():
+    a, b = PrefixCacheStats(), PrefixCacheStats()
+    a.add(response(90))
+    b.add(response(0))
+    b.add(response(60))
+    a.merge(PrefixCacheStats.from_json(b.to_json()))
+    assert a.prefill_saved == 1.5
+    assert (a.as_dict()["hit"]["calls"], a.as_dict()["miss"]["calls"]) == (2, 1)
+
+
+def test_report_counts_innermost_calls_and_merges_workers():
+    config = SimpleNamespace(workeroutput={})
+    report = PrefixCacheReport(config)
+    try:
+        report.after_request(SimpleNamespace(client=object()), "p", response(90))
+        report.after_request(object(), "p", response(90))
+        assert report.stats.calls == 1
+        report.pytest_sessionfinish(None)
+        controller = PrefixCacheReport(SimpleNamespace())
+        try:
+            controller.pytest_testnodedown(SimpleNamespace(workeroutput=config.workeroutput), None)
+            controller.pytest_testnodedown(SimpleNamespace(), None)
+            assert controller.stats.calls == 1
+        finally:
+            controller.pytest_unconfigure(None)
+    finally:
+        report.pytest_unconfigure(None)
+
+
+def test_repeated_generate_prompt_is_a_hit_by_server_counts():
+    prompt = "You are a travel assistant. Answer briefly. " * 10 + "Which airlines fly to Oslo?"
+    stats = PrefixCacheStats()
+    with MockOllamaServer(MockProfile()) as server:
+        client = OllamaClient(port=server.port)
+        for _ in range(2):
+            stats.add(client.generate(prompt))
+        stats.add(client.generate("Something else entirely"))
+    summary = stats.as_dict()
+    assert (summary["hit"]["calls"], summary["miss"]["calls"]) == (1, 2)
@@ -0,0 +1,82 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from allure_commons import plugin_manager
+from allure_commons.logger import AllureMemoryLogger
+from allure_commons.types import AttachmentType
+
+from clients.instrumentation import instrumentation
+from harness.reporting import AttachmentWriter, ResponseLog, SuiteTrace
+
+
+def config(controller: bool):
+    return SimpleNamespace(pluginmanager=SimpleNamespace(has_plugin=lambda name: controller and name == "dsession"))
+
+
+def test_trace_is_written_by_the_process_running_tests(tmp_path, monkeypatch):
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    trace = SuiteTrace(str(tmp_path / "trace.json"))
+    with instrumentation.span("test_x"):
+        pass
+    trace.pytest_unconfigure(config(controller=False))
+    events = json.loads((tmp_path / "trace.json").read_text())
+    assert "test_x" in json.dumps(events)
+
+
+def test_xdist_controller_writes_no_trace(tmp_path, monkeypatch):
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    SuiteTrace(str(tmp_path / "trace.json")).pytest_unconfigure(config(controller=True))
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw0")
+    worker = SuiteTrace(str(tmp_path / "trace.json"))
+    worker.pytest_unconfigure(config(controller=False))
+    assert [p.name for p in tmp_path.iterdir()] == ["trace.gw0.json"]
+
+
+@pytest.fixture
+def written():
+    """Attachment bodies by file name, as the writer hands them to Allure"""
+    logger = AllureMemoryLogger()
+    plugin_manager.register(logger)
+    yield logger.attachments
+    plugin_manager.unregister(logger)
+
+
+def test_full_queue_drops_attachments_and_counts_them(written):
+    writer, result = AttachmentWriter(max_queue=2), SimpleNamespace(attachments=[])
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "first"
+
+    # The writer holds the first body until released, so the two after it fill the queue
+    writer.submit(result, "blocking", blocking, AttachmentType.TEXT)
+    assert started.wait(5)
+    for i in range(4):
+        writer.submit(result, f"a{i}", f"body {i}", AttachmentType.TEXT)
+    assert writer.dropped == 2 and [a.name for a in result.attachments] == ["blocking", "a0", "a1"]
+    release.set()
+    writer.close()
+    assert sorted(written.values()) == ["body 0", "body 1", "first"]
+    assert {a.source for a in result.attachments} == set(written)
+
+
+def test_response_log_truncates_caps_and_flushes_on_close(written):
+    writer, result = AttachmentWriter(), SimpleNamespace(attachments=[])
+    log = ResponseLog(writer, result, max_text=10, max_attachments=2)
+    for i in range(3):
+        log.record("p" * 30, {"text": f"answer {i} " * 5, "latency": 0.5, "extra": "not kept"})
+    log.record("p", {"text": "", "error": "No response"})
+    assert len(result.attachments) == 2
+    log.close()
+    assert log.calls == [] and [a.name for a in result.attachments] == ["LLM Response"] * 2 + ["LLM Calls"]
+    writer.close()
+    bodies = [written[a.source] for a in result.attachments]
+    assert bodies[0] == "answer 0 a\n... [truncated 35 of 45 characters]"
+    calls = json.loads(bodies[2])
+    assert calls["responses_attached"] == 2 and len(calls["calls"]) == 4
+    assert calls["calls"][0] == {"prompt": "pppppppppp\n... [truncated 20 of 30 characters]", "latency": 0.5}
+    assert calls["calls"][3]["error"] == "No response"
@@ -0,0 +1,93 @@
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from harness.results import ResultStore, StreamingStats
+
+QUANTILES = (0, 1, 10, 25, 50, 75, 90, 95, 99, 99.9, 100)
+
+
+def latencies(n, seed=0):
+    """Long-tailed values across several orders of magnitude, with a few zeros"""
+    rng = random.Random(seed)
+    return [0.0 if rng.random() < 0.01 else rng.lognormvariate(-2, 1.5) for _ in range(n)]
+
+
+def exact_percentile(values, q):
+    ordered = sorted(values)
+    return ordered[round((len(ordered) - 1) * q / 100)]
+
+
+@pytest.mark.parametrize("precision", [0.01, 0.001])
+def test_percentiles_are_within_the_stated_precision(precision):
+    values = latencies(20_000)
+    stats = StreamingStats(precision).extend(values)
+    for q in QUANTILES:
+        exact = exact_percentile(values, q)
+        assert stats.percentile(q) == pytest.approx(exact, rel=precision, abs=0), q
+
+
+def test_moments_and_extremes():
+    values = latencies(5000, seed=1)
+    stats = StreamingStats().extend(values)
+    mean = sum(values) / len(values)
+    stdev = (sum((v - mean) ** 2 for v in values) / (len(values) - 1)) ** 0.5
+    assert (stats.count, stats.min, stats.max) == (5000, min(values), max(values))
+    assert stats.mean == pytest.approx(mean, rel=1e-12)
+    assert stats.stdev == pytest.approx(stdev, rel=1e-9)
+    assert StreamingStats().as_dict()["p50"] is None
+    with pytest.raises(ValueError):
+        StreamingStats().percentile(50)
+
+
+def test_merge_equals_one_combined_stream():
+    values = latencies(9000, seed=2)
+    combined = StreamingStats().extend(values)
+    merged = StreamingStats()
+    # Uneven parts, one of them empty, as from xdist workers that ran different tests
+    for part in (values[:10], values[10:10], values[10:6000], values[6000:]):
+        merged.merge(StreamingStats().extend(part))
+    assert merged.buckets == combined.buckets
+    assert (merged.count, merged.zeros, merged.min, merged.max) == \
+        (combined.count, combined.zeros, combined.min, combined.max)
+    assert merged.mean == pytest.approx(combined.mean, rel=1e-12)
+    assert merged.stdev == pytest.approx(combined.stdev, rel=1e-9)
+    assert [merged.percentile(q) for q in QUANTILES] == [combined.percentile(q) for q in QUANTILES]
+
+
+def test_state_survives_json():
+    stats = StreamingStats().extend(latencies(1000, seed=3))
+    restored = StreamingStats.from_json(json.loads(json.dumps(stats.to_json())))
+    assert restored.as_dict() == stats.as_dict()
+    restored.merge(stats)
+    assert restored.count == 2000
+
+
+def response(i):
+    # Every third text is long enough to spill, and some are not ASCII
+    text = f"answer {i} ✓ " * (40 if i % 3 == 0 else 1)
+    return {"text": text, "latency": i / 10, "ttft": None if i % 2 else i / 100,
+            "prompt_tokens": i, "completion_tokens": None, "error": "timeout" if i == 7 else ""}
+
+
+def test_spilled_texts_round_trip(tmp_path):
+    responses = [response(i) for i in range(60)]
+    with ResultStore(spill_threshold=100, max_inline_bytes=500, spill_dir=str(tmp_path)) as store:
+        with ThreadPoolExecutor(4) as pool:
+            indexes = list(pool.map(store.add, responses))
+        assert sorted(indexes) == list(range(60))
+        assert store.spilled_bytes > 0 and store.inline_bytes <= 500
+        for index, original in zip(indexes, responses):
+            record = store[index]
+            assert record.text == original["text"]
+            assert (record.latency, record.ttft, record.prompt_tokens, record.completion_tokens) == \
+                (original["latency"], original["ttft"], original["prompt_tokens"], None)
+            assert record.error == original["error"]
+        assert store[-1].index == 59
+        assert [r.as_dict()["text"] for r in store] == [store.text(i) for i in range(60)]
+        assert store.stats["ttft"].count == 30 and store.stats["completion_tokens"].count == 0
+        with pytest.raises(IndexError):
+            store[60]
+    assert store._spill is None
@@ -0,0 +1,110 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from harness.sampling import (SampleCountWarning, SelfConsistency, can_stop_early, interim_confidence,
+                              min_samples, wilson_interval)
+
+
+class FakeClient:
+    """Answers "yes" with probability ``p``, drawn from the call's seed"""
+
+    def __init__(self, p):
+        self.p = p
+        self.running = self.most_running = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, seed=None):
+        with self._lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.001)
+        with self._lock:
+            self.running -= 1
+        return {"text": "yes" if random.Random(f"{prompt}/{seed}").random() < self.p else "no"}
+
+
+def body(llm_client, **fixtures):
+    assert llm_client.generate(fixtures.get("prompt", "q"))["text"] == "yes"
+
+
+class FakeItem:
+    def __init__(self, client, fixtures=None):
+        fixtures = fixtures or {}
+        self.obj = body
+        self.funcargs = {"llm_client": client, **{name: object() for name in fixtures}}
+        self.fixturenames = list(self.funcargs)
+        self.user_properties = []
+        defs = {name: [SimpleNamespace(scope=scope)] for name, scope in {"llm_client": "function", **fixtures}.items()}
+        self._fixtureinfo = SimpleNamespace(argnames=tuple(self.funcargs), name2fixturedefs=defs)
+
+    def get_closest_marker(self, name):
+        return None
+
+    @property
+    def result(self):
+        return dict(self.user_properties)[SelfConsistency.PROPERTY]
+
+
+def run(item, samples=20, parallel=4, seed=0):
+    plugin = SelfConsistency(SimpleNamespace(), samples=samples, seed=seed, parallel=parallel)
+    try:
+        plugin.pytest_pyfunc_call(item)
+    except pytest.fail.Exception:
+        return False
+    return True
+
+
+def test_looks_share_the_error_rate():
+    assert interim_confidence(0.95, 4) == pytest.approx(0.9875)
+    assert interim_confidence(0.95, 0) == pytest.approx(0.95)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(8, 10)
+    assert low < 0.8 < high
+
+
+def test_small_sample_counts_cannot_stop_early():
+    assert not can_stop_early(3, 0.5, 0.95, 4)
+    assert not can_stop_early(4, 0.5, 0.95, 4)
+    assert can_stop_early(5, 0.5, 0.95, 4)
+    assert min_samples(0.5, 0.95, 1) == 9
+    with pytest.warns(SampleCountWarning, match="at least 5 samples"):
+        run(FakeItem(FakeClient(1.0)), samples=3)
+
+
+def test_clear_cut_tests_stop_early():
+    item = FakeItem(FakeClient(1.0))
+    assert run(item)
+    assert (item.result["samples"], item.result["decided"]) == (8, True)
+    failing = FakeItem(FakeClient(0.0))
+    assert not run(failing)
+    assert failing.result["samples"] == 8
+
+
+def test_borderline_tests_are_judged_on_all_samples():
+    item = FakeItem(FakeClient(0.5))
+    run(item, samples=12)
+    assert item.result["samples"] == 12 and not item.result["decided"]
+
+
+def test_repeated_looks_keep_the_error_rate():
+    # At a true pass rate of exactly 0.5, every early stop is a wrong verdict
+    stopped = 0
+    for seed in range(0, 20_000, 100):
+        item = FakeItem(FakeClient(0.5))
+        run(item, samples=40, seed=seed)
+        stopped += item.result["decided"]
+    assert stopped / 200 <= 0.05
+
+
+def test_samples_sharing_fixtures_run_one_at_a_time():
+    client = FakeClient(1.0)
+    item = FakeItem(client, {"tmp_path": "function", "similarity": "session"})
+    run(item)
+    assert client.most_running == 1 and item.result["shared"] == ["tmp_path"]
+    free = FakeClient(1.0)
+    run(FakeItem(free, {"similarity": "session"}))
+    assert free.most_running > 1
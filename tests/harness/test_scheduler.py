@@ -0,0 +1,96 @@
+import multiprocessing, threading, time
+from types import SimpleNamespace
+
+import pytest
+
+from harness import scheduler
+from harness.scheduler import DurationHistory, ModelSlots
+
+
+def _max_concurrent(slots: ModelSlots, threads: int = 8, hold: float = 0.02) -> int:
+    active = peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal active, peak
+        with slots.slot():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(hold)
+            with lock:
+                active -= 1
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return peak
+
+
+def test_slots_bound_threads(tmp_path):
+    assert _max_concurrent(ModelSlots("model", 2, str(tmp_path))) == 2
+
+
+def test_capacity_comes_from_the_environment_and_is_at_least_one(tmp_path, monkeypatch):
+    monkeypatch.delenv("OLLAMA_NUM_PARALLEL", raising=False)
+    assert scheduler.default_model_capacity() == scheduler.DEFAULT_MODEL_CAPACITY
+    monkeypatch.setenv("OLLAMA_NUM_PARALLEL", " 6 ")
+    assert ModelSlots("model", directory=str(tmp_path)).capacity == 6
+    monkeypatch.setenv("OLLAMA_NUM_PARALLEL", "0")
+    slots = ModelSlots("model", directory=str(tmp_path))
+    assert slots.capacity == 1 and _max_concurrent(slots) == 1
+    assert ModelSlots("model", 0, str(tmp_path)).capacity == 1
+    monkeypatch.setenv("OLLAMA_NUM_PARALLEL", "auto")
+    with pytest.raises(ValueError, match="OLLAMA_NUM_PARALLEL must be a whole number of requests, got 'auto'"):
+        ModelSlots("model", directory=str(tmp_path))
+    # An explicit capacity doesn't read the variable
+    assert ModelSlots("model", 2, str(tmp_path)).capacity == 2
+
+
+def test_slots_without_fcntl_fall_back_to_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "fcntl", None)
+    slots = ModelSlots("model", 3, str(tmp_path))
+    assert _max_concurrent(slots) == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+def _hold_all(directory: str, capacity: int, held, release) -> None:
+    slots = ModelSlots("model", capacity, directory)
+    fds = [slots.acquire() for _ in range(capacity)]
+    held.set()
+    release.wait(5)
+    for fd in fds:
+        slots.release(fd)
+
+
+@pytest.mark.skipif(scheduler.fcntl is None, reason="cross-process slots need fcntl")
+def test_slots_are_shared_between_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    held, release = context.Event(), context.Event()
+    holder = context.Process(target=_hold_all, args=(str(tmp_path), 2, held, release))
+    holder.start()
+    try:
+        assert held.wait(5)
+        slots = ModelSlots("model", 2, str(tmp_path))
+        acquired = threading.Event()
+        waiter = threading.Thread(target=lambda: (slots.release(slots.acquire()), acquired.set()))
+        waiter.start()
+        assert not acquired.wait(0.2)
+        release.set()
+        assert acquired.wait(5)
+        waiter.join()
+    finally:
+        release.set()
+        holder.join(5)
+
+
+def test_duration_history_orders_slowest_first_unknown_before():
+    history = DurationHistory(SimpleNamespace(), alpha=0.5)
+    history.record("fast", 1.0)
+    history.record("slow", 4.0)
+    history.record("slow", 2.0)
+    assert history.estimate("slow") == 3.0
+    items = [SimpleNamespace(nodeid=n) for n in ("fast", "new", "slow")]
+    assert [i.nodeid for i in history.order(items)] == ["new", "slow", "fast"]
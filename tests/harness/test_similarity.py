@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from harness.similarity import EmbeddingIndex, SemanticMatcher, text_key
+
+WORDS = ["einstein", "physicist", "relativity", "nobel", "prize", "paris"]
+
+
+class FakeEmbed:
+    """Bag-of-words vectors over WORDS, counting the texts it is asked for"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[text.lower().count(word) for word in WORDS] + [1] for text in texts]
+
+
+@pytest.fixture
+def embed():
+    return FakeEmbed()
+
+
+def test_scores_are_cosine_similarities(tmp_path, embed):
+    matcher = SemanticMatcher(embed, "fake", str(tmp_path), threshold=0.9)
+    assert matcher.similarity("Einstein, physicist", "einstein physicist") == pytest.approx(1.0)
+    score, closest = matcher.best("Nobel prize in Paris", ["Einstein", "nobel prize"])
+    assert closest == "nobel prize" and score == pytest.approx(3 / 12 ** 0.5)
+    assert not matcher.matches("Nobel prize in Paris", ["Einstein", "nobel prize"])
+    assert matcher.matches("Nobel prize in Paris", ["Einstein", "nobel prize"], threshold=0.8)
+
+
+def test_texts_are_embedded_once_in_batches(tmp_path, embed):
+    matcher = SemanticMatcher(embed, "fake", str(tmp_path), batch_size=2)
+    matcher.vectors(["a", "b", "c", "a"])
+    assert embed.calls == [["a", "b"], ["c"]]
+    again = SemanticMatcher(embed, "fake", str(tmp_path))
+    again.vectors(["c", "b"])
+    assert len(embed.calls) == 2 and again.reused == 2
+
+
+def test_records_being_written_by_another_process_are_skipped(tmp_path, embed):
+    matcher = SemanticMatcher(embed, "fake", str(tmp_path))
+    first = matcher.vectors(["einstein"])
+    # A record another worker has only started to write: its key is still zero bytes
+    with open(matcher.index.path, "ab") as f:
+        f.write(bytes(matcher.index._dtype().itemsize))
+    vectors = matcher.vectors(["einstein", "paris", "nobel"])
+    assert np.allclose(vectors[0], first[0])
+    assert vectors[1] @ vectors[2] == pytest.approx(1 / 2)
+    assert text_key("paris") not in matcher.index.get([text_key("paris")])
+
+
+def test_index_rejects_vectors_of_another_size(tmp_path):
+    index = EmbeddingIndex(str(tmp_path), "model/with:odd name")
+    index.add([text_key("a")], np.ones((1, 3), dtype=np.float32))
+    assert EmbeddingIndex(str(tmp_path), "model/with:odd name").dim == 3
+    with pytest.raises(ValueError):
+        index.add([text_key("b")], np.ones((1, 4), dtype=np.float32))
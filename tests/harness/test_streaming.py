@@ -0,0 +1,60 @@
+import pytest
+
+from clients.ollama_client import OllamaClient
+from clients.streaming import StreamMetrics
+from harness.mock_server import MockOllamaServer, MockProfile
+
+ANSWER = "Verdict: PASS. The answer is fine and complete."
+STEADY = MockProfile({"ttft": {"dist": "fixed", "value": 0.1}, "tokens_per_sec": 50, "num_parallel": 1,
+                      "default_response": ANSWER})
+
+
+def test_stream_metrics():
+    metrics = StreamMetrics(10.0)
+    assert metrics.as_dict() == {"ttft": None, "inter_token_latencies": [], "decode_tokens_per_sec": 0.0}
+    for now in (10.5, 10.6, 10.8, 11.0):
+        metrics.record(now)
+    assert metrics.ttft == 0.5
+    assert metrics.inter_token_latencies == pytest.approx([0.1, 0.2, 0.2])
+    # Three decode gaps in half a second; the first token belongs to prefill
+    assert metrics.decode_tokens_per_sec == pytest.approx(6.0)
+
+
+def test_ttft_and_decode_rate_follow_the_server():
+    with MockOllamaServer(STEADY) as server:
+        response = OllamaClient(port=server.port).generate("Judge this", stream=True)
+    assert response["text"] == ANSWER and not response["stopped_early"]
+    assert 0.1 <= response["ttft"] < 0.18
+    assert len(response["inter_token_latencies"]) == 10
+    assert 35 < response["decode_tokens_per_sec"] <= 51
+    assert response["latency"] >= response["ttft"] + 0.2
+
+
+def test_stop_when_truncates_at_the_verdict_and_drops_the_connection():
+    with MockOllamaServer(STEADY) as server:
+        client = OllamaClient(port=server.port)
+        response = client.generate("Judge this", stop_when=lambda text: "PASS" in text)
+        assert response["stopped_early"] and response["text"] == "Verdict: PASS"
+        assert response["latency"] < 0.18 and not response["error"]
+        # The one slot is free again at once, and the next request needs a new connection
+        after = client.generate("Judge this")
+        assert after["text"] == ANSWER and not after["connection_reused"]
+        assert server.requests == 2
+
+
+def test_errors_keep_partial_text_and_the_time_spent():
+    def fail_after_the_verdict(text):
+        if "PASS" in text:
+            raise ValueError("judge crashed")
+        return False
+
+    with MockOllamaServer(STEADY) as server:
+        response = OllamaClient(port=server.port).generate("Judge this", stop_when=fail_after_the_verdict)
+    assert (response["text"], response["error"]) == ("Verdict: PASS", "judge crashed")
+    assert response["latency"] >= response["ttft"] >= 0.1
+
+    failing = MockProfile({"error_rate": 1.0, "ttft": {"dist": "fixed", "value": 0.0}})
+    with MockOllamaServer(failing) as server:
+        response = OllamaClient(port=server.port, retries=0).generate("Hi", stream=True)
+    assert "500" in response["error"] and response["text"] == "" and response["ttft"] is None
+    assert response["latency"] > 0.0 and response["completion_tokens"] == 0
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from clients.registry import create_client
+from clients.stub_client import StubClient
+
+PROFILE = {"default_response": "From the profile.", "tokens_per_sec": 1000, "seed": 3,
+           "answers": [{"match": "capital", "response": "Paris."},
+                       {"match": "coin", "responses": ["Heads.", "Tails."]}]}
+
+
+@pytest.fixture
+def profile(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps(PROFILE))
+    return str(path)
+
+
+def test_explicit_arguments_override_the_profile(profile):
+    stub = StubClient(profile=profile, default_response="Explicit.", tokens_per_sec=50)
+    assert (stub.default_response, stub.tokens_per_sec) == ("Explicit.", 50)
+    assert StubClient(profile=profile).default_response == "From the profile."
+    assert StubClient(profile=None).default_response == "I'm not sure."
+
+
+def test_answers_with_several_responses_are_sampled(profile):
+    stub = StubClient(profile=profile)
+    assert stub.generate("What is the capital of France?")["text"] == "Paris."
+    seeded = {stub.generate("Flip a coin", seed=7)["text"] for _ in range(5)}
+    assert len(seeded) == 1 and seeded <= {"Heads.", "Tails."}
+    assert {stub.generate("Flip a coin")["text"] for _ in range(30)} == {"Heads.", "Tails."}
+
+
+def test_unknown_options_are_rejected():
+    with pytest.raises(TypeError):
+        create_client("stub", model="stub", host="localhost", port=1, pool_size=4, tokens_per_secs=10)
+    assert create_client("stub", host="localhost", port=1, pool_size=4, latency=0.0).model == "stub"
@@ -0,0 +1,72 @@
+import pytest
+
+from clients import tokens
+from clients.chat import ChatSession
+from clients.openai_client import openai_usage
+from clients.tokens import estimate_tokens, prefix_reuse, token_usage
+
+
+class FakeChatServer:
+    """/api/chat stand-in counting words as tokens, with one cached conversation; ``cold`` drops the cache"""
+
+    def __init__(self, template_tokens: int = 3):
+        self.template_tokens = template_tokens
+        self.cached = 0
+        self.cold = False
+
+    def generate(self, prompt, messages=(), **kwargs):
+        history = " ".join(m["content"] for m in messages)
+        total = len(f"{history} {prompt}".split()) + self.template_tokens * (len(messages) + 1)
+        prefilled = total - (0 if self.cold else min(self.cached, total - 1))
+        answer = "Fine thanks"
+        self.cached = total + len(answer.split())
+        return {"text": answer, "error": "", "latency": 0.1, "prompt_tokens": prefilled, "completion_tokens": 2,
+                "token_source": "server", "prefill_tokens": prefilled, "prefill_time": prefilled * 0.01}
+
+
+def test_reuse_needs_server_counts():
+    assert prefix_reuse(None, 1.0, total=10)["reused_tokens"] is None
+    assert prefix_reuse(4, 1.0)["reused_tokens"] is None
+    exact = prefix_reuse(4, 0.4, total=10)
+    assert (exact["prompt_total_tokens"], exact["reused_tokens"]) == (10, 6)
+    assert exact["prefill_saved"] == pytest.approx(0.6)
+    assert prefix_reuse(12, None, prefix=10) == {"prompt_total_tokens": 12, "reused_tokens": 0, "prefill_saved": None}
+
+
+def test_token_usage_reports_the_server_prefill_count():
+    assert token_usage({"prompt_eval_count": 7, "eval_count": 3}, "x", "y", 1.0)["prefill_tokens"] == 7
+    # Ollama leaves out prompt_eval_count when the whole prompt came from the cache
+    assert token_usage({"eval_count": 3}, "x", "y", 1.0)["prefill_tokens"] == 0
+    assert token_usage({}, "x", "y", 1.0)["prefill_tokens"] is None
+
+
+def test_token_source_says_which_counts_were_estimated():
+    assert token_usage({"prompt_eval_count": 7, "eval_count": 3}, "x", "y", 1.0)["token_source"] == "server"
+    mixed = token_usage({"eval_count": 3}, "Hello there", "y", 1.0)
+    assert (mixed["token_source"], mixed["prompt_tokens"], mixed["completion_tokens"]) == ("mixed", 2, 3)
+    assert token_usage({}, "x", "y", 1.0)["token_source"] == "estimate"
+    assert openai_usage({"usage": {"prompt_tokens": 5}}, "x", "y")["token_source"] == "mixed"
+    assert openai_usage({"usage": {"prompt_tokens": 5, "completion_tokens": 1}}, "x", "y")["token_source"] == "server"
+
+
+def test_chat_reuse_is_a_lower_bound_from_server_counts():
+    server = FakeChatServer()
+    session = ChatSession(server, system="You are a helpful assistant")
+    for question in ("How are you today?", "And yesterday?", "What about tomorrow then?"):
+        session.send(question)
+    first, *follow_ups = session.turns
+    assert first["reused_tokens"] == 0
+    for turn in follow_ups:
+        assert 0 < turn["reused_tokens"] < turn["prompt_total_tokens"]
+        assert turn["prompt_total_tokens"] - turn["reused_tokens"] == turn["prompt_tokens"]
+
+    server.cold = True
+    session.send("Still there?")
+    assert session.turns[-1]["reused_tokens"] == 0
+
+
+def test_estimates_are_cached_by_digest():
+    text = "A long document " * 1000
+    assert estimate_tokens(text) == estimate_tokens(text) == 4000
+    assert not any(isinstance(key, str) for key in tokens._estimates)
+    assert all(len(key) == 16 for key in tokens._estimates)
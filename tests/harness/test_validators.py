@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from harness.validators import JsonValidator, NumberedListValidator, StreamValidator
+
+CHUNK_SIZES = (1, 2, 3, 5, 10_000)
+
+VALID = [
+    '{"a": 1}',
+    '  {"a": [1, 2, {"b": null}], "c": "x", "d": true, "e": false}\n',
+    '{}',
+    '{"s": "quote \\" backslash \\\\ slash \\/ \\b \\f \\n \\r \\t"}',
+    '{"u": "\\u00e9 \\uD83D\\uDE00 \\u0041"}',
+    '{"n": -12.5e+3, "m": 0, "k": 1E2, "z": -0.0, "big": 12345678901234567890}',
+    '[{"a": 1}, 2, "x"]',
+    '{"deep": {"deeper": {"deepest": [[], {}, [{"x": [1]}]]}}}',
+    '{"unicode": "héllo wörld ✓"}',
+]
+
+INVALID = [
+    "",
+    "   \n",
+    '{"a": 1} trailing',
+    '{"a": 1}{"b": 2}',
+    '{"a": 01}',
+    '{"a": 1.}',
+    '{"a": -}',
+    '{"a": .5}',
+    '{"a": 1e}',
+    '{"a": tru}',
+    '{"a": nul',
+    '{"a": "\\x"}',
+    '{"a": "\\u12G4"}',
+    '{"a": "tab\there"}',
+    '{"a" 1}',
+    '{"a": 1,}',
+    '{a: 1}',
+    '{"a": [1, 2}',
+    '{"a": 1',
+    '{"a": "unterminated',
+    '[1, {"a": 1}]',
+    "[]",
+    '"just a string"',
+    "42",
+]
+
+FIELDS = {"name": "John", "age": int}
+WITH_FIELDS = [
+    '{"name": "John", "age": 30}',
+    '{"age": 30, "extra": {"name": "Jane"}, "name": "John"}',
+    '[{"name": "John", "age": 1}]',
+    '{"name": "Jane", "age": 30}',
+    '{"name": "John"}',
+    '{"name": "John", "age": "30"}',
+    '{"info": {"name": "John", "age": 30}}',
+    '{"name": "Jo\\u0068n", "age": 3}',
+]
+
+
+def reference(text, fields):
+    """What the validator should decide, by json.loads on the whole output"""
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    if isinstance(parsed, list):
+        parsed = parsed[0] if parsed else None
+    if not isinstance(parsed, dict):
+        return False
+    return all(key in parsed and (isinstance(parsed[key], value) if isinstance(value, type)
+                                  else str(parsed[key]) == str(value)) for key, value in fields.items())
+
+
+def streamed(validator, text, size):
+    """Feed ``text`` as a stream of ``size``-character chunks, stopping at the verdict like stop_when does"""
+    for end in range(size, len(text) + size, size):
+        if validator(text[:end]):
+            break
+    return validator.finish(text)
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+@pytest.mark.parametrize("text,fields", [(t, {}) for t in VALID + INVALID] + [(t, FIELDS) for t in WITH_FIELDS])
+def test_json_verdict_matches_json_loads(text, fields, size):
+    validator = JsonValidator(fields)
+    expected = reference(text, fields)
+    assert streamed(validator, text, size) is expected, validator.error
+    assert bool(validator.error) is not expected
+
+
+def test_json_fails_early_at_the_offending_character():
+    validator = JsonValidator({"name": "John"})
+    text = '{"name": "Jane", "age": 30, "long": "' + "x" * 1000 + '"}'
+    assert validator(text[:17])
+    assert validator.verdict is False and "name" in validator.error
+    syntax = JsonValidator()
+    assert syntax('{"a": 1} and then some prose')
+    assert "Extra data" in syntax.error
+
+
+def test_numbered_list():
+    text = "\n\n1. Paris\n2. Rome\n3. Madrid\nmore text"
+    for size in CHUNK_SIZES:
+        validator = NumberedListValidator(3)
+        assert streamed(validator, text, size)
+        assert validator.items == 3
+    short = NumberedListValidator(3)
+    assert not short.finish("1. Paris\n2. Rome")
+    assert "found 2" in short.error
+    assert NumberedListValidator(2).finish("1. Paris\n2. Rome")
+
+
+def test_stream_validator_is_abstract():
+    with pytest.raises(TypeError):
+        StreamValidator()
@@ -1,5 +1,8 @@
 import pytest
 from typing import Dict, Any
+from harness import matchers
+
+NONSENSE_ACKNOWLEDGMENTS = ["not sure", "nonsense", "doesn't make sense", "cannot", "unknown", "no favorite"]
 
 # Helpers
 def assert_contains_phrase(text: str, phrase: str):
@@ -7,8 +10,8 @@ def assert_contains_phrase(text: str, phrase: str):
 
 def assert_acknowledges_nonsense(text: str, keywords=None):
     if keywords is None:
-        keywords = ["not sure", "nonsense", "doesn't make sense", "cannot", "unknown", "no favorite"]
-    contains_acknowledgment = any(kw in text.lower() for kw in keywords)
+        keywords = NONSENSE_ACKNOWLEDGMENTS
+    contains_acknowledgment = matchers.keywords(keywords).any(text)
     assert contains_acknowledgment, f"Expected acknowledgment of nonsense, but got: {text}"
 
 
@@ -17,12 +20,10 @@ def test_self_consistency(llm_client) -> None:
     """
     Test that the LLM stays consistent within a multi-turn conversation.
     """
-    prompt = (
-        "User: I have 3 apples.\n"
-        "Assistant: Okay.\n"
-        "User: I eat one apple. How many apples do I have now?"
-    )
-    response: Dict[str, Any] = llm_client.generate(prompt)
+    session = llm_client.chat_session()
+    session.add("user", "I have 3 apples.")
+    session.add("assistant", "Okay.")
+    response: Dict[str, Any] = session.send("I eat one apple. How many apples do I have now?")
     if response.get("error"):
         pytest.fail(f"LLM request failed: {response['error']}")
     
@@ -32,12 +33,10 @@ def test_self_consistency(llm_client) -> None:
 @pytest.mark.context_learning
 def test_passport_reminder(llm_client) -> None:
     """Test that the assistant recalls passport expiry in a multi-turn conversation."""
-    prompt = (
-        "User: My passport expires in 3 months.\n"
-        "Assistant: Okay.\n"
-        "User: How many months till my passport expires ???"
-    )
-    response: Dict[str, Any] = llm_client.generate(prompt)
+    session = llm_client.chat_session()
+    session.add("user", "My passport expires in 3 months.")
+    session.add("assistant", "Okay.")
+    response: Dict[str, Any] = session.send("How many months till my passport expires ???")
     assert_contains_phrase(response["text"], "3 months")
 
 
@@ -46,12 +45,10 @@ def test_no_contradictions(llm_client) -> None:
     """
     Test that the LLM does not contradict its own earlier output.
     """
-    prompt = (
-        "User: Paris is the capital of France, right?\n"
-        "Assistant: Yes, it is.\n"
-        "User: So what is the capital of France?"
-    )
-    response: Dict[str, Any] = llm_client.generate(prompt)
+    session = llm_client.chat_session()
+    session.add("user", "Paris is the capital of France, right?")
+    session.add("assistant", "Yes, it is.")
+    response: Dict[str, Any] = session.send("So what is the capital of France?")
     if response.get("error"):
         pytest.fail(f"LLM request failed: {response['error']}")
     
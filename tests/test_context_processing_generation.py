@@ -1,34 +1,37 @@
-import re
-import json
 import pytest
 from typing import Dict, Any
+from harness import matchers
+from harness.validators import JsonValidator, NumberedListValidator, StreamValidator
 
-# Helpers
-def assert_min_numbered_items(text: str, min_items: int = 3):
-    numbered_lines = re.findall(r'^\d+\.\s+\S+', text, flags=re.MULTILINE)
-    assert len(numbered_lines) >= min_items, (
-        f"Expected at least {min_items} numbered items, found {len(numbered_lines)}.\nOutput:\n{text}"
-    )
-
-def assert_valid_json(text: str, expected_fields: Dict[str, Any]):
-    try:
-        parsed = json.loads(text)
-    except json.JSONDecodeError as e:
-        raise AssertionError(f"Output is not valid JSON: {e}\nOutput:\n{text}")
-
-    if isinstance(parsed, list):
-        assert parsed, f"Expected non-empty list, got {parsed}"
-        parsed = parsed[0]
-
-    assert isinstance(parsed, dict), f"Expected JSON object, got {type(parsed)}"
+# A summary paraphrases one short reference closely, so it is held to a stricter threshold than the default
+SUMMARY_SIMILARITY = 0.8
 
-    for field, value in expected_fields.items():
-        assert str(parsed.get(field)) == str(value), f"Expected {field}='{value}', got {parsed.get(field)}"
-
-
-def assert_summary_contains_keywords(summary: str, keywords: list[str]):
-    missing_keywords = [kw for kw in keywords if kw.lower() not in summary.lower()]
-    assert not missing_keywords, f"Missing key info in summary: {missing_keywords}"
+# Helpers
+# The validators double as stop_when predicates: generation stops as soon as the verdict is known,
+# and the helpers then only check the part of the text the validator has not seen yet.
+def assert_min_numbered_items(text: str, min_items: int = 3, validator: StreamValidator = None):
+    validator = validator or NumberedListValidator(min_items)
+    assert validator.finish(text), f"{validator.error}\nOutput:\n{text}"
+
+def assert_valid_json(text: str, expected_fields: Dict[str, Any], validator: StreamValidator = None):
+    validator = validator or JsonValidator(expected_fields)
+    assert validator.finish(text), f"Output is not the expected JSON: {validator.error}\nOutput:\n{text}"
+
+
+def assert_summary_contains_keywords(summary: str, keywords: list[str], entities: list[str] = (), similarity=None,
+                                     reference: str = None, threshold: float = None):
+    # Names can't be paraphrased, so entities are always matched exactly
+    missing_entities = matchers.keywords(entities).missing(summary) if entities else []
+    assert not missing_entities, f"Missing entities in summary: {missing_entities}"
+    missing_keywords = matchers.keywords(keywords).missing(summary)
+    if not missing_keywords or similarity is None or not reference:
+        assert not missing_keywords, f"Missing key info in summary: {missing_keywords}"
+        return
+    # A paraphrase of the reference summary carries the same key info
+    threshold = similarity.threshold if threshold is None else threshold
+    score = similarity.similarity(summary, reference)
+    assert score >= threshold, \
+        f"Missing key info in summary: {missing_keywords} (similarity {score:.2f} to the reference, needs {threshold})"
 
 
 @pytest.mark.content_generation
@@ -36,14 +39,14 @@ def test_numbered_list_output(llm_client) -> None:
     """
     Test that the LLM generates a properly formatted numbered list.
     """
+    validator = NumberedListValidator(min_items=3)
     response: Dict[str, Any] = llm_client.generate(
-        "List 3 fruits. The output should be a numbered list."
+        "List 3 fruits. The output should be a numbered list.", stop_when=validator
     )
     if response.get("error"):
         pytest.fail(f"LLM request failed: {response['error']}")
 
-    text = response["text"].strip()
-    assert_min_numbered_items(text, min_items=3)
+    assert_min_numbered_items(response["text"], min_items=3, validator=validator)
 
 
 @pytest.mark.content_generation
@@ -51,18 +54,19 @@ def test_json_output(llm_client) -> None:
     """
     Test that the LLM produces valid JSON with required fields.
     """
+    expected_fields = {"name": "John", "age": "33"}
+    validator = JsonValidator(expected_fields)
     response: Dict[str, Any] = llm_client.generate(
-        "Create a JSON file with name: 'John' and age: '33'."
+        "Create a JSON file with name: 'John' and age: '33'.", stop_when=validator
     )
     if response.get("error"):
         pytest.fail(f"LLM request failed: {response['error']}")
 
-    text = response["text"].strip()
-    assert_valid_json(text, expected_fields={"name": "John", "age": "33"})
+    assert_valid_json(response["text"], expected_fields, validator=validator)
 
 
 @pytest.mark.content_generation
-def test_summarization_quality(llm_client) -> None:
+def test_summarization_quality(llm_client, similarity) -> None:
     """
     Test that the LLM generates a concise, accurate summary with key details.
     """
@@ -80,4 +84,8 @@ def test_summarization_quality(llm_client) -> None:
 
     summary = response["text"].strip()
     assert len(summary) < len(original_text), "Summary is not shorter than original text."
-    assert_summary_contains_keywords(summary, ["Einstein", "physicist", "relativity", "Nobel"])
+    assert_summary_contains_keywords(
+        summary, ["physicist", "relativity", "Nobel"], entities=["Einstein"], similarity=similarity,
+        reference="Einstein was a German-born physicist who developed relativity and won the 1921 Nobel Prize in Physics.",
+        threshold=SUMMARY_SIMILARITY,
+    )
@@ -1,15 +1,17 @@
 import pytest
 import re
 from typing import Dict, Any
+from harness import matchers
+
+UNKNOWN_PHRASES = matchers.keywords(["i don't know", "unknown", "no record", "cannot answer"])
 
 # Helper functions
 def assert_contains_any(text: str, options: list[str], error_msg: str):
-    if not any(opt in text for opt in options):
+    if not matchers.keywords(options).any(text):
         raise AssertionError(error_msg)
 
 def assert_admits_unknown(text: str):
-    unknown_phrases = ["i don't know", "unknown", "no record", "cannot answer"]
-    assert any(phrase in text for phrase in unknown_phrases), f"Possible hallucination: {text}"
+    assert UNKNOWN_PHRASES.any(text), f"Possible hallucination: {text}"
 
 def assert_contains_number(text: str, expected: int):
     numbers = [int(num) for num in re.findall(r'\d+', text) if num.isdigit()]
@@ -63,8 +65,9 @@ def test_entity_consistency_in_context(llm_client) -> None:
     """
     intro = "My friend's name is Alex. Alex is 27 years old."
     question = "How old is Alex?"
-    llm_client.generate(intro)  # Introduce context
-    response: Dict[str, Any] = llm_client.generate(question)
+    session = llm_client.chat_session()
+    session.send(intro)  # Introduce context
+    response: Dict[str, Any] = session.send(question)
     if response.get("error"):
         pytest.fail(f"LLM request failed: {response['error']}")
     answer = response["text"].strip()
@@ -1,7 +1,8 @@
-import statistics
+import asyncio, statistics
 from typing import Dict, Any
 import concurrent.futures
 import pytest
+from harness.results import ResultStore
 
 # Helper function to fail on API error
 def assert_no_api_error(response: Dict[str, Any]):
@@ -10,23 +11,17 @@ def assert_no_api_error(response: Dict[str, Any]):
 
 
 @pytest.mark.performance
-def test_average_throughput(llm_client) -> None:
+def test_average_throughput(llm_benchmark) -> None:
     """
-    Test average throughput over multiple runs.
+    Test typical throughput over repeated runs.
     """
-    throughputs = []
-    for _ in range(5):
-        response: Dict[str, Any] = llm_client.generate("Why is the sky blue?")
-        assert_no_api_error(response)
-
-        completion_tokens = response["completion_tokens"]
-        latency = response["latency"]
-        throughput = completion_tokens / latency if latency > 0 else 0
-        throughputs.append(throughput)
-
-    avg_throughput = statistics.mean(throughputs)
-    print(f"Average throughput: {avg_throughput:.2f} tokens/sec")
-    assert avg_throughput >= 5, f"Average throughput too low: {avg_throughput:.2f} tokens/sec"
+    result = llm_benchmark(
+        "Why is the sky blue?",
+        metric=lambda r: r["completion_tokens"] / r["latency"] if r["latency"] > 0 else 0,
+        name="Throughput", unit=" tokens/sec", higher_is_better=True,
+    )
+    print(result.summary())
+    result.assert_percentile(50, min=5)
 
 
 @pytest.mark.performance
@@ -42,62 +37,130 @@ def test_token_efficiency(llm_client) -> None:
 
 
 @pytest.mark.performance
-def test_latency(llm_client) -> None:
+def test_latency(llm_benchmark) -> None:
     """
     Test that the LLM responds within an acceptable latency threshold.
     """
-    response = llm_client.generate("Say hello in one sentence.")
-    assert_no_api_error(response)
+    result = llm_benchmark("Say hello in one sentence.", name="Latency")
+    print(result.summary())
+    result.assert_percentile(95, max=2.0)
+
+
+@pytest.mark.performance
+def test_streaming_latency_breakdown(llm_client, perf_record) -> None:
+    """
+    Test time-to-first-token (prefill) and decode speed separately on streamed responses.
+    """
+    responses = [llm_client.generate("Say hello in one sentence.", stream=True) for _ in range(5)]
+    for response in responses:
+        assert_no_api_error(response)
 
-    latency = response["latency"]
-    print(f"Latency: {latency:.2f} seconds")
-    assert latency <= 2.0, f"Latency too high: {latency:.2f}s"
+    ttfts = [r["ttft"] for r in responses]
+    decode_rates = [r["decode_tokens_per_sec"] for r in responses]
+    ttft, decode_rate = statistics.median(ttfts), statistics.median(decode_rates)
+    print(f"Time to first token: {ttft:.2f} seconds, decode: {decode_rate:.2f} tokens/sec (medians of 5)")
+    perf_record("Time to first token", ttfts)
+    perf_record("Decode throughput", decode_rates, unit=" tokens/sec", higher_is_better=True)
+    assert ttft <= 1.0, f"Time to first token too high: {ttft:.2f}s"
+    assert decode_rate >= 5, f"Decode throughput too low: {decode_rate:.2f} tokens/sec"
 
 
 @pytest.mark.performance
-def test_concurrent_requests(llm_client) -> None:
+def test_chat_session_prefix_reuse(llm_client, perf_record) -> None:
+    """
+    Follow-up turns of a conversation should only prefill the new turn; the
+    history is served from the server's prompt cache.
+    """
+    session = llm_client.chat_session(system="You are a concise travel assistant for airline customers.")
+    for question in ("What is the capital of Germany?", "What currency is used in Japan?",
+                     "Do Indian citizens need a visa for Bhutan?"):
+        assert_no_api_error(session.send(question))
+
+    for turn in session.turns:
+        print(f"Turn {turn['turn']}: prefilled {turn['prompt_tokens']} of {turn['prompt_total_tokens']} "
+              f"prompt tokens, saved {turn['prefill_saved']}s")
+    follow_ups = session.turns[1:]
+    if any(t["reused_tokens"] is None for t in follow_ups):
+        pytest.skip("Backend does not report prompt cache usage")
+    perf_record("Follow-up turn latency", [t["latency"] for t in follow_ups])
+    savings = session.savings()
+    print(f"Prefix reuse: {savings}")
+    assert all(t["reused_tokens"] > 0 for t in follow_ups), f"Follow-up turns re-prefilled the history: {follow_ups}"
+
+
+@pytest.mark.performance
+def test_concurrent_requests(llm_client, perf_record) -> None:
     """
     Test that multiple requests can run in parallel without excessive slowdown.
     """
     prompts = ["Write one sentence about AI."] * 5
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
+    # One worker per pooled connection, so no request waits on or opens a spare socket
+    workers = min(len(prompts), getattr(llm_client, "pool_size", len(prompts)))
+    # Responses are folded into compact columns as they complete instead of kept whole
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor, ResultStore() as results:
         futures = [executor.submit(llm_client.generate, prompt) for prompt in prompts]
-        results = [f.result() for f in futures]
+        for future in concurrent.futures.as_completed(futures):
+            # Fail fast if any request failed
+            response = future.result()
+            assert_no_api_error(response)
+            results.add(response)
+
+    latencies = list(results.columns["latency"])
+    print(f"Concurrent latencies: {[round(l, 2) for l in latencies]} seconds")
+    perf_record("Concurrent latency", latencies)
+    if hasattr(llm_client, "connection_stats"):
+        print(f"Connection reuse: {llm_client.connection_stats()}")
+    if hasattr(llm_client, "coalescing_stats"):
+        print(f"Coalescing: {llm_client.coalescing_stats()}")
+    if hasattr(llm_client, "host_stats"):
+        print(f"Hosts: {llm_client.host_stats()}")
+
+    avg_latency = sum(latencies) / len(latencies)
+    assert avg_latency < 3.0, f"Average latency too high under concurrency: {avg_latency:.2f}s"
+
+
+@pytest.mark.performance
+def test_concurrent_requests_async(async_llm_client, perf_record) -> None:
+    """
+    Test that many requests in flight on one event loop do not slow down excessively.
+    """
+    prompts = ["Write one sentence about AI."] * 5
+
+    async def run_all():
+        async with async_llm_client:
+            return await asyncio.gather(*(async_llm_client.agenerate(p) for p in prompts))
+
+    results = asyncio.run(run_all())
 
-    # Fail fast if any request failed
     for r in results:
         assert_no_api_error(r)
 
     latencies = [r["latency"] for r in results]
-    print(f"Concurrent latencies: {[round(l, 2) for l in latencies]} seconds")
+    print(f"Async concurrent latencies: {[round(l, 2) for l in latencies]} seconds")
+    perf_record("Async concurrent latency", latencies)
 
     avg_latency = sum(latencies) / len(latencies)
-    assert avg_latency < 3.0, f"Average latency too high under concurrency: {avg_latency:.2f}s"
+    assert avg_latency < 3.0, f"Average latency too high under async concurrency: {avg_latency:.2f}s"
+
 
 @pytest.mark.performance
-def test_flight_lookup_latency(llm_client) -> None:
+def test_flight_lookup_latency(llm_benchmark) -> None:
     """
     Ensure flight search responses are fast.
     """
-    response: Dict[str, Any] = llm_client.generate("List flights from New York to London on July 15")
-    assert_no_api_error(response)
-
-    latency = response["latency"]
-    print(f"Flight lookup latency: {latency:.2f} seconds")
-    assert latency <= 3.0, f"Flight lookup too slow: {latency:.2f}s"
+    result = llm_benchmark("List flights from New York to London on July 15", name="Flight lookup latency")
+    print(result.summary())
+    result.assert_percentile(95, max=3.0)
 
 
 @pytest.mark.performance
-def test_visa_lookup_latency(llm_client) -> None:
+def test_visa_lookup_latency(llm_benchmark) -> None:
     """
     Ensure visa requirement responses are fast.
     """
-    response: Dict[str, Any] = llm_client.generate(
-        "What documents are required for an Indian citizen to fly to the US?"
+    result = llm_benchmark(
+        "What documents are required for an Indian citizen to fly to the US?", name="Visa lookup latency"
     )
-    assert_no_api_error(response)
-
-    latency = response["latency"]
-    print(f"Visa lookup latency: {latency:.2f} seconds")
-    assert latency <= 2.0, f"Visa lookup too slow: {latency:.2f}s"
+    print(result.summary())
+    result.assert_percentile(95, max=2.0)
@@ -7,6 +7,7 @@ def assert_no_api_error(response: Dict[str, Any]):
         pytest.fail(f"LLM request failed: {response['error']}")
 
 @pytest.mark.robustness
+@pytest.mark.llm_budget(tokens=32)
 def test_extracts_real_info_from_noise(llm_client) -> None:
     """
     Test that the LLM can answer relevant parts of a noisy question.